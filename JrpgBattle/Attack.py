@@ -1,15 +1,15 @@
 from __future__ import annotations
 
 from copy import copy
-from math import ceil
-from typing import List, Callable, Set, Tuple, TYPE_CHECKING
+from typing import List, Callable, Set, Tuple, Dict, TYPE_CHECKING
 from abc import ABC, abstractmethod
 from enum import IntEnum
-from fractions import Fraction
 
 from JrpgBattle.BattleEventHandling.AttackEvent import ParryEvent, AttackStartedEvent, PaymentFailedEvent, \
-    AttackStaggeredEvent
-from JrpgBattle.BattleEventHandling.EventManagement import notify_shared_observers
+    AttackStaggeredEvent, AttackEventType
+from JrpgBattle.BattleEventHandling.EventManagement import notify_shared_observers, shared_observers_want
+from JrpgBattle.IdentifierSet import intern_identifier
+from JrpgBattle.DamageCalculator import DamageCalculator, FractionDamageCalculator
 
 if TYPE_CHECKING:
     from JrpgBattle.Character import CharacterStatus, CharacterIdentifier
@@ -33,36 +33,59 @@ class AttackType(IntEnum):
     POISON_FIRE_STAB = 14
     POISON_FIRE_STRIKE = 15
 
+    # the classifications are looked up in the tables below rather than recomputed from the bits on every call
     @staticmethod
     def is_utility(attack_type: AttackType) -> bool:
-        return attack_type == 0
+        return UTILITY_TYPES[attack_type]
 
     @staticmethod
     def is_slash(attack_type: AttackType) -> bool:
-        return (attack_type % 4) == 1
+        return SLASH_TYPES[attack_type]
 
     @staticmethod
     def is_stab(attack_type: AttackType) -> bool:
-        return (attack_type % 4) == 2
+        return STAB_TYPES[attack_type]
 
     @staticmethod
     def is_strike(attack_type: AttackType) -> bool:
-        return (attack_type % 4) == 3
+        return STRIKE_TYPES[attack_type]
 
     @staticmethod
     def is_physical(attack_type: AttackType) -> bool:
-        return (attack_type % 4) != 0
+        return PHYSICAL_TYPES[attack_type]
 
     @staticmethod
     def is_fire(attack_type: AttackType) -> bool:
-        return (attack_type & 4) == 1
+        return FIRE_TYPES[attack_type]
 
     @staticmethod
     def is_poison(attack_type: AttackType) -> bool:
-        return (attack_type & 8) == 1
+        return POISON_TYPES[attack_type]
+
+    @staticmethod
+    def get_physical_kind(attack_type: AttackType) -> AttackType:
+        """Returns UTILITY, SLASH, STAB or STRIKE, depending on the low two bits of the type."""
+        return PHYSICAL_KINDS[attack_type]
+
+
+# The AttackType bits are laid out as: the physical kind in the low two bits, then fire (4) and poison (8).
+# Each table has one entry per AttackType value, so hot paths can classify a type with a single index.
+PHYSICAL_KIND_MASK = 3
+FIRE_BIT = 4
+POISON_BIT = 8
+PHYSICAL_KINDS: Tuple[AttackType, ...] = tuple(AttackType(t & PHYSICAL_KIND_MASK) for t in AttackType)
+UTILITY_TYPES: Tuple[bool, ...] = tuple(t == AttackType.UTILITY for t in AttackType)
+SLASH_TYPES: Tuple[bool, ...] = tuple(kind == AttackType.SLASH for kind in PHYSICAL_KINDS)
+STAB_TYPES: Tuple[bool, ...] = tuple(kind == AttackType.STAB for kind in PHYSICAL_KINDS)
+STRIKE_TYPES: Tuple[bool, ...] = tuple(kind == AttackType.STRIKE for kind in PHYSICAL_KINDS)
+PHYSICAL_TYPES: Tuple[bool, ...] = tuple(kind != AttackType.UTILITY for kind in PHYSICAL_KINDS)
+FIRE_TYPES: Tuple[bool, ...] = tuple(bool(t & FIRE_BIT) for t in AttackType)
+POISON_TYPES: Tuple[bool, ...] = tuple(bool(t & POISON_BIT) for t in AttackType)
 
 
 class Attack(ABC):
+    DOMAIN: str = "attack"
+
     def __init__(self,
                  name: str,
                  attack_type: AttackType=AttackType.UTILITY,  # the elemental event_type of the attack
@@ -76,18 +99,27 @@ class Attack(ABC):
         self.action_point_cost = action_point_cost
         self.stamina_point_cost = stamina_point_cost
         self.mana_point_cost = mana_point_cost
+        self.attack_id: int = intern_identifier(Attack.DOMAIN, name)
 
     def __repr__(self):
         return self.name
 
+    def __setstate__(self, state: Dict):
+        # interned ids are only meaningful within a process, so they are reassigned when unpickled
+        self.__dict__.update(state)
+        self.attack_id = intern_identifier(Attack.DOMAIN, self.name)
+
     def get_name(self) -> str:
         return self.name
 
+    def get_attack_id(self) -> int:
+        return self.attack_id
+
     def __eq__(self, other):
-        return isinstance(other, Attack) and self.name == other.name
+        return isinstance(other, Attack) and self.attack_id == other.attack_id
 
     def __hash__(self):
-        return hash(self.name)
+        return self.attack_id
 
     def get_attack_type(self) -> AttackType:
         return self.attack_type
@@ -175,7 +207,7 @@ class DetailedAttackPlan:
     def __repr__(self):
         return f'{repr(self.user)}, {repr(self.attack)}, {repr(self.targets)}'
 
-    def execute(self):
+    def execute(self, calculator: DamageCalculator = None):
         # TODO EVENT
         self.user.publicize_attack(self.attack)
 
@@ -188,21 +220,29 @@ class DetailedAttackPlan:
             self.status = DetailedAttackPlan.SKIPPED
             return
 
-        attack_event = AttackStartedEvent(self.user, self.attack)
-        self.user.notify_observers(attack_event)
+        # the events caused by this attack are linked back to the AttackStartedEvent, if one was built
+        attack_event = None
+        if self.user.wants(AttackStartedEvent, AttackEventType.ATTACK_STARTED):
+            attack_event = AttackStartedEvent(self.user, self.attack)
+            self.user.notify_observers(attack_event)
 
         # Now process the payment for the attack
         payment_successful = self.user.attack_payment(self.attack.action_point_cost,
                                                       self.attack.stamina_point_cost,
                                                       self.attack.mana_point_cost)
         if not payment_successful:
-            attack_event = PaymentFailedEvent(self.user, self.attack)
-            self.user.notify_observers(attack_event)
+            if self.user.wants(PaymentFailedEvent, AttackEventType.PAYMENT_FAILED):
+                payment_event = PaymentFailedEvent(self.user, self.attack, cause=attack_event)
+                self.user.notify_observers(payment_event)
             self.status = DetailedAttackPlan.SKIPPED
             return
 
-        # TODO THREADS: Should there be any kind of lock here?
+        # No lock is needed here: plans are only executed by the battle loop while no transactions are open.
+        # Planning threads only touch CharacterStatus state through the BattleClient's commit,
+        # which is serialized by its transaction lock.
         self.status = DetailedAttackPlan.IN_PROGRESS  # the DetailedAttackPlan is now executing
+        if calculator is None:
+            calculator = FractionDamageCalculator()
         swings = 0  # the number of targets the attack has been used against
         hits = 0  # the number of targets the attack has hit
         for target in self.targets:
@@ -220,53 +260,62 @@ class DetailedAttackPlan:
             Putting the check up top might allow deeper reads, but also might be more frustrating. 
             What's the right choice? """
             if self.user.stagger:
-                attack_event = AttackStaggeredEvent(self.user, self.attack)
-                self.user.notify_observers(attack_event)
+                if self.user.wants(AttackStaggeredEvent, AttackEventType.ATTACK_STAGGERED):
+                    stagger_event = AttackStaggeredEvent(self.user, self.attack, cause=attack_event)
+                    self.user.notify_observers(stagger_event)
                 self.status = DetailedAttackPlan.MISS
                 continue
 
             # now check if the target is being defended
-            parry_multiplier = Fraction(1, 1)
-            if target.get_defender() is None:
+            defender = target.get_defender()
+            parry_multiplier = None
+            if defender is None:
                 # TODO EVENT: Attack hit
                 hits += 1
             else:
                 # TODO EVENT: Attack parried
-                parry_effectiveness = target.get_defender().get_parry_effectiveness()
-                assist_penalty = Fraction(0) if target.get_defender() is target else Fraction(1, 2)
-                parry_multiplier = 1 - (parry_effectiveness ** float(assist_penalty + target.get_vulnerability()))
-                parry_event = ParryEvent(self.user,
-                                         self.attack,
-                                         target,
-                                         target.get_defender())
-                notify_shared_observers(parry_event,
-                                        self.user,
-                                        target,
-                                        target.get_defender())
-
+                parry_multiplier = calculator.compute_parry_multiplier(defender, target)
+                if shared_observers_want(ParryEvent, AttackEventType.ATTACK_PARRIED,
+                                         self.user, target, defender):
+                    parry_event = ParryEvent(self.user,
+                                             self.attack,
+                                             target,
+                                             defender,
+                                             cause=attack_event)
+                    notify_shared_observers(parry_event,
+                                            self.user,
+                                            target,
+                                            defender)
 
             # if parry was perfect, just skip the rest of the attack calculations
-            if parry_multiplier <= 0:
+            if parry_multiplier is not None and parry_multiplier <= 0:
                 continue
 
-            #TODO: Consider optimizing multipliers
-            total_multiplier = Fraction(1, 1)
+            # the static multipliers come precompiled per attack type, only the dynamic ones have to be evaluated
+            attack_type = self.attack.attack_type
+            offense = self.user.offensive_table
+            defense = target.defensive_table
+            multipliers = [offense.products[attack_type], defense.products[attack_type]]
             # aggregate offensive multipliers
-            for multiplier in self.user.get_offensive_type_affinities():
+            for multiplier in offense.multipliers[attack_type]:
+                self.user.publicize_attack_multiplier(multiplier)
+            for multiplier in offense.dynamic:
                 if multiplier.is_relevant(self):
-                    total_multiplier *= multiplier
+                    multipliers.append(multiplier)
                     self.user.publicize_attack_multiplier(multiplier)
             # aggregate defensive multipliers
-            for multiplier in target.get_defensive_type_affinities():
+            for multiplier in defense.multipliers[attack_type]:
+                target.publicize_defense_multiplier(multiplier)
+            for multiplier in defense.dynamic:
                 if multiplier.is_relevant(self):
-                    total_multiplier *= multiplier
+                    multipliers.append(multiplier)
                     target.publicize_defense_multiplier(multiplier)
 
             # calculate base damage
             base_damage = self.attack.compute_base_damage(self, target)
 
-            total_damage = ceil(base_damage*total_multiplier*parry_multiplier)
-            target.receive_enemy_damage(total_damage)
+            total_damage = calculator.compute_damage(base_damage, multipliers, parry_multiplier)
+            target.receive_enemy_damage(total_damage, cause=attack_event)
 
         #after processing all targets, update the attack's status with the result
         if swings == 0:
@@ -0,0 +1,269 @@
+"""
+A compact, append-only binary log of battle events.
+The EventLogWriter is an EventObserver which encodes every CharacterUpdateEvent, AttackEvent and PartyEvent
+it is notified of as a record whose width is fixed by the kind of event. Characters, attacks and parties are
+written as their interned ids, and the first time an id appears in the log it is preceded by a name record
+which maps it back to its name.
+Records are collected in memory and written to the stream in bulk.
+The EventLogReader streams the records back as LoggedEvents, one chunk of the log at a time.
+"""
+
+from __future__ import annotations
+
+import struct
+from enum import Enum
+from typing import BinaryIO, Dict, Iterator, Optional, Set, Tuple, Type, TYPE_CHECKING
+
+from JrpgBattle.BattleEventHandling.AttackEvent import AttackEvent, AttackEventType
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import CharacterUpdateEvent, UpdateType
+from JrpgBattle.BattleEventHandling.EventManagement import EventObserver, BattleEvent
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent, PartyEventType
+
+if TYPE_CHECKING:
+    from JrpgBattle.Party import Party
+
+MAGIC = b'JRPGLOG1'
+
+# record families; NAME_RECORD introduces a name, the others are events
+NAME_RECORD = 0
+CHARACTER_RECORD = 1
+ATTACK_RECORD = 2
+PARTY_RECORD = 3
+
+# the domains a name record can belong to
+CHARACTER_NAME = 1
+ATTACK_NAME = 2
+PARTY_NAME = 3
+
+NO_ID = 0xFFFFFFFF  # written in id fields which don't apply to an event
+
+# every record starts with a header byte holding its family in the top three bits and its event type in the rest
+FAMILY_SHIFT = 5
+EVENT_TYPE_MASK = (1 << FAMILY_SHIFT) - 1
+
+# header, flags, character, change
+CHARACTER_EVENT = struct.Struct('<BBIi')
+# header, attacker, attack, target, defender
+ATTACK_EVENT = struct.Struct('<BIIII')
+# header, party
+PARTY_EVENT = struct.Struct('<BI')
+# header, domain, name length, id; followed by the utf-8 encoded name
+NAME_HEADER = struct.Struct('<BBHI')
+
+RECORD_STRUCTS: Dict[int, struct.Struct] = {
+    CHARACTER_RECORD: CHARACTER_EVENT,
+    ATTACK_RECORD: ATTACK_EVENT,
+    PARTY_RECORD: PARTY_EVENT
+}
+
+STAGGERS_FLAG = 1
+DIED_FLAG = 2
+
+# each kind of CharacterUpdateEvent changes at most one value, so only that value is written
+HP_CHANGE = 'hp_change'
+SP_CHANGE = 'sp_change'
+VULNERABILITY_CHANGE = 'vulnerability_change'
+CHANGE_FIELDS: Dict[UpdateType, str] = {
+    UpdateType.DAMAGE_INCURRED: HP_CHANGE,
+    UpdateType.SP_GAINED: SP_CHANGE,
+    UpdateType.SP_SPENT: SP_CHANGE,
+    UpdateType.VULNERABILITY_RESET: VULNERABILITY_CHANGE,
+    UpdateType.VULNERABILITY_RAISED: VULNERABILITY_CHANGE
+}
+
+EVENT_TYPES: Dict[int, Type[Enum]] = {
+    CHARACTER_RECORD: UpdateType,
+    ATTACK_RECORD: AttackEventType,
+    PARTY_RECORD: PartyEventType
+}
+
+
+class LoggedEvent:
+    """An event read back from the log, with every id resolved to its name."""
+    def __init__(self,
+                 family: int,  # one of CHARACTER_RECORD, ATTACK_RECORD or PARTY_RECORD
+                 event_type: Enum,
+                 subject: str,  # the character, attacker or party the event happened to
+                 attack: Optional[str] = None,
+                 target: Optional[str] = None,
+                 defender: Optional[str] = None,
+                 hp_change: int = 0,
+                 sp_change: int = 0,
+                 vulnerability_change: int = 0,
+                 character_staggers: bool = False,
+                 character_died: bool = False):
+        self.family = family
+        self.event_type = event_type
+        self.subject = subject
+        self.attack = attack
+        self.target = target
+        self.defender = defender
+        self.hp_change = hp_change
+        self.sp_change = sp_change
+        self.vulnerability_change = vulnerability_change
+        self.character_staggers = character_staggers
+        self.character_died = character_died
+
+    def __repr__(self):
+        return f'LoggedEvent({self.event_type.name}, subject={self.subject}, attack={self.attack}, ' \
+               f'target={self.target}, defender={self.defender}, hp={self.hp_change}, sp={self.sp_change}, ' \
+               f'vulnerability={self.vulnerability_change})'
+
+
+class EventLogWriter(EventObserver[BattleEvent]):
+    def __init__(self,
+                 stream: BinaryIO,  # a binary stream opened for writing or appending
+                 buffer_size: int = 1 << 16):  # the number of bytes collected before they are written out
+        super().__init__()
+        self.stream = stream
+        self.buffer_size = buffer_size
+        # a log which is appended to already has its header
+        self.buffer = bytearray(MAGIC if self.stream_is_empty(stream) else b'')
+        self.known_ids: Set[Tuple[int, int]] = set()
+        self.record_count = 0
+
+    @staticmethod
+    def stream_is_empty(stream: BinaryIO) -> bool:
+        try:
+            return stream.tell() == 0
+        except OSError:  # streams which can't tell their position, like pipes, are written from the start
+            return True
+
+    def __enter__(self) -> EventLogWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def observe_party(self, party: Party):
+        """Subscribes the writer to the party, which passes on the events of all of its members."""
+        party.register_observer(self, PartyEvent, CharacterUpdateEvent, AttackEvent)
+
+    def handle_event(self, event: BattleEvent) -> bool:
+        if isinstance(event, CharacterUpdateEvent):
+            flags = (STAGGERS_FLAG if event.character_staggers else 0) | (DIED_FLAG if event.character_died else 0)
+            change_field = CHANGE_FIELDS.get(event.event_type)
+            self.write_record(CHARACTER_EVENT,
+                              CHARACTER_RECORD,
+                              event.event_type,
+                              flags,
+                              self.name_id(CHARACTER_NAME, event.character.interned_id, event.character.character_name),
+                              getattr(event, change_field) if change_field is not None else 0)
+        elif isinstance(event, AttackEvent):
+            target = getattr(event, 'target', None)
+            defender = getattr(event, 'defender', None)
+            self.write_record(ATTACK_EVENT,
+                              ATTACK_RECORD,
+                              event.event_type,
+                              self.name_id(CHARACTER_NAME, event.attacker.interned_id, event.attacker.character_name),
+                              self.name_id(ATTACK_NAME, event.attack.attack_id, event.attack.name),
+                              NO_ID if target is None else
+                              self.name_id(CHARACTER_NAME, target.interned_id, target.character_name),
+                              NO_ID if defender is None else
+                              self.name_id(CHARACTER_NAME, defender.interned_id, defender.character_name))
+        elif isinstance(event, PartyEvent):
+            self.write_record(PARTY_EVENT,
+                              PARTY_RECORD,
+                              event.event_type,
+                              self.name_id(PARTY_NAME, event.party.interned_id, event.party.name))
+        return False
+
+    def name_id(self, domain: int, index: int, name: str) -> int:
+        """Returns the id, first writing a name record for it if this is its first appearance in the log."""
+        if (domain, index) not in self.known_ids:
+            self.known_ids.add((domain, index))
+            encoded = name.encode('utf-8')
+            self.buffer += NAME_HEADER.pack(NAME_RECORD, domain, len(encoded), index)
+            self.buffer += encoded
+        return index
+
+    def write_record(self, record: struct.Struct, family: int, event_type: Enum, *fields: int):
+        self.buffer += record.pack(family << FAMILY_SHIFT | event_type.value, *fields)
+        self.record_count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer.clear()
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        self.expired = True
+
+
+class EventLogReader:
+    """
+    Lazily decodes an event log.
+    Only one chunk of the stream is held in memory at a time, so arbitrarily long logs can be read.
+    """
+    def __init__(self, stream: BinaryIO, chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.names: Dict[int, Dict[int, str]] = {CHARACTER_NAME: {}, ATTACK_NAME: {}, PARTY_NAME: {}}
+
+    def __iter__(self) -> Iterator[LoggedEvent]:
+        if self.stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a battle event log')
+        buffer = b''
+        offset = 0
+        exhausted = False
+        while True:
+            available = len(buffer) - offset
+            needed = NAME_HEADER.size
+            if available:
+                family = buffer[offset] >> FAMILY_SHIFT
+                if family == NAME_RECORD:
+                    if available >= NAME_HEADER.size:
+                        needed += NAME_HEADER.unpack_from(buffer, offset)[2]
+                else:
+                    needed = RECORD_STRUCTS[family].size
+            if available < needed:
+                if exhausted:
+                    if available:
+                        raise ValueError('Truncated battle event log')
+                    return
+                chunk = self.stream.read(self.chunk_size)
+                exhausted = not chunk
+                buffer = buffer[offset:] + chunk
+                offset = 0
+                continue
+            if family == NAME_RECORD:
+                _, domain, length, index = NAME_HEADER.unpack_from(buffer, offset)
+                start = offset + NAME_HEADER.size
+                self.names[domain][index] = buffer[start:start + length].decode('utf-8')
+            else:
+                yield self.decode(family, RECORD_STRUCTS[family].unpack_from(buffer, offset))
+            offset += needed
+
+    def decode(self, family: int, fields: Tuple[int, ...]) -> LoggedEvent:
+        event_type = EVENT_TYPES[family](fields[0] & EVENT_TYPE_MASK)
+        characters = self.names[CHARACTER_NAME]
+        if family == CHARACTER_RECORD:
+            _, flags, character, change = fields
+            event = LoggedEvent(family,
+                                event_type,
+                                characters[character],
+                                character_staggers=bool(flags & STAGGERS_FLAG),
+                                character_died=bool(flags & DIED_FLAG))
+            change_field = CHANGE_FIELDS.get(event_type)
+            if change_field is not None:
+                setattr(event, change_field, change)
+            return event
+        elif family == ATTACK_RECORD:
+            _, attacker, attack, target, defender = fields
+            return LoggedEvent(family,
+                               event_type,
+                               characters[attacker],
+                               attack=self.names[ATTACK_NAME][attack],
+                               target=None if target == NO_ID else characters[target],
+                               defender=None if defender == NO_ID else characters[defender])
+        else:
+            return LoggedEvent(family, event_type, self.names[PARTY_NAME][fields[1]])
+
+
+def read_event_log(path: str) -> Iterator[LoggedEvent]:
+    with open(path, 'rb') as stream:
+        yield from EventLogReader(stream)
@@ -1,15 +1,94 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from copy import copy
-from typing import TypeVar, Generic, Set
+import weakref
+from collections import deque
+from enum import Enum, auto
+from typing import TypeVar, Generic, Set, Dict, FrozenSet, Optional, Tuple, Type, Union, Deque, List, MutableSet, \
+    Mapping
+
+
+class CausalityMode(Enum):
+    FULL = auto()  # causes and effects are held by strong references, so the whole causal graph stays alive
+    WEAK = auto()  # causes and effects are held by weak references, so events die as soon as nobody uses them
+    BOUNDED = auto()  # like WEAK, but the last N events are kept alive by the CausalityTracker
+    OFF = auto()  # causality isn't recorded at all
+
+
+class CausalityTracker:
+    """
+    The CausalityTracker decides how BattleEvents record their causes and effects.
+    A causality chain can be followed for as long as the events in it are retained.
+    """
+    def __init__(self, mode: CausalityMode = CausalityMode.FULL, capacity: int = 1024):
+        self.mode = mode
+        self.capacity = capacity
+        self.retained: Deque[BattleEvent] = deque(maxlen=capacity)
+
+    def configure(self, mode: CausalityMode, capacity: int = None):
+        self.mode = mode
+        if capacity is not None:
+            self.capacity = capacity
+        self.retained = deque(maxlen=self.capacity)
+
+    def link(self, event: BattleEvent, cause: Optional[BattleEvent]):
+        mode = self.mode
+        if mode is CausalityMode.OFF:
+            return
+        if mode is CausalityMode.BOUNDED:
+            self.retained.append(event)
+        if cause is None:
+            return
+        if mode is CausalityMode.FULL:
+            event._cause = cause
+            if cause.effects is None:
+                cause.effects = set()
+        else:
+            event._cause = weakref.ref(cause)
+            if cause.effects is None:
+                cause.effects = weakref.WeakSet()
+        cause.effects.add(event)
+
+
+CAUSALITY_TRACKER = CausalityTracker()
+
+
+def configure_causality(mode: CausalityMode, capacity: int = None):
+    CAUSALITY_TRACKER.configure(mode, capacity)
 
 
 class BattleEvent:
+    # overridden by each event family with its UpdateType/AttackEventType/PartyEventType value
+    event_type: Optional[Enum] = None
+
     def __init__(self, cause: BattleEvent = None):
-        self.effects: Set[BattleEvent] = set()
-        if cause is not None:
-            cause.effects.add(self)
-        self.cause = cause
+        # both are only filled in if the CausalityTracker records the link
+        # and the effects set is only allocated once the event actually causes another event
+        self._cause: Union[BattleEvent, weakref.ref, None] = None
+        self.effects: Optional[MutableSet[BattleEvent]] = None
+        CAUSALITY_TRACKER.link(self, cause)
+
+    @property
+    def cause(self) -> Optional[BattleEvent]:
+        cause = self._cause
+        return cause() if isinstance(cause, weakref.ref) else cause
+
+    def get_cause(self) -> Optional[BattleEvent]:
+        return self.cause
+
+    def get_effects(self) -> Set[BattleEvent]:
+        return set(self.effects) if self.effects is not None else set()
+
+    def get_causal_chain(self) -> List[BattleEvent]:
+        """
+        Returns this event followed by its cause, its cause's cause, and so on,
+        stopping at the first cause which wasn't recorded or is no longer retained.
+        """
+        chain = [self]
+        cause = self.cause
+        while cause is not None:
+            chain.append(cause)
+            cause = cause.cause
+        return chain
 
 
 E = TypeVar("E", bound=BattleEvent)
@@ -61,44 +140,129 @@ class EventObserver(Generic[E], ABC):
         return self.expired
 
 
-class EventSubject(Generic[E]):
+EventKey = Union[Type[BattleEvent], Enum]
+
+
+class _NoObservers(Mapping):
+    """The empty, read-only mapping shared by every EventBus which hasn't been subscribed to yet."""
+    def __getitem__(self, observer):
+        raise KeyError(observer)
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    # pickling and copying resolve to the shared instance, so subscribe can still recognise it
+    def __reduce__(self):
+        return 'NO_OBSERVERS'
+
+
+NO_OBSERVERS = _NoObservers()
+
+
+class EventBus(Generic[E]):
+    """
+    The EventBus dispatches events to the observers subscribed to them.
+    Observers can subscribe to every event, or only to specific event classes
+    (which also match their subclasses) and event_type values such as UpdateType.DAMAGE_INCURRED.
+    Dispatch goes through per-(class, event_type) handler tuples which are computed on first use
+    and only thrown away when the subscriptions change, so events without subscribers cost a lookup.
+    Buses without any observers don't build a table at all.
+    EventBus declares no slots of its own so it can be mixed into slotted Identifiers:
+    subclasses either have a __dict__ or declare the observers and _dispatch_table slots themselves.
+    """
+    __slots__ = ()
+
     def __init__(self):
-        self.observers: Set[EventObserver[E]] = set()
+        # maps each observer to the keys it subscribed to; None means it receives every event
+        # buses share the empty mapping until their first subscription, since most characters are never observed
+        self.observers: Dict[EventObserver[E], Optional[FrozenSet[EventKey]]] = NO_OBSERVERS
+        self._dispatch_table: Dict[type, Dict[Optional[Enum], Tuple[EventObserver[E], ...]]] = NO_OBSERVERS
 
-    def register_observer(self, observer: EventObserver[E]):
-        self.observers.add(observer)
-        observer.on_registration()
+    def subscribe(self, observer: EventObserver[E], *event_keys: EventKey):
+        """
+        Subscribes the observer to the given event classes and event types, or to every event if none are given.
+        Subscribing an observer again adds to its existing subscription.
+        """
+        if self.observers is NO_OBSERVERS:
+            self.observers = {}
+            self._dispatch_table = {}
+        if observer not in self.observers:
+            self.observers[observer] = frozenset(event_keys) if event_keys else None
+            observer.on_registration()
+        elif self.observers[observer] is not None:
+            self.observers[observer] = self.observers[observer] | frozenset(event_keys) if event_keys else None
+        self._dispatch_table.clear()
 
-    def deregister_observer(self, observer: EventObserver[E]):
-        self.observers.remove(observer)
+    def unsubscribe(self, observer: EventObserver[E]):
+        del self.observers[observer]
         observer.on_deregistration()
+        self._dispatch_table.clear()
+
+    def get_handlers(self, event_class: type, event_type: Enum = None) -> Tuple[EventObserver[E], ...]:
+        if not self.observers:
+            return ()
+        class_table = self._dispatch_table.get(event_class)
+        if class_table is None:
+            class_table = self._dispatch_table[event_class] = {}
+        handlers = class_table.get(event_type)
+        if handlers is None:
+            event_classes = event_class.__mro__
+            handlers = class_table[event_type] = tuple(
+                observer for observer, keys in self.observers.items()
+                if keys is None or event_type in keys or any(cls in keys for cls in event_classes))
+        return handlers
+
+    def wants(self, event_class: type, event_type: Enum = None) -> bool:
+        return bool(self.get_handlers(event_class, event_type))
+
+    def publish(self, event: E):
+        for observer in self.get_handlers(type(event), event.event_type):
+            # on_notify also reports observers which have expired
+            if observer.on_notify(event) and observer in self.observers:
+                self.unsubscribe(observer)
+
+
+class EventSubject(EventBus[E]):
+    __slots__ = ()
+
+    def __init__(self):
+        EventBus.__init__(self)
+
+    def register_observer(self, observer: EventObserver[E], *event_keys: EventKey):
+        self.subscribe(observer, *event_keys)
+
+    def deregister_observer(self, observer: EventObserver[E]):
+        self.unsubscribe(observer)
 
     def notify_observers(self, event: E):
-        current_observers = copy(self.observers)
-        for observer in current_observers:
-            if observer.is_expired():
-                self.deregister_observer(observer)
-            else:
-                deregister = observer.on_notify(event)
-                if deregister:
-                    self.deregister_observer(observer)
+        self.publish(event)
 
     def clear_observers(self):
-        current_observers = copy(self.observers)
-        for observer in current_observers:
+        for observer in list(self.observers):
             self.deregister_observer(observer)
 
 
+def shared_observers_want(event_class: type, event_type: Enum, *subjects: EventBus) -> bool:
+    return any(subject.wants(event_class, event_type) for subject in subjects)
+
+
 def notify_shared_observers(event: BattleEvent, *subjects: EventSubject):
-    observer_list = set()
+    """
+    Notifies the observers of several subjects, making sure each observer only sees the event once.
+    If an observer asks to be deregistered, it is deregistered from every one of the subjects.
+    """
+    event_class = type(event)
+    notified = []
     for subject in subjects:
-        observer_list |= subject.observers
-    for observer in observer_list:
-        if observer.is_expired():
-            for s in subjects:
-                s.deregister_observer(observer)
-        else:
-            deregister = observer.on_notify(event)
-            if deregister:
+        handlers = subject.get_handlers(event_class, event.event_type)
+        for observer in handlers:
+            if any(observer in earlier for earlier in notified):
+                continue
+            if observer.on_notify(event):
                 for s in subjects:
-                    s.deregister_observer(observer)
+                    if observer in s.observers:
+                        s.deregister_observer(observer)
+        notified.append(handlers)
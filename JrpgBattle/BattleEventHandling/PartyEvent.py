@@ -13,6 +13,7 @@ class PartyEventType(Enum):
     START_INTERVAL = auto()
     FINISH_INTERVAL = auto()
     TURN_FINISHED = auto()
+    WIPED_OUT = auto()  # the party's last surviving member died
 
 
 class PartyEvent(BattleEvent):
@@ -35,5 +36,7 @@ class PartyEvent(BattleEvent):
         elif self.event_type == PartyEventType.TURN_FINISHED:
             return f'Team {self.party.name} exits planning phase\n' \
                    f'==== Team {self.party.name}: TURN FINISHED ===='
+        elif self.event_type == PartyEventType.WIPED_OUT:
+            return f'Team {self.party.name} has been wiped out'
         else:
             return "invalid event_type"
@@ -1,10 +1,10 @@
 from __future__ import annotations
-from typing import Callable, Set, TYPE_CHECKING, MutableSet
-from copy import copy
+from typing import Callable, Set, TYPE_CHECKING, Tuple, Optional, FrozenSet, Iterable, List
+from enum import Enum
 from fractions import Fraction
 
 from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import UpdateType, CharacterUpdateEvent
-from JrpgBattle.BattleEventHandling.EventManagement import BattleEvent, EventSubject
+from JrpgBattle.BattleEventHandling.EventManagement import BattleEvent, EventSubject, EventBus, EventObserver
 from JrpgBattle.IdentifierSet import Identifier
 
 if TYPE_CHECKING:
@@ -21,6 +21,10 @@ allowing common enemies to be repeatedly built from the same template.
 
 
 class CharacterTemplate:
+    """
+    Templates are shared by every CharacterStatus built from them, so they are never modified once built:
+    the collections are frozen and the type affinities are compiled into AffinityTables here, once per template.
+    """
     def __init__(self,
                  name: str,
                  max_hp: int,
@@ -31,10 +35,12 @@ class CharacterTemplate:
         # variables describing the character's current profile
         self.template_name = name
         self.max_hp = max_hp
-        self.offensive_type_affinities = offensive_type_affinities
-        self.defensive_type_affinities = defensive_type_affinities
-        self.attack_list = attack_list
+        self.offensive_type_affinities: FrozenSet[Multiplier] = frozenset(offensive_type_affinities)
+        self.defensive_type_affinities: FrozenSet[Multiplier] = frozenset(defensive_type_affinities)
+        self.attack_list: FrozenSet[Attack] = frozenset(attack_list)
         self.parry_effectiveness = parry_effectiveness
+        self.offensive_table = AffinityTable(self.offensive_type_affinities)
+        self.defensive_table = AffinityTable(self.defensive_type_affinities)
 
     def get_template_name(self):
         return self.template_name
@@ -42,20 +48,44 @@ class CharacterTemplate:
     def get_max_hp(self) -> int:
         return self.max_hp
 
-    def get_offensive_type_affinities(self) -> Set[Multiplier]:
-        return copy(self.offensive_type_affinities)
+    def get_offensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self.offensive_type_affinities
 
-    def get_defensive_type_affinities(self) -> Set[Multiplier]:
-        return copy(self.defensive_type_affinities)
+    def get_defensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self.defensive_type_affinities
 
-    def get_attack_list(self) -> Set[Attack]:
-        return copy(self.attack_list)
+    def get_attack_list(self) -> FrozenSet[Attack]:
+        return self.attack_list
 
     def get_parry_effectiveness(self) -> Fraction:
         return self.parry_effectiveness
 
 
+NOTHING_PUBLIC: FrozenSet = frozenset()
+
+# the tuple returned by CharacterStatus.get_state
+CharacterState = Tuple[int, int, int, int, bool, int, bool, bool,
+                       Optional['CharacterStatus'], Optional['CharacterStatus'],
+                       FrozenSet['Attack'], FrozenSet['Multiplier'], FrozenSet['Multiplier']]
+
+
+# the bits of CharacterStatus.dirty, which record the fields changed since the character's changes were last collected
+DIRTY_HP = 1 << 0
+DIRTY_SP = 1 << 1
+DIRTY_SP_SPENT = 1 << 2
+DIRTY_AP = 1 << 3
+DIRTY_VULNERABILITY = 1 << 4
+DIRTY_STAGGER = 1 << 5
+DIRTY_WAS_ATTACKED = 1 << 6
+DIRTY_DEAD = 1 << 7
+DIRTY_DEFENSE = 1 << 8  # is_defending and defended_by
+DIRTY_PUBLIC_ATTACKS = 1 << 9
+DIRTY_PUBLIC_MULTIPLIERS = 1 << 10
+DIRTY_ALL = (1 << 11) - 1
+
+
 class CharacterIdentifier(Identifier):
+    __slots__ = ()
     DOMAIN: str = "character"
 
     def __init__(self, name: str):
@@ -65,7 +95,24 @@ class CharacterIdentifier(Identifier):
         return CharacterIdentifier.DOMAIN
 
 
-class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[BattleEvent]):
+class CharacterStatus(CharacterIdentifier, EventSubject[BattleEvent]):
+    """
+    The state of a character in a particular battle.
+    The character's profile is read from its template, which is shared rather than copied,
+    so each CharacterStatus only stores the fields which change over the course of the battle.
+    The observers of the character's party also observe the character,
+    so watching a whole party takes a single registration no matter how many members it has.
+    The methods which change the character's fields mark them in the dirty bitmask, and the first change since
+    the party last collected its members' changes adds the character to the party's dirty_members.
+    Fields assigned directly from outside the class have to be marked with mark_dirty.
+    """
+    __slots__ = ('observers', '_dispatch_table',  # the EventBus fields
+                 'party', 'template', 'character_name', 'current_hp', 'current_sp', 'sp_spent', 'current_ap', 'stagger',
+                 'vulnerability', 'was_attacked', 'is_defending', 'defended_by', 'dead',
+                 'public_attack_list', 'public_offensive_multipliers', 'public_defensive_multipliers',
+                 '_offensive_type_affinities', 'offensive_table', '_defensive_type_affinities', 'defensive_table',
+                 'dirty')
+
     def __init__(self,
                  character: CharacterTemplate,
                  name: str,
@@ -73,15 +120,14 @@ class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[Battl
                  current_hp: int = None):
         CharacterIdentifier.__init__(self, name)
         EventSubject.__init__(self)
-        CharacterTemplate.__init__(self,
-                                   character.get_template_name(),
-                                   character.get_max_hp(),
-                                   character.get_offensive_type_affinities(),
-                                   character.get_defensive_type_affinities(),
-                                   character.get_attack_list(),
-                                   character.get_parry_effectiveness())
+        self.template = character
+        # the template's affinities and tables are used until the character is given affinities of its own
+        self._offensive_type_affinities = character.offensive_type_affinities
+        self.offensive_table = character.offensive_table
+        self._defensive_type_affinities = character.defensive_type_affinities
+        self.defensive_table = character.defensive_table
         self.character_name = name
-        # self.party = party
+        self.party: Optional[Party] = None  # set when the character joins a party
         self.current_hp = current_hp if current_hp is not None else character.get_max_hp()
         self.current_sp: int = 0
         self.sp_spent: int = 0
@@ -91,26 +137,116 @@ class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[Battl
         self.was_attacked: bool = False  # This flag is set when a character is attacked. Resets at end of turn
         self.is_defending: CharacterStatus = None  # The character this one is defending; 'None' if not parrying
         self.defended_by: CharacterStatus = None  # The character defending this one; 'None' if undefended
-        self.public_attack_list: MutableSet[Attack] = set()
-        self.public_offensive_multipliers = set()
-        self.public_defensive_multipliers = set()
+        # the public sets are frozen and replaced when they grow, so new characters can share the empty sets
+        self.public_attack_list: FrozenSet[Attack] = NOTHING_PUBLIC
+        self.public_offensive_multipliers: FrozenSet[Multiplier] = NOTHING_PUBLIC
+        self.public_defensive_multipliers: FrozenSet[Multiplier] = NOTHING_PUBLIC
         # TODO: add functionality for death
         self.dead: bool = False
+        self.dirty: int = DIRTY_ALL  # nobody has seen the new character yet
+
+    @property
+    def template_name(self) -> str:
+        return self.template.template_name
+
+    @property
+    def max_hp(self) -> int:
+        return self.template.max_hp
+
+    @property
+    def attack_list(self) -> FrozenSet[Attack]:
+        return self.template.attack_list
+
+    @property
+    def parry_effectiveness(self) -> Fraction:
+        return self.template.parry_effectiveness
+
+    def get_template(self) -> CharacterTemplate:
+        return self.template
+
+    def get_template_name(self):
+        return self.template.template_name
+
+    def get_max_hp(self) -> int:
+        return self.template.max_hp
+
+    def get_offensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self._offensive_type_affinities
+
+    def get_defensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self._defensive_type_affinities
+
+    def get_attack_list(self) -> FrozenSet[Attack]:
+        return self.template.attack_list
+
+    def get_parry_effectiveness(self) -> Fraction:
+        return self.template.parry_effectiveness
+
+    # the affinities are frozen, so the compiled tables can only go stale by assigning new affinities
+    @property
+    def offensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self._offensive_type_affinities
+
+    @offensive_type_affinities.setter
+    def offensive_type_affinities(self, affinities: Iterable[Multiplier]):
+        self._offensive_type_affinities = frozenset(affinities)
+        self.offensive_table = AffinityTable(self._offensive_type_affinities)
+
+    @property
+    def defensive_type_affinities(self) -> FrozenSet[Multiplier]:
+        return self._defensive_type_affinities
+
+    @defensive_type_affinities.setter
+    def defensive_type_affinities(self, affinities: Iterable[Multiplier]):
+        self._defensive_type_affinities = frozenset(affinities)
+        self.defensive_table = AffinityTable(self._defensive_type_affinities)
 
     def get_character_name(self) -> str:
         return self.character_name
 
+    def get_party(self) -> Optional[Party]:
+        return self.party
+
+    def get_handlers(self, event_class: type, event_type: Enum = None) -> Tuple[EventObserver, ...]:
+        # the party's handlers are looked up through the party's own dispatch table, so they are shared by every member
+        handlers = EventBus.get_handlers(self, event_class, event_type)
+        if self.party is None:
+            return handlers
+        party_handlers = self.party.get_handlers(event_class, event_type)
+        if not handlers:
+            return party_handlers
+        return handlers + tuple(observer for observer in party_handlers if observer not in handlers)
+
+    def mark_dirty(self, fields: int):
+        if not self.dirty and self.party is not None:
+            self.party.dirty_members.append(self)
+        self.dirty |= fields
+
+    def publish(self, event: BattleEvent):
+        for observer in self.get_handlers(type(event), event.event_type):
+            if observer.on_notify(event):
+                if observer in self.observers:
+                    self.unsubscribe(observer)
+                if self.party is not None and observer in self.party.observers:
+                    self.party.unsubscribe(observer)
+
     def publicize_attack(self, attack: Attack):
-        assert attack in self.attack_list
-        self.public_attack_list.add(attack)
+        assert attack in self.template.attack_list
+        if attack not in self.public_attack_list:
+            self.public_attack_list = self.public_attack_list | {attack}
+            self.mark_dirty(DIRTY_PUBLIC_ATTACKS)
 
     def publicize_attack_multiplier(self, multiplier: Multiplier):
         assert multiplier in self.offensive_type_affinities
-        self.public_offensive_multipliers.add(multiplier)
+        if multiplier not in self.public_offensive_multipliers:
+            self.public_offensive_multipliers = self.public_offensive_multipliers | {multiplier}
+            self.mark_dirty(DIRTY_PUBLIC_MULTIPLIERS)
 
     def publicize_defense_multiplier(self, multiplier: Multiplier):
         assert multiplier in self.defensive_type_affinities
-        self.public_offensive_multipliers.add(multiplier)
+        if multiplier not in self.public_offensive_multipliers:
+            self.public_offensive_multipliers = self.public_offensive_multipliers | {multiplier}
+            self.mark_dirty(DIRTY_PUBLIC_MULTIPLIERS)
 
     def get_public_attack_list(self) -> Set[Attack]:
         return set(self.public_attack_list)
@@ -124,22 +260,37 @@ class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[Battl
     def set_defense(self, target: CharacterStatus):
         target.defended_by = self
         self.is_defending = target
+        target.mark_dirty(DIRTY_DEFENSE)
+        self.mark_dirty(DIRTY_DEFENSE)
 
     def get_defender(self) -> CharacterStatus:
         return self.defended_by
 
     def set_was_attacked(self):
-        self.was_attacked = True
+        if not self.was_attacked:
+            self.was_attacked = True
+            self.mark_dirty(DIRTY_WAS_ATTACKED)
 
-    def receive_enemy_damage(self, damage: int):
+    def receive_enemy_damage(self, damage: int, cause: BattleEvent = None):
+        damage_event = None
         self.current_hp -= damage
-        event = CharacterUpdateEvent(self, UpdateType.DAMAGE_INCURRED, hp_change=damage)
-        self.notify_observers(event)
+        self.mark_dirty(DIRTY_HP)
+        if self.wants(CharacterUpdateEvent, UpdateType.DAMAGE_INCURRED):
+            damage_event = CharacterUpdateEvent(self, UpdateType.DAMAGE_INCURRED, hp_change=damage, cause=cause)
+            self.notify_observers(damage_event)
         if self.current_hp <= 0:
             self.current_hp = 0
-            self.dead = True
-            event = CharacterUpdateEvent(self, UpdateType.CHARACTER_DIED, character_died=True)
-            self.notify_observers(event)
+            # a character which is already dead doesn't die again, so its party doesn't count it twice
+            if not self.dead:
+                self.dead = True
+                self.dirty |= DIRTY_DEAD
+                event = None
+                if self.wants(CharacterUpdateEvent, UpdateType.CHARACTER_DIED):
+                    event = CharacterUpdateEvent(self, UpdateType.CHARACTER_DIED, character_died=True,
+                                                 cause=damage_event if damage_event is not None else cause)
+                    self.notify_observers(event)
+                if self.party is not None:
+                    self.party.member_died(event)
 
     def is_dead(self) -> bool:
         return self.dead
@@ -149,52 +300,94 @@ class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[Battl
         # first, check for any failed parries.
         if self.defended_by is not None:
             if self.was_attacked:
+                if self.wants(CharacterUpdateEvent, UpdateType.VULNERABILITY_RESET):
+                    battle_event = CharacterUpdateEvent(self,
+                                                        UpdateType.VULNERABILITY_RESET,
+                                                        vulnerability_change=-1*self.vulnerability)
+                    self.notify_observers(battle_event)
+                if self.vulnerability:
+                    self.vulnerability = 0
+                    self.mark_dirty(DIRTY_VULNERABILITY)
+            else:
+                if self.wants(CharacterUpdateEvent, UpdateType.VULNERABILITY_RAISED):
+                    battle_event = CharacterUpdateEvent(self,
+                                                        UpdateType.VULNERABILITY_RAISED,
+                                                        vulnerability_change=1)
+                    self.notify_observers(battle_event)
+                self.vulnerability += 1
+                self.mark_dirty(DIRTY_VULNERABILITY)
+        elif not self.was_attacked:
+            if self.wants(CharacterUpdateEvent, UpdateType.VULNERABILITY_RESET):
                 battle_event = CharacterUpdateEvent(self,
                                                     UpdateType.VULNERABILITY_RESET,
-                                                    vulnerability_change=-1*self.vulnerability)
+                                                    vulnerability_change=-1 * self.vulnerability)
                 self.notify_observers(battle_event)
+            if self.vulnerability:
                 self.vulnerability = 0
-            else:
-                battle_event = CharacterUpdateEvent(self,
-                                                    UpdateType.VULNERABILITY_RAISED,
-                                                    vulnerability_change=1)
-                self.notify_observers(battle_event)
-                self.vulnerability += 1
-        elif not self.was_attacked:
-            battle_event = CharacterUpdateEvent(self,
-                                                UpdateType.VULNERABILITY_RESET,
-                                                vulnerability_change=-1 * self.vulnerability)
-            self.notify_observers(battle_event)
-            self.vulnerability = 0
+                self.mark_dirty(DIRTY_VULNERABILITY)
 
         if self.is_defending is not None and not self.is_defending.was_attacked:
             self.stagger = True
-            stagger_event = CharacterUpdateEvent(self,
-                                                 UpdateType.DEFENSE_WHIFFED,
-                                                 character_staggers=True)
-            self.notify_observers(stagger_event)
+            self.mark_dirty(DIRTY_STAGGER)
+            if self.wants(CharacterUpdateEvent, UpdateType.DEFENSE_WHIFFED):
+                stagger_event = CharacterUpdateEvent(self,
+                                                     UpdateType.DEFENSE_WHIFFED,
+                                                     character_staggers=True)
+                self.notify_observers(stagger_event)
         self.current_ap = 100
         self.sp_spent = 0
+        self.mark_dirty(DIRTY_AP | DIRTY_SP_SPENT)
 
     # this function performs basic character upkeep between the execution and planning stages
-    def turn_interval(self):
+    def turn_interval(self, release_defense: bool = True):
         # calculate sp reduction
         self.current_sp -= self.sp_spent
+        self.mark_dirty(DIRTY_SP)
 
         # staggered characters don't get stamina points
         if not self.stagger:
             self.current_sp += self.current_ap
-            if self.current_ap > 0:
+            if self.current_ap > 0 and self.wants(CharacterUpdateEvent, UpdateType.SP_GAINED):
                 event = CharacterUpdateEvent(self, UpdateType.SP_GAINED, sp_change=self.current_ap)
                 self.notify_observers(event)
 
-        self.is_defending = None
-        self.defended_by = None
-        self.stagger = False
+        if release_defense:
+            self.release_defense()
+        if self.stagger:
+            self.stagger = False
+            self.dirty |= DIRTY_STAGGER
+
+    # drops the defense set during the last planning phase
+    def release_defense(self):
+        if self.is_defending is not None or self.defended_by is not None:
+            self.is_defending = None
+            self.defended_by = None
+            self.mark_dirty(DIRTY_DEFENSE)
 
     # this function performs basic character upkeep at the end of the turn
     def end_turn(self):
-        self.was_attacked = False
+        if self.was_attacked:
+            self.was_attacked = False
+            self.mark_dirty(DIRTY_WAS_ATTACKED)
+
+    def get_state(self) -> CharacterState:
+        """
+        Captures everything about the character which changes over the course of a battle.
+        The template, attacks and observers aren't part of the state, since they are shared rather than copied.
+        The public sets are frozen, so they can be captured without copying them.
+        """
+        return (self.current_hp, self.current_sp, self.sp_spent, self.current_ap, self.stagger, self.vulnerability,
+                self.was_attacked, self.dead, self.is_defending, self.defended_by,
+                self.public_attack_list, self.public_offensive_multipliers, self.public_defensive_multipliers)
+
+    def set_state(self, state: CharacterState):
+        (self.current_hp, self.current_sp, self.sp_spent, self.current_ap, self.stagger, self.vulnerability,
+         self.was_attacked, self.dead, self.is_defending, self.defended_by,
+         public_attacks, public_offensive_multipliers, public_defensive_multipliers) = state
+        self.public_attack_list = frozenset(public_attacks)
+        self.public_offensive_multipliers = frozenset(public_offensive_multipliers)
+        self.public_defensive_multipliers = frozenset(public_defensive_multipliers)
+        self.mark_dirty(DIRTY_ALL)
 
     def attack_payment(self, ap_cost: int, sp_cost: int, mp_cost: int) -> bool:
         if self.current_ap < ap_cost:
@@ -206,15 +399,114 @@ class CharacterStatus(CharacterTemplate, CharacterIdentifier, EventSubject[Battl
         else:
             self.current_ap -= ap_cost
             self.sp_spent = max(self.sp_spent, sp_cost)
-            event = CharacterUpdateEvent(self, UpdateType.SP_SPENT, sp_change=-1*self.sp_spent)
-            self.notify_observers(event)
+            self.mark_dirty(DIRTY_AP | DIRTY_SP_SPENT)
+            if self.wants(CharacterUpdateEvent, UpdateType.SP_SPENT):
+                event = CharacterUpdateEvent(self, UpdateType.SP_SPENT, sp_change=-1*self.sp_spent)
+                self.notify_observers(event)
             # self.party.spend_mp(mp_cost)
             return True
 
 
 class Multiplier(Fraction):
+    """
+    A damage multiplier which applies to some attacks.
+    Multipliers which apply to a fixed set of attack types are static: they are compiled into each character's
+    AffinityTable, so they cost a single lookup per attack.
+    The set of attack types is either listed explicitly, or declared as a bitmask predicate on the AttackType bits:
+    the multiplier applies to every type where attack_type & type_mask == type_value. For example, a mask and value
+    of 4 match every fire attack, while a mask of 3 and a value of 1 match every slash.
+    Declared multipliers can be written to and read from the JSON data files.
+    Multipliers with an is_relevant callable can depend on anything about the attack,
+    so the callable is evaluated every time the character attacks or is attacked.
+    """
+    def __new__(cls,
+                multiplier: Fraction,
+                is_relevant: Callable[[DetailedAttackPlan], bool] = None,
+                attack_types: Iterable[int] = None,
+                type_mask: int = None,
+                type_value: int = None):
+        return super().__new__(cls, multiplier)
+
     def __init__(self,
                  multiplier: Fraction,
-                 is_relevant: Callable[[DetailedAttackPlan], bool]):
-        Fraction.__init__(multiplier)
-        self.is_relevant = is_relevant
+                 is_relevant: Callable[[DetailedAttackPlan], bool] = None,
+                 attack_types: Iterable[int] = None,  # the AttackTypes the multiplier applies to
+                 type_mask: int = None,  # the AttackType bits checked by the predicate
+                 type_value: int = None):  # the value the checked bits must have, by default all of them set
+        if sum(form is not None for form in (is_relevant, attack_types, type_mask)) != 1:
+            raise ValueError('A Multiplier needs exactly one of an is_relevant callable, a set of attack types '
+                             'or a type mask')
+        if type_mask is None and type_value is not None:
+            raise ValueError('A type value can only be given along with a type mask')
+        if type_mask is not None:
+            type_value = type_mask if type_value is None else type_value
+            if type_value & ~type_mask:
+                raise ValueError(f'Type value {type_value} has bits outside of type mask {type_mask}')
+            attack_types = (attack_type for attack_type in range(ATTACK_TYPE_COUNT)
+                            if attack_type & type_mask == type_value)
+        self.relevance = is_relevant
+        self.type_mask: Optional[int] = type_mask
+        self.type_value: Optional[int] = type_value
+        self.attack_types: Optional[FrozenSet[int]] = frozenset(attack_types) if attack_types is not None else None
+
+    # a multiplier is only equal to another multiplier, since it's hashed by its attack types as well as its value;
+    # False rather than NotImplemented, so Fraction doesn't compare the values on the multiplier's behalf
+    def __eq__(self, other):
+        if isinstance(other, Multiplier):
+            return Fraction.__eq__(self, other) and self.relevance is other.relevance \
+                   and self.attack_types == other.attack_types
+        return False
+
+    def __hash__(self):
+        return hash((self.numerator, self.denominator, self.attack_types))
+
+    # Fraction rebuilds subclasses from their numerator and denominator, which would drop the relevance
+    def __reduce__(self):
+        if self.type_mask is not None:
+            return Multiplier, (Fraction(self), None, None, self.type_mask, self.type_value)
+        return Multiplier, (Fraction(self), self.relevance, self.attack_types)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def is_static(self) -> bool:
+        return self.relevance is None
+
+    def applies_to(self, attack_type: int) -> bool:
+        """Returns whether a static multiplier applies to attacks of the type."""
+        if self.type_mask is not None:
+            return attack_type & self.type_mask == self.type_value
+        return attack_type in self.attack_types
+
+    def is_relevant(self, plan: DetailedAttackPlan) -> bool:
+        if self.relevance is not None:
+            return self.relevance(plan)
+        return self.applies_to(plan.attack.get_attack_type())
+
+
+ATTACK_TYPE_COUNT = 16  # the number of AttackType values
+
+
+class AffinityTable:
+    """
+    A set of type affinities compiled into one entry per AttackType.
+    Each entry holds the static multipliers which apply to the type and their combined product.
+    Multipliers with is_relevant callables can't be compiled, so they are kept aside as the dynamic multipliers.
+    """
+    def __init__(self, affinities: Iterable[Multiplier]):
+        affinities = list(affinities)
+        static = [multiplier for multiplier in affinities if multiplier.is_static()]
+        self.dynamic: Tuple[Multiplier, ...] = tuple(multiplier for multiplier in affinities
+                                                     if not multiplier.is_static())
+        self.multipliers: List[Tuple[Multiplier, ...]] = []
+        self.products: List[Fraction] = []
+        for attack_type in range(ATTACK_TYPE_COUNT):
+            relevant = tuple(multiplier for multiplier in static if multiplier.applies_to(attack_type))
+            product = Fraction(1)
+            for multiplier in relevant:
+                product *= multiplier
+            self.multipliers.append(relevant)
+            self.products.append(product)
@@ -1,4 +1,4 @@
-from typing import Set, TYPE_CHECKING
+from typing import Set, TYPE_CHECKING, NamedTuple, FrozenSet, Optional
 from fractions import Fraction
 from copy import copy
 from JrpgBattle.Attack import Attack
@@ -7,6 +7,55 @@ if TYPE_CHECKING:
     from JrpgBattle.Party import Party
 
 
+class CharacterSnapshot(NamedTuple):
+    """The publicly visible state of a character, frozen at the moment it was taken."""
+    name: str
+    damage: int
+    vulnerability: int
+    sp: int
+    sp_spent: int
+    ap: int
+    was_attacked: bool
+    staggered: bool
+    dead: bool
+    public_attacks: FrozenSet[Attack]
+    public_offensive_multipliers: FrozenSet[Multiplier]
+    public_defensive_multipliers: FrozenSet[Multiplier]
+
+
+class PrivateCharacterSnapshot(NamedTuple):
+    """The full state of one of the player's own characters, frozen at the moment it was taken."""
+    name: str
+    template_name: str
+    current_hp: int
+    max_hp: int
+    vulnerability: int
+    sp: int
+    sp_spent: int
+    ap: int
+    was_attacked: bool
+    staggered: bool
+    dead: bool
+    attacks: FrozenSet[Attack]
+    public_attacks: FrozenSet[Attack]
+    is_defending: Optional[str]  # the name of the character being defended
+    defended_by: Optional[str]  # the name of the character defending this one
+
+
+def public_snapshot(c: CharacterStatus) -> CharacterSnapshot:
+    return CharacterSnapshot(c.character_name, c.max_hp - c.current_hp, c.vulnerability, c.current_sp,
+                             c.sp_spent, c.current_ap, c.was_attacked, c.stagger, c.dead,
+                             c.public_attack_list, c.public_offensive_multipliers, c.public_defensive_multipliers)
+
+
+def private_snapshot(c: CharacterStatus) -> PrivateCharacterSnapshot:
+    return PrivateCharacterSnapshot(c.character_name, c.template_name, c.current_hp, c.max_hp, c.vulnerability,
+                                    c.current_sp, c.sp_spent, c.current_ap, c.was_attacked, c.stagger, c.dead,
+                                    c.attack_list, c.public_attack_list,
+                                    None if c.is_defending is None else c.is_defending.character_name,
+                                    None if c.defended_by is None else c.defended_by.character_name)
+
+
 class PublicCharacterView(CharacterIdentifier):
     """
     PublicCharacterView objects provide views of CharacterStatus objects
@@ -61,6 +110,9 @@ class PublicCharacterView(CharacterIdentifier):
     def is_dead(self) -> bool:
         return self._character.is_dead()
 
+    def snapshot(self) -> CharacterSnapshot:
+        return public_snapshot(self._character)
+
 
 class PrivateCharacterView(PublicCharacterView):
     def __init__(self, character: CharacterStatus):
@@ -93,3 +145,6 @@ class PrivateCharacterView(PublicCharacterView):
 
     def get_defended_by(self) -> CharacterStatus:
         return self._character.defended_by
+
+    def snapshot(self) -> PrivateCharacterSnapshot:
+        return private_snapshot(self._character)
@@ -0,0 +1,90 @@
+"""
+DamageCalculators perform the arithmetic of DetailedAttackPlan.execute: the parry multiplier of a defended target,
+and the final damage after the type multipliers and the parry have been applied.
+The FractionDamageCalculator is the reference implementation, which works directly with Fractions.
+The FixedPointDamageCalculator produces identical results using integer arithmetic and a table of parry multipliers.
+execute uses the FractionDamageCalculator unless it's given another calculator: a battle client passes the one
+it was configured with to every attack it executes.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from fractions import Fraction
+from math import ceil
+from numbers import Rational
+from typing import Dict, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from JrpgBattle.Character import CharacterStatus
+
+# None is used for the parry multiplier of a target which isn't defended
+ParryMultiplier = Optional[Union[Fraction, float]]
+
+
+class DamageCalculator(ABC):
+    @abstractmethod
+    def compute_parry_multiplier(self, defender: CharacterStatus, target: CharacterStatus) -> ParryMultiplier:
+        pass
+
+    @abstractmethod
+    def compute_damage(self,
+                       base_damage: int,
+                       multipliers: Sequence[Rational],
+                       parry_multiplier: ParryMultiplier) -> int:
+        pass
+
+
+class FractionDamageCalculator(DamageCalculator):
+    def compute_parry_multiplier(self, defender: CharacterStatus, target: CharacterStatus) -> ParryMultiplier:
+        parry_effectiveness = defender.get_parry_effectiveness()
+        assist_penalty = Fraction(0) if defender is target else Fraction(1, 2)
+        return 1 - (parry_effectiveness ** float(assist_penalty + target.get_vulnerability()))
+
+    def compute_damage(self,
+                       base_damage: int,
+                       multipliers: Sequence[Rational],
+                       parry_multiplier: ParryMultiplier) -> int:
+        total_multiplier = Fraction(1, 1)
+        for multiplier in multipliers:
+            total_multiplier *= multiplier
+        if parry_multiplier is None:
+            parry_multiplier = Fraction(1, 1)
+        return ceil(base_damage*total_multiplier*parry_multiplier)
+
+
+class FixedPointDamageCalculator(DamageCalculator):
+    """
+    Keeps the type multipliers as an integer numerator and denominator, so undefended damage is an exact
+    integer ceiling division. For defended targets, the reference implementation converts the damage to a float
+    before applying the parry, so the same conversion is done here: int / int is correctly rounded, just like
+    float(Fraction), which keeps the results identical.
+    The parry multipliers only depend on the parry effectiveness, whether the defender is assisting someone else,
+    and the target's vulnerability, so each one is computed once and then looked up.
+    """
+    def __init__(self):
+        self.parry_table: Dict[Tuple[int, int, bool, int], float] = {}
+
+    def compute_parry_multiplier(self, defender: CharacterStatus, target: CharacterStatus) -> ParryMultiplier:
+        parry_effectiveness = defender.get_parry_effectiveness()
+        key = (parry_effectiveness.numerator, parry_effectiveness.denominator, defender is target,
+               target.get_vulnerability())
+        parry_multiplier = self.parry_table.get(key)
+        if parry_multiplier is None:
+            exponent = target.get_vulnerability() + (0.0 if defender is target else 0.5)
+            parry_multiplier = self.parry_table[key] = 1 - float(parry_effectiveness) ** exponent
+        return parry_multiplier
+
+    def compute_damage(self,
+                       base_damage: int,
+                       multipliers: Sequence[Rational],
+                       parry_multiplier: ParryMultiplier) -> int:
+        numerator = base_damage
+        denominator = 1
+        for multiplier in multipliers:
+            numerator *= multiplier.numerator
+            denominator *= multiplier.denominator
+        if parry_multiplier is None:
+            return -(-numerator // denominator)
+        return ceil(numerator / denominator * parry_multiplier)
+
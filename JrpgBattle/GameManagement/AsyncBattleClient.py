@@ -0,0 +1,219 @@
+"""
+The AsyncBattleClient runs the same game loop as the MainBattleClient, but on an asyncio event loop.
+Instead of spinning while a transaction is open, the battle suspends on a future which is resolved
+when the player's response is committed. This allows a single event loop to host thousands of battles
+which are waiting on slow human or remote players.
+Synchronous PlayerServers can be hosted with the PlayerServerAdapter classes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from threading import Thread
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from JrpgBattle.Attack import AttackPlan
+from JrpgBattle.BattleEventHandling.EventManagement import E
+from JrpgBattle.Character import CharacterIdentifier
+from JrpgBattle.GameManagement.MainBattleClient import MainBattleClient, BattleClient, PlayerServer, PlayerProfile, \
+    FallbackPolicy
+from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyView
+
+if TYPE_CHECKING:
+    from JrpgBattle.DamageCalculator import DamageCalculator
+    from JrpgBattle.GameManagement.BattleReplay import CommandLog
+
+
+class AsyncPlayerServer(ABC):
+    SUCCESS = 0
+    ERROR = 1
+
+    @abstractmethod
+    async def process_command_request(self,
+                                      client: AsyncBattleClient,
+                                      transaction_id: int,
+                                      team: PrivatePartyView,
+                                      enemy: PublicPartyView,
+                                      time_budget: float = None) -> int:
+        pass
+
+
+class AsyncBattleClient(MainBattleClient):
+    # how long to wait before asking a server which returned ERROR again, doubling up to the maximum
+    RETRY_DELAY = 0.01
+    MAX_RETRY_DELAY = 1.0
+
+    def __init__(self,
+                 simultaneous_planning: bool = False,
+                 command_deadline: float = None,
+                 fallback_policy: FallbackPolicy = None,
+                 command_log: CommandLog = None,
+                 damage_calculator: DamageCalculator = None):
+        MainBattleClient.__init__(self, simultaneous_planning, command_deadline, fallback_policy, command_log,
+                                  damage_calculator)
+        self.pending_responses: Dict[int, asyncio.Future] = {}
+
+    def handle_event(self, event: E) -> bool:
+        logging.info('%s', event)
+        return False
+
+    def announce_winner(self, winner: PlayerProfile):
+        logging.info('%s wins!', winner.party.name)
+
+    async def start_battle(self, max_turns: int = None) -> Optional[PlayerProfile]:
+        self.reset_battle()
+        return await self.resume(max_turns)
+
+    async def resume(self, max_turns: int = None) -> Optional[PlayerProfile]:
+        while self.winner is None and not self.turn_limit_reached(max_turns):
+            await self.play_turn()
+        return self.winner
+
+    async def play_turn(self):
+        player = self.begin_turn()
+        if player is None:
+            return
+        if self.simultaneous_planning:
+            await asyncio.gather(*(self.request_commands(other) for other in list(self.roster)))
+        else:
+            await self.run_planning_phase(player)
+        self.finish_turn()
+
+    async def run_planning_phase(self, player: PlayerProfile):
+        await self.request_commands(player)
+        player.party.end_turn()
+
+    async def request_commands(self, player: PlayerProfile):
+        transaction_id = self.open_transaction(player)
+        response = asyncio.get_running_loop().create_future()
+        self.pending_responses[transaction_id] = response
+        try:
+            await asyncio.wait_for(self.exchange_commands(player, transaction_id, response),
+                                   self.get_time_budget(transaction_id))
+        except asyncio.TimeoutError:
+            self.expire_transaction(transaction_id)
+
+    async def exchange_commands(self, player: PlayerProfile, transaction_id: int, response: asyncio.Future):
+        team = self.get_team_view(player.party)
+        delay = AsyncBattleClient.RETRY_DELAY
+        while await player.server.process_command_request(self,
+                                                          transaction_id,
+                                                          team,
+                                                          player.opponents,
+                                                          time_budget=self.get_time_budget(transaction_id)) \
+                != AsyncPlayerServer.SUCCESS:
+            # back off instead of spinning the event loop, unless the response arrives in the meantime;
+            # wait leaves the future alone, so it can still be awaited below
+            await asyncio.wait((response,), timeout=delay)
+            if response.done():
+                break
+            delay = min(delay * 2, AsyncBattleClient.MAX_RETRY_DELAY)
+        # the server may respond after its request returns, so wait until the transaction is closed
+        await response
+
+    async def process_command_response(self,
+                                       attacks: List[AttackPlan],
+                                       defenses: Dict[CharacterIdentifier, CharacterIdentifier],
+                                       transaction_id: int) -> int:
+        return self.commit_command_response(attacks, defenses, transaction_id)
+
+    def commit_command_response(self,
+                                attacks: List[AttackPlan],
+                                defenses: Dict[CharacterIdentifier, CharacterIdentifier],
+                                transaction_id: int) -> int:
+        rval = MainBattleClient.commit_command_response(self, attacks, defenses, transaction_id)
+        if rval == BattleClient.SUCCESS:
+            response = self.pending_responses.pop(transaction_id)
+            # the future is cancelled if the deadline passed while the battle was waiting on it
+            if not response.done():
+                response.set_result(None)
+        return rval
+
+
+async def run_battles(*clients: AsyncBattleClient, max_turns: int = None) -> List[Optional[PlayerProfile]]:
+    return await asyncio.gather(*(client.start_battle(max_turns) for client in clients))
+
+
+class _SyncClientProxy(BattleClient):
+    """
+    Gives synchronous PlayerServers a synchronous BattleClient to respond to.
+    If the server runs on a worker thread, the response is handed back to the event loop's thread.
+    """
+    def __init__(self, client: AsyncBattleClient, loop: asyncio.AbstractEventLoop = None):
+        self.client = client
+        self.loop = loop
+
+    def process_command_response(self,
+                                 attacks: List[AttackPlan],
+                                 defenses: Dict[CharacterIdentifier, CharacterIdentifier],
+                                 transaction_id: int) -> int:
+        if self.loop is None:
+            return self.client.commit_command_response(attacks, defenses, transaction_id)
+        return asyncio.run_coroutine_threadsafe(self.client.process_command_response(attacks,
+                                                                                     defenses,
+                                                                                     transaction_id),
+                                                self.loop).result()
+
+
+class PlayerServerAdapter(AsyncPlayerServer):
+    """
+    Runs a synchronous PlayerServer directly on the event loop.
+    Only suitable for servers which never block, such as the AggroNonPlayerServer.
+    """
+    def __init__(self, server: PlayerServer):
+        self.server = server
+
+    async def process_command_request(self,
+                                      client: AsyncBattleClient,
+                                      transaction_id: int,
+                                      team: PrivatePartyView,
+                                      enemy: PublicPartyView,
+                                      time_budget: float = None) -> int:
+        return self.server.process_command_request(_SyncClientProxy(client),
+                                                   transaction_id,
+                                                   team,
+                                                   enemy,
+                                                   time_budget=time_budget)
+
+
+class ThreadedPlayerServerAdapter(AsyncPlayerServer):
+    """
+    Runs each request of a synchronous PlayerServer on its own daemon thread.
+    This is the adapter to use for servers which block, e.g. on input().
+    The event loop's default executor isn't used, since asyncio.run waits for its threads to finish,
+    and a server still blocked on a request which expired would keep the battle from ever returning.
+    """
+    def __init__(self, server: PlayerServer):
+        self.server = server
+
+    async def process_command_request(self,
+                                      client: AsyncBattleClient,
+                                      transaction_id: int,
+                                      team: PrivatePartyView,
+                                      enemy: PublicPartyView,
+                                      time_budget: float = None) -> int:
+        loop = asyncio.get_running_loop()
+        proxy = _SyncClientProxy(client, loop)
+        result = loop.create_future()
+
+        def run_request():
+            try:
+                rval = self.server.process_command_request(proxy, transaction_id, team, enemy, time_budget)
+                outcome = (result.set_result, rval)
+            except BaseException as error:
+                outcome = (result.set_exception, error)
+            try:
+                loop.call_soon_threadsafe(_settle, result, *outcome)
+            except RuntimeError:  # the event loop was closed while the server was still blocked
+                pass
+
+        Thread(target=run_request, name=f'transaction {transaction_id}', daemon=True).start()
+        return await result
+
+
+def _settle(future: asyncio.Future, setter, value):
+    # the future is cancelled if the request's deadline passed while the server was still blocked
+    if not future.done():
+        setter(value)
@@ -0,0 +1,251 @@
+"""
+Deterministic battle replay.
+A CommandLog attached to a MainBattleClient records the commands of every committed transaction,
+along with a keyframe of the battle state every few turns. Since the battle itself is deterministic,
+the ReplayBattleClient can re-run the battle from the log alone, without any PlayerServers.
+Seeking to a turn restores the closest keyframe at or before it and only simulates the turns after the keyframe.
+Everything in the log is stored by name, so the log can be saved and replayed in another process
+against freshly built copies of the original parties.
+"""
+
+from __future__ import annotations
+
+import bisect
+import pickle
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from JrpgBattle.Attack import AttackPlan, AttackQueue, DetailedAttackPlan
+from JrpgBattle.Character import CharacterIdentifier, CharacterStatus, Multiplier
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import BattleClient, PlayerProfile, PlayerServer, BattleSnapshot, \
+    MainBattleClient
+from JrpgBattle.Party import Party
+
+# attack name, user name, target names
+PlanRecord = Tuple[str, str, Tuple[str, ...]]
+
+
+class CommandRecord:
+    def __init__(self,
+                 turn: int,
+                 party: str,
+                 attacks: List[PlanRecord],
+                 defenses: List[Tuple[str, str]]):  # (defender name, target name) pairs
+        self.turn = turn
+        self.party = party
+        self.attacks = attacks
+        self.defenses = defenses
+
+
+def affinities_of(character: CharacterStatus) -> Tuple[Multiplier, ...]:
+    """
+    The character's multipliers in a fixed order, so its public multipliers can be stored by index:
+    multipliers have no names, and the ones with an is_relevant callable can't be saved.
+    """
+    return tuple(character.offensive_type_affinities) + tuple(character.defensive_type_affinities)
+
+
+class BattleKeyframe:
+    """The mutable state of a battle at the start of a turn, before the turn's attack phase."""
+    CHARACTER_FIELDS = ('current_hp', 'current_sp', 'sp_spent', 'current_ap', 'stagger',
+                        'vulnerability', 'was_attacked', 'dead')
+
+    def __init__(self,
+                 turn: int,
+                 battle_round: int,
+                 next_player: int,  # the roster index of the player whose turn it is
+                 simultaneous_planning: bool,
+                 roster: List[str],  # the names of the parties still in the battle, in roster order
+                 characters: Dict[str, Tuple],
+                 defenses: List[Tuple[str, str]],
+                 public_attacks: Dict[str, List[str]],
+                 # the indices of the public offensive and defensive multipliers in the character's affinities
+                 public_multipliers: Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...]]],
+                 party_mp: Dict[str, int],
+                 attack_queues: Dict[str, List[Tuple[str, str, Tuple[str, ...], int]]]):
+        self.turn = turn
+        self.battle_round = battle_round
+        self.next_player = next_player
+        self.simultaneous_planning = simultaneous_planning
+        self.roster = roster
+        self.characters = characters
+        self.defenses = defenses
+        self.public_attacks = public_attacks
+        self.public_multipliers = public_multipliers
+        self.party_mp = party_mp
+        self.attack_queues = attack_queues
+
+    @staticmethod
+    def capture(client: MainBattleClient, next_player: int) -> BattleKeyframe:
+        characters = {}
+        defenses = []
+        public_attacks = {}
+        public_multipliers = {}
+        party_mp = {}
+        attack_queues = {}
+        for player in client.roster:
+            party_mp[player.party.name] = player.party.get_mp()
+            attack_queues[player.party.name] = [(plan.attack.name,
+                                                 plan.user.character_name,
+                                                 tuple(target.character_name for target in plan.targets),
+                                                 plan.status)
+                                                for plan in player.party.attack_queue]
+        for character in client.characters_ids.values():
+            name = character.character_name
+            characters[name] = tuple(getattr(character, field) for field in BattleKeyframe.CHARACTER_FIELDS)
+            if character.is_defending is not None:
+                defenses.append((name, character.is_defending.character_name))
+            public_attacks[name] = [attack.name for attack in character.public_attack_list]
+            affinities = affinities_of(character)
+            public_multipliers[name] = tuple(tuple(index for index, multiplier in enumerate(affinities)
+                                                   if multiplier in public)
+                                             for public in (character.public_offensive_multipliers,
+                                                            character.public_defensive_multipliers))
+        return BattleKeyframe(client.turn,
+                              client.battle_round,
+                              next_player,
+                              client.simultaneous_planning,
+                              [player.party.name for player in client.roster],
+                              characters,
+                              defenses,
+                              public_attacks,
+                              public_multipliers,
+                              party_mp,
+                              attack_queues)
+
+    def restore(self, client: ReplayBattleClient):
+        client.turn = self.turn
+        client.battle_round = self.battle_round
+        client.winner = None
+        client.set_roster([client.players[name] for name in self.roster])
+        client.turn_order = client.roster[self.next_player:]
+        client.phase = MainBattleClient.ATTACK_PHASE
+        # the states are set as a whole, so every character is marked dirty and sent in full to delta servers
+        for name, values in self.characters.items():
+            character = client.characters[name]
+            affinities = affinities_of(character)
+            offensive, defensive = ([affinities[index] for index in indices]
+                                    for indices in self.public_multipliers[name])
+            public_attacks = [client.get_attack(character, attack) for attack in self.public_attacks[name]]
+            character.set_state(values + (None, None, public_attacks, offensive, defensive))
+        for defender, target in self.defenses:
+            client.characters[defender].set_defense(client.characters[target])
+        client.eliminations.eliminated.clear()
+        for player in client.players.values():
+            player.party.count_alive()
+        for party_name, plans in self.attack_queues.items():
+            queue = AttackQueue()
+            for attack, user, targets, status in plans:
+                user_status = client.characters[user]
+                queue.enqueue(DetailedAttackPlan(client.get_attack(user_status, attack),
+                                                 user_status,
+                                                 {client.characters[target] for target in targets},
+                                                 status))
+            party = client.players[party_name].party
+            party.set_state((queue, tuple(plan.status for plan in queue), self.party_mp[party_name],
+                             party.alive_count))
+
+
+class CommandLog:
+    def __init__(self, keyframe_interval: int = 10):  # the number of turns between keyframes
+        self.keyframe_interval = keyframe_interval
+        self.commands: Dict[Tuple[int, str], CommandRecord] = {}
+        self.keyframes: List[BattleKeyframe] = []
+        self.keyframe_turns: List[int] = []
+
+    def record_commands(self,
+                        turn: int,
+                        party: Party,
+                        attacks: List[AttackPlan],
+                        defenses: Dict[CharacterIdentifier, CharacterIdentifier]):
+        self.commands[(turn, party.name)] = CommandRecord(
+            turn,
+            party.name,
+            [(plan.attack.name, plan.user.identifier, tuple(target.identifier for target in plan.targets))
+             for plan in attacks],
+            [(defender.identifier, target.identifier) for defender, target in defenses.items()])
+
+    def record_keyframe(self, client: MainBattleClient, next_player: int):
+        # the first turn is always captured, since it holds the starting state of the battle
+        if (client.turn - 1) % self.keyframe_interval != 0:
+            return
+        if self.keyframe_turns and self.keyframe_turns[-1] >= client.turn:
+            return
+        self.keyframes.append(BattleKeyframe.capture(client, next_player))
+        self.keyframe_turns.append(client.turn)
+
+    def get_commands(self, turn: int, party_name: str) -> CommandRecord:
+        record = self.commands.get((turn, party_name))
+        if record is None:
+            raise ValueError(f'No commands were recorded for team {party_name} on turn {turn}')
+        return record
+
+    def get_keyframe(self, turn: int) -> BattleKeyframe:
+        """Returns the last keyframe captured at or before the turn."""
+        index = bisect.bisect_right(self.keyframe_turns, turn) - 1
+        if index < 0:
+            raise ValueError(f'No keyframe was recorded at or before turn {turn}')
+        return self.keyframes[index]
+
+    def dump(self, stream: BinaryIO):
+        pickle.dump(self, stream)
+
+    @staticmethod
+    def load(stream: BinaryIO) -> CommandLog:
+        return pickle.load(stream)
+
+
+class ReplayBattleClient(HeadlessBattleClient):
+    """
+    Re-runs a recorded battle. Instead of asking PlayerServers for commands, every transaction is answered
+    with the commands recorded for it. The parties have to be registered just like in the original battle,
+    but their starting state comes from the log's first keyframe.
+    """
+    def __init__(self, command_log: CommandLog):
+        first_keyframe = command_log.get_keyframe(1)
+        super().__init__(simultaneous_planning=first_keyframe.simultaneous_planning)
+        self.replay_log = command_log
+        self.players: Dict[str, PlayerProfile] = {}
+        self.characters: Dict[str, CharacterStatus] = {}
+        # keyframes are decoded once, after which seeking to them restores an in-memory snapshot
+        self.keyframe_snapshots: Dict[int, BattleSnapshot] = {}
+
+    def register_party(self, party: Party, server: PlayerServer = None, alliance: str = None) -> int:
+        rval = super().register_party(party, server, alliance)
+        if rval == BattleClient.SUCCESS:
+            self.players[party.name] = self.roster[-1]
+            for character in party:
+                self.characters[character.character_name] = character
+        return rval
+
+    def get_attack(self, character: CharacterStatus, attack_name: str):
+        return next(attack for attack in character.attack_list if attack.name == attack_name)
+
+    def seek(self, turn: int):
+        """Positions the battle at the start of the turn, before its attack phase."""
+        keyframe = self.replay_log.get_keyframe(turn)
+        snapshot = self.keyframe_snapshots.get(keyframe.turn)
+        if snapshot is None:
+            keyframe.restore(self)
+            self.keyframe_snapshots[keyframe.turn] = self.snapshot()
+        else:
+            self.restore(snapshot)
+        while self.winner is None and self.turn < turn:
+            self.play_turn()
+
+    def start_battle(self, max_turns: int = None) -> Optional[PlayerProfile]:
+        self.seek(1)
+        return self.resume(max_turns)
+
+    def dispatch_command_request(self, player: PlayerProfile, transaction_id: int):
+        record = self.replay_log.get_commands(self.turn, player.party.name)
+        attacks = []
+        for attack, user, targets in record.attacks:
+            user_status = self.characters[user]
+            attacks.append(AttackPlan(user_status,
+                                      self.get_attack(user_status, attack),
+                                      {self.characters[target] for target in targets}))
+        defenses = {self.characters[defender]: self.characters[target] for defender, target in record.defenses}
+        if self.process_command_response(attacks, defenses, transaction_id) != BattleClient.SUCCESS:
+            raise ValueError(f'The commands recorded for team {player.party.name} on turn {self.turn} were rejected')
+        return None
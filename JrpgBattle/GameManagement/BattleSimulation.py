@@ -0,0 +1,121 @@
+"""
+Headless battle simulation.
+The HeadlessBattleClient runs a battle to completion without any console IO, which makes it suitable for
+balance testing and AI training. The BatchBattleRunner builds on top of it to run large numbers of battles
+across a process pool. Since battles have to be built inside the worker processes, the runner is given a
+setup function which builds the parties and PlayerServers for a battle from the battle's index.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from JrpgBattle.BattleEventHandling.EventManagement import E
+from JrpgBattle.GameManagement.MainBattleClient import MainBattleClient, PlayerServer, PlayerProfile, BattleClient
+from JrpgBattle.Party import Party
+
+BattleSetup = Callable[[int], Iterable[Tuple[Party, PlayerServer]]]
+
+
+class BattleResult:
+    def __init__(self,
+                 winner: Optional[str],  # the name of the winning party; None if the turn limit was reached
+                 turns: int,
+                 rounds: int,
+                 hp: Dict[str, int]):  # the remaining hp of every character, keyed by character name
+        self.winner = winner
+        self.turns = turns
+        self.rounds = rounds
+        self.hp = hp
+
+    def __repr__(self):
+        return f'BattleResult(winner={self.winner}, turns={self.turns}, rounds={self.rounds}, hp={self.hp})'
+
+    def is_draw(self) -> bool:
+        return self.winner is None
+
+
+class HeadlessBattleClient(MainBattleClient):
+    """
+    A MainBattleClient which never blocks on or writes to the console.
+    It doesn't observe the battle's events, so unless something else is listening
+    they are never even constructed. The winner is reported through the BattleResult instead.
+    """
+    def observe_party(self, party: Party):
+        pass
+
+    def handle_event(self, event: E) -> bool:
+        return False
+
+    def announce_winner(self, winner: PlayerProfile):
+        pass
+
+    def build_result(self) -> BattleResult:
+        winner = self.winner.party.get_name() if self.winner is not None else None
+        hp = {character.get_character_name(): character.get_current_hp()
+              for character in self.characters_ids.values()}
+        return BattleResult(winner, self.get_turns_played(), self.battle_round, hp)
+
+
+def simulate_battle(players: Iterable[Tuple[Party, PlayerServer]], max_turns: int = None) -> BattleResult:
+    client = HeadlessBattleClient()
+    for party, server in players:
+        if client.register_party(party, server) != BattleClient.SUCCESS:
+            raise ValueError(f'Party {party.get_name()} could not be registered')
+    client.start_battle(max_turns)
+    return client.build_result()
+
+
+def _simulate_chunk(setup: BattleSetup, start: int, stop: int, max_turns: Optional[int]) -> List[BattleResult]:
+    return [simulate_battle(setup(index), max_turns) for index in range(start, stop)]
+
+
+class BatchReport:
+    def __init__(self, results: List[BattleResult], elapsed: float):
+        self.results = results
+        self.elapsed = elapsed  # wall clock time in seconds
+
+    def __repr__(self):
+        return f'{len(self.results)} battles in {self.elapsed:.2f}s ({self.get_battles_per_second():.1f} battles/s)'
+
+    def get_battles_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def get_win_counts(self) -> Dict[Optional[str], int]:
+        counts: Dict[Optional[str], int] = {}
+        for result in self.results:
+            counts[result.winner] = counts.get(result.winner, 0) + 1
+        return counts
+
+
+class BatchBattleRunner:
+    """
+    Spreads headless battles across a process pool.
+    The setup function must be picklable (i.e. defined at module level), since it is sent to the workers.
+    Battles are handed out in chunks to keep the inter-process overhead low.
+    """
+    def __init__(self,
+                 setup: BattleSetup,
+                 max_workers: int = None,
+                 chunk_size: int = 100,
+                 max_turns: int = None):
+        self.setup = setup
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_turns = max_turns
+
+    def run(self, battle_count: int) -> BatchReport:
+        start_time = time.perf_counter()
+        results: List[BattleResult] = []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_simulate_chunk,
+                                       self.setup,
+                                       start,
+                                       min(start + self.chunk_size, battle_count),
+                                       self.max_turns)
+                       for start in range(0, battle_count, self.chunk_size)]
+            for future in futures:
+                results.extend(future.result())
+        return BatchReport(results, time.perf_counter() - start_time)
@@ -9,19 +9,29 @@ the request, it processes it and sends a attacks containing the requested action
 from __future__ import annotations
 
 import logging
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Condition, Thread
+from typing import Dict, List, Optional, Tuple, FrozenSet, NamedTuple, TYPE_CHECKING
 from abc import ABC, abstractmethod
 
 from JrpgBattle.BattleEventHandling.EventManagement import EventObserver, E
-from JrpgBattle.Party import Party, PartyIdentifier
-from JrpgBattle.Character import CharacterStatus, CharacterIdentifier
-from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyView
-from JrpgBattle.Attack import AttackPlan, AttackQueue, DetailedAttackPlan
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent, PartyEventType
+from JrpgBattle.Party import Party, PartyIdentifier, PartyState
+from JrpgBattle.Character import CharacterStatus, CharacterIdentifier, CharacterState
+from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyView, PublicPartyGroupView, PartySnapshot
+from JrpgBattle.Attack import Attack, AttackPlan, AttackQueue, DetailedAttackPlan
+from JrpgBattle.DamageCalculator import DamageCalculator, FractionDamageCalculator
+from JrpgBattle.ViewDeltas import ViewDelta, ChangeJournal, full_view_delta
+
+if TYPE_CHECKING:
+    from JrpgBattle.GameManagement.BattleReplay import CommandLog
 
 
 class BattleClient(ABC):
     SUCCESS = 0
     ERROR = 1
+    EXPIRED = 2  # the transaction was already closed, e.g. because its deadline passed
 
     @abstractmethod
     def process_command_response(self,
@@ -46,7 +56,15 @@ class PlayerServer(ABC):
                                 client: BattleClient,
                                 transaction_id: int,
                                 team: PrivatePartyView,
-                                enemy: PublicPartyView) -> int:
+                                enemy: PublicPartyGroupView,
+                                time_budget: float = None) -> int:
+        """
+        enemy is a view of every opposing party still in the battle, and team.get_allies() is a view of the
+        parties fighting alongside the team. The same view objects are passed in for the whole battle.
+        A MainBattleClient also offers get_turn_snapshot, an immutable copy of every party's public state.
+        time_budget is the number of seconds left before the transaction expires,
+        or None if the BattleClient doesn't enforce deadlines.
+        """
         pass
 
     # @abstractmethod
@@ -57,10 +75,67 @@ class PlayerServer(ABC):
     #     pass
 
 
+class DeltaPlayerServer(PlayerServer):
+    """
+    An optional PlayerServer protocol for servers which keep their own copy of their views, e.g. in a ViewMirror.
+    A MainBattleClient only sends them the changes since the last transaction they acknowledged,
+    and returning SUCCESS from process_delta_request acknowledges the transaction.
+    A server which has lost its copy, or can't apply a delta to it, returns RESYNC to be sent the full state.
+    Other clients call process_command_request, which is passed on as a delta of the views' full state.
+    """
+    RESYNC = 2
+
+    @abstractmethod
+    def process_delta_request(self,
+                              client: BattleClient,
+                              transaction_id: int,
+                              delta: ViewDelta,
+                              time_budget: float = None) -> int:
+        pass
+
+    def process_command_request(self,
+                                client: BattleClient,
+                                transaction_id: int,
+                                team: PrivatePartyView,
+                                enemy: PublicPartyGroupView,
+                                time_budget: float = None) -> int:
+        return self.process_delta_request(client, transaction_id, full_view_delta(transaction_id, team, enemy),
+                                          time_budget)
+
+
+class FallbackPolicy(ABC):
+    """
+    A FallbackPolicy fills in a player's turn when their PlayerServer misses the transaction deadline.
+    """
+    @abstractmethod
+    def choose_commands(self,
+                        team: PrivatePartyView,
+                        enemy: PublicPartyView) -> Tuple[List[AttackPlan], Dict[CharacterIdentifier,
+                                                                                CharacterIdentifier]]:
+        pass
+
+
+class RestFallbackPolicy(FallbackPolicy):
+    def choose_commands(self,
+                        team: PrivatePartyView,
+                        enemy: PublicPartyView) -> Tuple[List[AttackPlan], Dict[CharacterIdentifier,
+                                                                                CharacterIdentifier]]:
+        return [], {}
+
+
 class PlayerProfile:
-    def __init__(self, player_id: int, party: Party, server: PlayerServer):
+    """
+    A party registered in a battle, along with the PlayerServer which plans its turns.
+    Parties in the same alliance fight on the same side; by default, every party is in an alliance of its own.
+    The views of the player's opponents and allies are kept up to date by the MainBattleClient.
+    """
+    def __init__(self, player_id: int, party: Party, server: PlayerServer, alliance: str = None):
         self.party = party
         self.server = server
+        self.alliance = alliance if alliance is not None else party.name
+        self.opponents = PublicPartyGroupView()
+        self.allies = PublicPartyGroupView()
+        self.acknowledged: Optional[int] = None  # the last transaction whose ViewDelta a DeltaPlayerServer applied
 
     def __eq__(self, other):
         return isinstance(other, PlayerProfile) and self.party == other.party
@@ -69,31 +144,204 @@ class PlayerProfile:
         return hash(self.party)
 
 
+class BattleSnapshot:
+    """
+    The mutable state of a battle, as captured by MainBattleClient.snapshot.
+    Characters and parties are referenced rather than copied, so a snapshot can only be restored
+    into the client it was taken from.
+    """
+    def __init__(self,
+                 turn: int,
+                 battle_round: int,
+                 winner: Optional[PlayerProfile],
+                 roster: Tuple[PlayerProfile, ...],
+                 turn_order: Tuple[PlayerProfile, ...],  # the players yet to finish their turn this round
+                 phase: int,  # the phase of the current turn which runs next
+                 characters: Tuple[CharacterStatus, ...],
+                 character_states: List[CharacterState],
+                 parties: Tuple[Party, ...],
+                 party_states: List[PartyState]):
+        self.turn = turn
+        self.battle_round = battle_round
+        self.winner = winner
+        self.roster = roster
+        self.turn_order = turn_order
+        self.phase = phase
+        self.characters = characters
+        self.character_states = character_states
+        self.parties = parties
+        self.party_states = party_states
+
+
+class TurnSnapshot(NamedTuple):
+    """
+    The public state of every party still in the battle, frozen when the current planning phase opened.
+    It's shared by every player planning in that phase, so AI servers can read it without going through the views.
+    """
+    turn: int
+    parties: Tuple[PartySnapshot, ...]
+
+
+class EliminationObserver(EventObserver[PartyEvent]):
+    """Collects the parties which have been wiped out, so the battle loop doesn't have to poll every party."""
+    def __init__(self):
+        EventObserver.__init__(self)
+        self.eliminated: List[Party] = []
+
+    def handle_event(self, event: PartyEvent) -> bool:
+        self.eliminated.append(event.party)
+        return False
+
+
 class MainBattleClient(BattleClient, EventObserver):
+    # the phases of a turn: the attack phase executes the plans queued on the previous turn and goes through upkeep,
+    # then the planning phase asks the player for the plans of the next turn
+    ATTACK_PHASE = 0
+    PLANNING_PHASE = 1
+
     # def __init__(self,
     #              roster: Set[Tuple[Party, PlayerServer]] = set()):
-    def __init__(self):
+    def __init__(self,
+                 simultaneous_planning: bool = False,
+                 command_deadline: float = None,  # seconds each player gets to respond; None waits forever
+                 fallback_policy: FallbackPolicy = None,  # plans the turns of players who miss the deadline
+                 command_log: CommandLog = None,  # records the battle so that it can be replayed
+                 damage_calculator: DamageCalculator = None):  # does the damage math of every attack
         EventObserver.__init__(self)
         self.roster: List[PlayerProfile] = []
         self.characters_ids: Dict[CharacterIdentifier, CharacterStatus] = {}
         self.party_ids: Dict[PartyIdentifier, Party] = {}
+        self.profiles: Dict[PartyIdentifier, PlayerProfile] = {}
+        # the views are built once per party and handed to the servers for the whole battle
+        self.public_views: Dict[PartyIdentifier, PublicPartyView] = {}
+        self.team_views: Dict[PartyIdentifier, PrivatePartyView] = {}
+        self.turn_snapshot: Optional[TurnSnapshot] = None
+        # the changes which DeltaPlayerServers haven't acknowledged yet, and the deltas of their open transactions
+        self.change_journal = ChangeJournal()
+        self.transaction_deltas: Dict[int, ViewDelta] = {}
+        # the number of players left in each alliance; the battle is over once a single alliance remains
+        self.alliance_sizes: Dict[str, int] = {}
+        # indexes used to validate attack plans without searching the roster
+        self.character_parties: Dict[CharacterIdentifier, Party] = {}
+        self.character_attacks: Dict[CharacterIdentifier, FrozenSet[Attack]] = {}
+        # the membership_version of each party when it was indexed, so members who joined later can be added
+        self.indexed_versions: Dict[PartyIdentifier, int] = {}
         self.transaction_count = 0
         self.open_transactions: Dict[int, Party] = {}
-
-    def register_party(self, party: Party, server: PlayerServer) -> int:
+        self.battle_round: int = 0
+        self.turn: int = 0
+        self.winner: Optional[PlayerProfile] = None
+        # the players who haven't finished their turn in the current round, starting with the one whose turn it is;
+        # in simultaneous mode, every player takes the round's one turn together
+        self.turn_order: List[PlayerProfile] = []
+        self.phase = MainBattleClient.ATTACK_PHASE
+        # guards open_transactions and every commit, since players may respond from their own threads
+        self.transaction_lock = Condition()
+        self.simultaneous_planning = simultaneous_planning
+        self.planning_executor: Optional[ThreadPoolExecutor] = None
+        self.command_deadline = command_deadline
+        self.fallback_policy = fallback_policy if fallback_policy is not None else RestFallbackPolicy()
+        self.transaction_deadlines: Dict[int, float] = {}
+        self.command_log = command_log
+        self.damage_calculator = damage_calculator if damage_calculator is not None else FractionDamageCalculator()
+        self.eliminations = EliminationObserver()
+
+    def register_party(self, party: Party, server: PlayerServer, alliance: str = None) -> int:
+        """
+        Adds the party to the battle. Parties which are given the same alliance fight together,
+        while a party without an alliance fights every other party.
+        """
         # TODO CON: is the assignment of player ids here safe?
-        new_player = PlayerProfile(len(self.roster), party, server)
-        if new_player in self.roster or set(party.characters) & set(self.characters_ids):
+        new_player = PlayerProfile(len(self.roster), party, server, alliance)
+        if new_player in self.roster or any(character in self.characters_ids for character in party.characters):
             return BattleClient.ERROR
         self.roster.append(new_player)
         self.party_ids[party] = party
-        # TODO: Find better way to add the character ids
-        party.register_observer(self)
-        for character in party.characters:
-            self.characters_ids[character] = character
-            character.register_observer(self)
+        self.profiles[party] = new_player
+        self.public_views[party] = PublicPartyView(party)
+        self.team_views[party] = PrivatePartyView(party, new_player.allies)
+        self.alliance_sizes[new_player.alliance] = self.alliance_sizes.get(new_player.alliance, 0) + 1
+        for player in self.roster[:-1]:
+            self.link_players(player, new_player)
+        self.index_party(party)
+        party.register_observer(self.eliminations, PartyEventType.WIPED_OUT)
+        if party.is_wiped_out():
+            self.eliminations.eliminated.append(party)
+        self.observe_party(party)
         return BattleClient.SUCCESS
 
+    def index_party(self, party: Party):
+        """Adds the party's members to the indexes used to look up and validate plans."""
+        self.characters_ids.update(zip(party.characters, party.characters))
+        for character in party.characters:
+            self.character_parties[character] = party
+            self.character_attacks[character] = character.get_attack_list()
+        self.indexed_versions[party] = party.membership_version
+
+    def refresh_indexes(self):
+        """Indexes the members who joined their parties after they were indexed, e.g. through Party.spawn."""
+        for party in self.party_ids.values():
+            if self.indexed_versions[party] != party.membership_version:
+                self.index_party(party)
+
+    def link_players(self, player: PlayerProfile, other: PlayerProfile):
+        """Adds each player to the other's view of its allies or of its opponents."""
+        if player.alliance == other.alliance:
+            player.allies.add(self.public_views[other.party])
+            other.allies.add(self.public_views[player.party])
+        else:
+            player.opponents.add(self.public_views[other.party])
+            other.opponents.add(self.public_views[player.party])
+
+    def set_roster(self, roster: List[PlayerProfile]):
+        """Replaces the players still in the battle, e.g. when restoring an earlier state, and relinks their views."""
+        self.roster = list(roster)
+        self.alliance_sizes = {}
+        for player in self.roster:
+            player.opponents.clear()
+            player.allies.clear()
+            self.alliance_sizes[player.alliance] = self.alliance_sizes.get(player.alliance, 0) + 1
+        for index, player in enumerate(self.roster):
+            for other in self.roster[:index]:
+                self.link_players(other, player)
+
+    def snapshot(self) -> BattleSnapshot:
+        """
+        Captures the state of the battle, so that it can be rolled back with restore and played on with resume.
+        Open transactions aren't part of the snapshot: a snapshot taken while the players are planning
+        asks them for their commands again once it's resumed.
+        """
+        characters = tuple(self.characters_ids.values())
+        parties = tuple(self.party_ids.values())
+        return BattleSnapshot(self.turn,
+                              self.battle_round,
+                              self.winner,
+                              tuple(self.roster),
+                              tuple(self.turn_order),
+                              self.phase,
+                              characters,
+                              [character.get_state() for character in characters],
+                              parties,
+                              [party.get_state() for party in parties])
+
+    def restore(self, snapshot: BattleSnapshot):
+        self.turn = snapshot.turn
+        self.battle_round = snapshot.battle_round
+        self.winner = snapshot.winner
+        self.set_roster(snapshot.roster)
+        self.turn_order = list(snapshot.turn_order)
+        self.phase = snapshot.phase
+        self.eliminations.eliminated.clear()
+        self.turn_snapshot = None
+        for character, state in zip(snapshot.characters, snapshot.character_states):
+            character.set_state(state)
+        for party, state in zip(snapshot.parties, snapshot.party_states):
+            party.set_state(state)
+
+    def observe_party(self, party: Party):
+        # the party passes on its members' events, so the members don't need to be registered with one by one
+        party.register_observer(self)
+
     """
     Runs the game loop for the battle system. 
     This loop is separate from the main game loop, which will run in real time and handle player IO.
@@ -106,79 +354,330 @@ class MainBattleClient(BattleClient, EventObserver):
         input(str(event))
         # logging.info(str(event))
 
-    def start_battle(self):
-        battle_round = 1
-        turn = 1
-        winner = None
-        while winner is None:
-            # loop every player once per round
+    def announce_winner(self, winner: PlayerProfile):
+        print(f'{winner.party.name} wins!')
+
+    def start_battle(self, max_turns: int = None) -> Optional[PlayerProfile]:
+        """
+        Runs turns until only one player remains and returns that player's profile.
+        If max_turns is set, the battle is abandoned after that many turns and None is returned.
+        """
+        self.reset_battle()
+        return self.resume(max_turns)
+
+    def reset_battle(self):
+        self.battle_round = 0
+        self.turn = 1
+        self.winner = None
+        self.turn_order = []
+        self.phase = MainBattleClient.ATTACK_PHASE
+        if self.simultaneous_planning:
             for player in self.roster:
-                team = player.party
-                # start turn by executing existing plans
-                # for member in team:
-                #     member.start_turn()
-                team.start_turn()
-
-                for plan in team.attack_queue:
-                    plan.execute()
-
-                for p in self.roster:
-                    if p.party.is_wiped_out():
-                        # TODO: Implement logic for finishing game
-                        self.roster.remove(p)
-                        if len(self.roster) == 1:
-                            winner = self.roster[0]
-                            print(f'{winner.party.name} wins!')
-                if winner is not None:
-                    break
-
-                # for member in team:
-                #     member.turn_interval()
-                team.turn_interval()
-
-                # once existing plans have been executed, the player plans their next turn
-                self.open_transactions[self.transaction_count] = player.party  # open transaction for the player
-                # TODO FEAT: support more than two registered players
-                enemy = next(opponent.party for opponent in self.roster if not team == opponent.party)
-                while player.server.process_command_request(self,
-                                                            self.transaction_count,
-                                                            PrivatePartyView(team),
-                                                            PublicPartyView(enemy)) != PlayerServer.SUCCESS:
-                    continue
-                while self.open_transactions:
-                    continue
-                self.transaction_count += 1
-
-                team.end_turn()
-
-                turn += 1
-            battle_round += 1
+                player.party.start_turn()
+
+    def resume(self, max_turns: int = None) -> Optional[PlayerProfile]:
+        """
+        Plays the battle on from where it stands, e.g. after it was stopped by its turn limit or restored from a
+        snapshot, until only one player remains or max_turns turns have been played in total.
+        """
+        if self.simultaneous_planning:
+            self.planning_executor = ThreadPoolExecutor(max_workers=len(self.roster))
+        try:
+            while self.winner is None and not self.turn_limit_reached(max_turns):
+                self.play_turn()
+        finally:
+            if self.planning_executor is not None:
+                self.planning_executor.shutdown()
+                self.planning_executor = None
+        return self.winner
+
+    def play_turn(self):
+        """Plays the rest of the current turn. In simultaneous mode, that's the rest of the round."""
+        player = self.begin_turn()
+        if player is None:
+            return
+        if self.simultaneous_planning:
+            self.run_simultaneous_planning_phase()
+        else:
+            self.run_planning_phase(player)
+        self.finish_turn()
+
+    def begin_turn(self) -> Optional[PlayerProfile]:
+        """
+        Finds whose turn it is, starting a new round once every player has had their turn, and runs the turn's
+        attack phase unless it already ran. Returns the player, or None if the attack phase won the battle.
+        """
+        # players who are knocked out partway through a round lose their turn
+        while self.turn_order and self.turn_order[0] not in self.roster:
+            self.turn_order.pop(0)
+        if not self.turn_order:
+            self.battle_round += 1
+            self.turn_order = list(self.roster)
+        player = self.turn_order[0]
+        if self.phase == MainBattleClient.ATTACK_PHASE:
+            if self.simultaneous_planning:
+                self.run_simultaneous_attack_phase()
+            else:
+                self.run_attack_phase(player)
+            if self.winner is not None:
+                return None
+            if not self.simultaneous_planning:
+                player.party.turn_interval()
+            self.phase = MainBattleClient.PLANNING_PHASE
+        return player
+
+    def finish_turn(self):
+        self.turn += 1
+        self.phase = MainBattleClient.ATTACK_PHASE
+        if self.simultaneous_planning:
+            self.turn_order.clear()
+        else:
+            self.turn_order.pop(0)
+
+    def turn_limit_reached(self, max_turns: int = None) -> bool:
+        return max_turns is not None and self.turn > max_turns
+
+    def get_turns_played(self) -> int:
+        """
+        A turn is played once its attack phase has run: the battle is won partway through a turn,
+        while a battle stopped by its turn limit stops between turns.
+        """
+        if self.winner is not None or self.phase == MainBattleClient.PLANNING_PHASE:
+            return self.turn
+        return self.turn - 1
+
+    def run_attack_phase(self, player: PlayerProfile):
+        self.record_keyframe(self.roster.index(player))
+        # start turn by executing existing plans
+        player.party.start_turn()
+        self.execute_attack_queue(player)
+
+    def execute_attack_queue(self, player: PlayerProfile):
+        for plan in player.party.attack_queue:
+            plan.execute(self.damage_calculator)
+        self.resolve_eliminations()
+
+    def resolve_eliminations(self):
+        """
+        Drops the players whose parties were wiped out since the last call from the roster and from every
+        remaining player's views. Once a single alliance is left, its first remaining player is declared the winner.
+        """
+        eliminated = self.eliminations.eliminated
+        while eliminated:
+            player = self.profiles[eliminated.pop(0)]
+            if player not in self.roster:
+                continue
+            self.roster.remove(player)
+            for other in self.roster:
+                other.opponents.discard(player.party)
+                other.allies.discard(player.party)
+            self.alliance_sizes[player.alliance] -= 1
+            if self.alliance_sizes[player.alliance] == 0:
+                del self.alliance_sizes[player.alliance]
+            if len(self.alliance_sizes) == 1 and self.winner is None:
+                self.winner = self.roster[0]
+                self.announce_winner(self.winner)
+
+    def run_planning_phase(self, player: PlayerProfile):
+        # once existing plans have been executed, the player plans their next turn
+        transaction_id = self.open_transaction(player)
+        self.dispatch_command_request(player, transaction_id)
+        self.wait_for_transaction(transaction_id)
+
+        player.party.end_turn()
+
+    def run_simultaneous_attack_phase(self):
+        """
+        In simultaneous mode, a round is a single turn shared by every party:
+        each party's plans are executed in roster order, then every party goes through upkeep together,
+        and finally every party plans its next turn at the same time.
+        Since the defenses set while planning have to stay up for every attack in the next round,
+        they are resolved and released during the upkeep rather than at the start of each party's turn.
+        """
+        self.record_keyframe(0)
+        for player in list(self.roster):
+            self.execute_attack_queue(player)
+            if self.winner is not None:
+                return
+        for player in self.roster:
+            player.party.turn_interval(release_defenses=False)
+        for player in self.roster:
+            # resolves the defenses and refreshes the ap for the next round
+            player.party.start_turn()
+            player.party.release_defenses()
+            player.party.end_turn()
+
+    def run_simultaneous_planning_phase(self):
+        # every player plans at the same time, so the round only takes as long as the slowest player
+        transactions = {self.open_transaction(player): player for player in self.roster}
+        requests = [self.dispatch_command_request(player, transaction_id)
+                    for transaction_id, player in transactions.items()]
+        for request in requests:
+            if request is not None:
+                request.result()
+        for transaction_id in transactions:
+            self.wait_for_transaction(transaction_id)
+
+    def record_keyframe(self, next_player: int):
+        if self.command_log is not None:
+            self.command_log.record_keyframe(self, next_player)
+
+    def open_transaction(self, player: PlayerProfile) -> int:
+        with self.transaction_lock:
+            self.turn_snapshot = None
+            transaction_id = self.transaction_count
+            self.transaction_count += 1
+            self.open_transactions[transaction_id] = player.party
+            self.collect_changes(player, transaction_id)
+            if self.command_deadline is not None:
+                self.transaction_deadlines[transaction_id] = time.monotonic() + self.command_deadline
+        return transaction_id
+
+    def collect_changes(self, player: PlayerProfile, transaction_id: int):
+        """
+        Collects the characters' changes into the journal, and builds the player's delta if it wants one.
+        Changes are kept until every DeltaPlayerServer still in the battle has acknowledged them, or until they fall
+        out of the journal's history, after which the servers which are still behind are sent the full state.
+        """
+        self.change_journal.record(transaction_id, self.party_ids.values())
+        if isinstance(player.server, DeltaPlayerServer):
+            if player.acknowledged is None or not self.change_journal.covers(player.acknowledged):
+                delta = full_view_delta(transaction_id, self.get_team_view(player.party), player.opponents)
+            else:
+                delta = self.change_journal.build_delta(transaction_id, player.acknowledged, player.party,
+                                                        player.opponents, player.allies)
+            self.transaction_deltas[transaction_id] = delta
+        # a server which hasn't acknowledged its first delta yet will need the changes since that delta's transaction
+        self.change_journal.discard_until(min((-1 if other.acknowledged is None else other.acknowledged
+                                               for other in self.roster if isinstance(other.server, DeltaPlayerServer)),
+                                              default=transaction_id),
+                                          transaction_id)
+
+    def get_time_budget(self, transaction_id: int) -> Optional[float]:
+        deadline = self.transaction_deadlines.get(transaction_id)
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def get_opponents(self, team: Party) -> PublicPartyGroupView:
+        return self.profiles[team].opponents
+
+    def get_team_view(self, team: Party) -> PrivatePartyView:
+        return self.team_views[team]
+
+    def get_turn_snapshot(self) -> TurnSnapshot:
+        """Takes the snapshot of the current planning phase the first time it's asked for, and shares it after that."""
+        snapshot = self.turn_snapshot
+        if snapshot is None or snapshot.turn != self.turn:
+            snapshot = self.turn_snapshot = TurnSnapshot(self.turn, tuple(self.public_views[player.party].snapshot()
+                                                                          for player in self.roster))
+        return snapshot
+
+    def dispatch_command_request(self, player: PlayerProfile, transaction_id: int) -> Optional[Future]:
+        """
+        Sends the command request from the thread appropriate for the client's configuration.
+        When deadlines are enforced, the request gets its own daemon thread,
+        since a stalled server may never return and would otherwise tie up a pool thread or the battle.
+        """
+        if self.command_deadline is not None:
+            Thread(target=self.send_command_request, args=(player, transaction_id), daemon=True).start()
+        elif self.planning_executor is not None:
+            return self.planning_executor.submit(self.send_command_request, player, transaction_id)
+        else:
+            self.send_command_request(player, transaction_id)
+        return None
+
+    def send_command_request(self, player: PlayerProfile, transaction_id: int):
+        if isinstance(player.server, DeltaPlayerServer):
+            self.send_delta_request(player, transaction_id)
+            return
+        team = self.get_team_view(player.party)
+        rval = PlayerServer.ERROR
+        while rval != PlayerServer.SUCCESS and transaction_id in self.open_transactions:
+            rval = player.server.process_command_request(self,
+                                                         transaction_id,
+                                                         team,
+                                                         player.opponents,
+                                                         time_budget=self.get_time_budget(transaction_id))
+
+    def send_delta_request(self, player: PlayerProfile, transaction_id: int):
+        with self.transaction_lock:
+            delta = self.transaction_deltas.pop(transaction_id)
+        rval = PlayerServer.ERROR
+        while rval != PlayerServer.SUCCESS and transaction_id in self.open_transactions:
+            rval = player.server.process_delta_request(self,
+                                                       transaction_id,
+                                                       delta,
+                                                       time_budget=self.get_time_budget(transaction_id))
+            if rval == DeltaPlayerServer.RESYNC:
+                delta = full_view_delta(transaction_id, self.get_team_view(player.party), player.opponents)
+        if rval == PlayerServer.SUCCESS:
+            with self.transaction_lock:
+                player.acknowledged = transaction_id
+
+    def wait_for_transaction(self, transaction_id: int):
+        with self.transaction_lock:
+            closed = self.transaction_lock.wait_for(lambda: transaction_id not in self.open_transactions,
+                                                    self.get_time_budget(transaction_id))
+            if not closed:
+                self.expire_transaction(transaction_id)
+
+    def expire_transaction(self, transaction_id: int):
+        """
+        Closes a transaction whose deadline has passed by committing the fallback policy's commands.
+        Any response the player's server sends afterwards is rejected with BattleClient.EXPIRED.
+        """
+        with self.transaction_lock:
+            team = self.open_transactions.get(transaction_id)
+            if team is None:
+                return
+            logging.info('Team %s missed the deadline for transaction %d', team.name, transaction_id)
+            attacks, defenses = self.fallback_policy.choose_commands(self.get_team_view(team),
+                                                                     self.get_opponents(team))
+            if self.commit_command_response(attacks, defenses, transaction_id) != BattleClient.SUCCESS:
+                self.commit_command_response([], {}, transaction_id)
 
     def process_command_response(self,
                                  attacks: List[AttackPlan],
                                  defenses: Dict[CharacterIdentifier, CharacterIdentifier],
                                  transaction_id: int) -> int:
-        new_plans: AttackQueue = AttackQueue()
-        for plan in attacks:
-            # first validate each plan
-            if self.validate_attack_plan(plan, self.open_transactions[transaction_id]):
-                # if the plan is valid, add queue it up for next turn
-                detailed_plan = DetailedAttackPlan(plan.attack,
-                                                   self.characters_ids[plan.user],
-                                                   {self.characters_ids[target] for target in plan.targets})
-                new_plans.enqueue(detailed_plan)
-            else:
-                # if the plan is invalid, return an error
-                return BattleClient.ERROR
-        # set defenses
-        for char_id in defenses:
-            target = self.characters_ids[defenses[char_id]]
-            self.characters_ids[char_id].set_defense(target)
-        # now look up the party associated with the action request
-        party = self.open_transactions[transaction_id]
-        # set the party's plans for next turn, then close the transaction
-        party.attack_queue = new_plans
-        self.open_transactions.pop(transaction_id)
+        return self.commit_command_response(attacks, defenses, transaction_id)
+
+    def commit_command_response(self,
+                                attacks: List[AttackPlan],
+                                defenses: Dict[CharacterIdentifier, CharacterIdentifier],
+                                transaction_id: int) -> int:
+        # the whole response is validated before anything is committed, and both happen under the lock,
+        # so responses arriving from several planning threads are applied atomically
+        with self.transaction_lock:
+            party = self.open_transactions.get(transaction_id)
+            if party is None:
+                return BattleClient.EXPIRED if transaction_id < self.transaction_count else BattleClient.ERROR
+            self.refresh_indexes()
+            new_plans: AttackQueue = AttackQueue()
+            for plan in attacks:
+                # first validate each plan
+                if self.validate_attack_plan(plan, party):
+                    # if the plan is valid, add queue it up for next turn
+                    detailed_plan = DetailedAttackPlan(plan.attack,
+                                                       self.characters_ids[plan.user],
+                                                       {self.characters_ids[target] for target in plan.targets})
+                    new_plans.enqueue(detailed_plan)
+                else:
+                    # if the plan is invalid, return an error
+                    return BattleClient.ERROR
+            for char_id in defenses:
+                if char_id not in party or defenses[char_id] not in party:
+                    return BattleClient.ERROR
+            # set defenses
+            for char_id in defenses:
+                target = self.characters_ids[defenses[char_id]]
+                self.characters_ids[char_id].set_defense(target)
+            # set the party's plans for next turn, then close the transaction
+            party.attack_queue = new_plans
+            if self.command_log is not None:
+                self.command_log.record_commands(self.turn, party, attacks, defenses)
+            self.open_transactions.pop(transaction_id)
+            self.transaction_deadlines.pop(transaction_id, None)
+            self.transaction_lock.notify_all()
         return BattleClient.SUCCESS
 
     # def process_view_request(self,
@@ -192,19 +691,27 @@ class MainBattleClient(BattleClient, EventObserver):
     #     return rval
 
     def validate_attack_plan(self, plan: AttackPlan, user_party: Party) -> bool:
+        """
+        A plan is valid if its user belongs to the party, knows the attack,
+        and aims it at a number of targets within the attack's target range, all of whom are in opposing parties
+        which are still in the battle. The indexes make this a constant number of lookups per target.
+        They're brought up to date by commit_command_response, before it validates any plans.
+        """
         # It is ESSENTIAL that attack validation only uses information available to the player who set the plan
-        if plan.user not in user_party:
+        if self.character_parties.get(plan.user) is not user_party:
             return False
-        # user_status = user_party.get_status(plan.attacker)
-        user_status = self.characters_ids[plan.user]
-        if plan.attack not in user_status.get_attack_list():
+        if plan.attack not in self.character_attacks[plan.user]:
             return False
-        # TODO: This loop is pretty harmless but it looks really gross
-        # TODO: Consider adding logic to the Attack and Character classes to perform some validation
+        min_targets, max_targets = plan.attack.get_target_range()
+        if not min_targets <= len(plan.targets) <= max_targets:
+            return False
+        # wiped out parties are only dropped from the opponents once the eliminations are resolved,
+        # so they're checked directly as well
+        opponents = self.profiles[user_party].opponents
         for target in plan.targets:
-            for player in self.roster:
-                if user_party is not player.party and target in player.party:
-                    return True
-        return False
+            target_party = self.character_parties.get(target)
+            if target_party is None or target_party not in opponents or target_party.is_wiped_out():
+                return False
+        return True
 
 
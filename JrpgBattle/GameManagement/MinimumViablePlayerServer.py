@@ -18,7 +18,8 @@ class SimpleInteractivePlayerServer(PlayerServer):
                                 client: BattleClient,
                                 transaction_id: int,
                                 team: PrivatePartyView,
-                                enemy: PublicPartyView):
+                                enemy: PublicPartyView,
+                                time_budget: float = None):
         client_rval = BattleClient.ERROR
         while client_rval == BattleClient.ERROR:
             self.team = team
@@ -1,10 +1,12 @@
-from typing import List, Tuple
+from typing import List, Tuple, Dict
 
 from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyView
+from JrpgBattle.Character import CharacterIdentifier
 from JrpgBattle.CharacterViews import PrivateCharacterView, PublicCharacterView
-from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient, FallbackPolicy, DeltaPlayerServer
 from JrpgBattle.Party import Party
 from JrpgBattle.Attack import Attack, AttackPlan
+from JrpgBattle.ViewDeltas import ViewDelta, ViewMirror
 
 
 class AggroNonPlayerServer(PlayerServer):
@@ -18,20 +20,26 @@ class AggroNonPlayerServer(PlayerServer):
                                 client: BattleClient,
                                 transaction_id: int,
                                 team: PrivatePartyView,
-                                enemy: PublicPartyView):
+                                enemy: PublicPartyView,
+                                time_budget: float = None):
         client_rval = BattleClient.ERROR
         while client_rval == BattleClient.ERROR:
-            attacks: List[AttackPlan] = []
-            for character in team:
-                if character.get_sp() == 0:
-                    continue
-                attacks.append(AttackPlan(character,
-                                          next(iter(character.get_attack_list())),
-                                          {next(iter(enemy))}))
+            attacks = AggroNonPlayerServer.plan_attacks(team, enemy)
             defenses = {}
             client_rval = client.process_command_response(attacks=attacks, defenses=defenses, transaction_id=transaction_id)
         return PlayerServer.SUCCESS
 
+    @staticmethod
+    def plan_attacks(team: PrivatePartyView, enemy: PublicPartyView) -> List[AttackPlan]:
+        attacks: List[AttackPlan] = []
+        for character in team:
+            if character.get_sp() == 0:
+                continue
+            attacks.append(AttackPlan(character,
+                                      next(iter(character.get_attack_list())),
+                                      {next(iter(enemy))}))
+        return attacks
+
     def _print_player_view(self, team: List[PrivateCharacterView],
                            attacks: List[List[Attack]], enemy: List[PublicCharacterView]):
         assert len(team) == len(attacks)
@@ -57,3 +65,47 @@ class AggroNonPlayerServer(PlayerServer):
                   f'DMG:{c.get_damage():> {4}}/??? '
                   f'SP:{c.get_sp():>+{3}}  GRD:{guard_value}')
             ci += 1
+
+
+class AggroDeltaNonPlayerServer(DeltaPlayerServer):
+    """
+    Plays like an AggroNonPlayerServer, but plans from a ViewMirror of the battle which is kept up to date
+    by the deltas it's sent, rather than reading the views.
+    """
+    def __init__(self):
+        self.mirror = ViewMirror()
+
+    def process_delta_request(self,
+                              client: BattleClient,
+                              transaction_id: int,
+                              delta: ViewDelta,
+                              time_budget: float = None) -> int:
+        try:
+            self.mirror.apply(delta)
+        except ValueError:
+            return DeltaPlayerServer.RESYNC
+        client_rval = BattleClient.ERROR
+        while client_rval == BattleClient.ERROR:
+            attacks = self.plan_attacks()
+            client_rval = client.process_command_response(attacks=attacks, defenses={}, transaction_id=transaction_id)
+        return PlayerServer.SUCCESS
+
+    def plan_attacks(self) -> List[AttackPlan]:
+        attacks: List[AttackPlan] = []
+        target = CharacterIdentifier(self.mirror.get_opponents()[0].name)
+        for character in self.mirror.team.values():
+            if character.sp == 0:
+                continue
+            attacks.append(AttackPlan(CharacterIdentifier(character.name), next(iter(character.attacks)), {target}))
+        return attacks
+
+
+class AggroFallbackPolicy(FallbackPolicy):
+    """
+    Fills in a missed turn the same way the AggroNonPlayerServer would have played it.
+    """
+    def choose_commands(self,
+                        team: PrivatePartyView,
+                        enemy: PublicPartyView) -> Tuple[List[AttackPlan], Dict[CharacterIdentifier,
+                                                                                CharacterIdentifier]]:
+        return AggroNonPlayerServer.plan_attacks(team, enemy), {}
@@ -0,0 +1,387 @@
+"""
+A socket transport between a MainBattleClient and a PlayerServer running in another process.
+The SocketPlayerServer is registered with the battle in place of the real server, and the SocketBattleClient
+serves the real server in its own process, posing as the battle's BattleClient.
+The real server has to be a DeltaPlayerServer: the views wrap the battle's live characters,
+so they're sent as the snapshot fields of ViewDeltas, and attack plans come back as character names.
+
+Messages are framed by a header holding the payload's length and the message type, followed by the payload,
+which is a single value in a compact tagged binary encoding. Strings and attacks are sent in full the first time
+they cross a connection and as an index after that, so after the first request, a request mostly costs the
+changed numbers. Multipliers with an is_relevant callable can't be sent, just like they can't be written to JSON.
+The connection is kept open across turns and battles, and is only reopened if it breaks.
+A request which outlives its time budget is treated as a broken connection, since the late response
+would otherwise be read as the response to the next request.
+"""
+
+from __future__ import annotations
+
+import socket
+import struct
+from fractions import Fraction
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
+
+from JrpgBattle.Attack import Attack, AttackPlan, AttackType, VanillaAttack
+from JrpgBattle.Character import CharacterIdentifier, Multiplier
+from JrpgBattle.GameManagement.MainBattleClient import BattleClient, PlayerServer, DeltaPlayerServer
+from JrpgBattle.ViewDeltas import ViewDelta
+
+# a path for a Unix-domain socket, or a (host, port) pair for TCP
+SocketAddress = Union[str, Tuple[str, int]]
+
+HEADER = struct.Struct('>IB')  # the payload's length and the message type
+FLOAT = struct.Struct('>d')
+
+# message types
+DELTA_REQUEST = 1  # (transaction_id, time_budget, ViewDelta fields)
+COMMAND_RESPONSE = 2  # (transaction_id, ((user, attack, (targets...)), ...), ((defender, target), ...))
+RESPONSE_RESULT = 3  # the BattleClient's return value for a COMMAND_RESPONSE
+REQUEST_RESULT = 4  # the DeltaPlayerServer's return value for a DELTA_REQUEST
+
+# value tags
+NONE = 0
+FALSE = 1
+TRUE = 2
+INT = 3  # a zigzag varint
+FLOAT_VALUE = 4
+NEW_STRING = 5  # a varint length and UTF-8, which is added to the receiver's string table
+STRING = 6  # a varint index into the receiver's string table
+TUPLE = 7  # a varint count and the items
+SET = 8
+DICT = 9  # a varint count and the keys and values
+NEW_ATTACK = 10  # a VanillaAttack's fields, after which it's added to the attack table
+ATTACK = 11  # a varint index into the attack table
+MULTIPLIER = 12  # the numerator, denominator, type mask and type value or attack types
+
+
+def write_varint(out: bytearray, value: int):
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class WireCodec:
+    """
+    Encodes and decodes the values sent over one connection.
+    Each direction has its own string table, since both ends send strings,
+    while the attack table is shared, since attacks are only ever defined by the battle's end.
+    """
+    def __init__(self):
+        self.sent_strings: Dict[str, int] = {}
+        self.received_strings: List[str] = []
+        self.attacks: List[Attack] = []
+        self.attack_indexes: Dict[Attack, int] = {}
+
+    def encode(self, value) -> bytes:
+        out = bytearray()
+        self.write(out, value)
+        return bytes(out)
+
+    def decode(self, data: bytes):
+        try:
+            value, offset = self.read(data, 0)
+        except (IndexError, struct.error, TypeError) as error:
+            raise ValueError(f'Malformed value: {error}') from error
+        if offset != len(data):
+            raise ValueError(f'{len(data) - offset} bytes left over after decoding a value')
+        return value
+
+    def write(self, out: bytearray, value):
+        if value is None:
+            out.append(NONE)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            out.append(INT)
+            write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, str):
+            index = self.sent_strings.get(value)
+            if index is None:
+                self.sent_strings[value] = len(self.sent_strings)
+                encoded = value.encode('utf-8')
+                out.append(NEW_STRING)
+                write_varint(out, len(encoded))
+                out += encoded
+            else:
+                out.append(STRING)
+                write_varint(out, index)
+        elif isinstance(value, (tuple, list)):
+            out.append(TUPLE)
+            write_varint(out, len(value))
+            for item in value:
+                self.write(out, item)
+        elif isinstance(value, (frozenset, set)):
+            out.append(SET)
+            write_varint(out, len(value))
+            for item in value:
+                self.write(out, item)
+        elif isinstance(value, dict):
+            out.append(DICT)
+            write_varint(out, len(value))
+            for key, item in value.items():
+                self.write(out, key)
+                self.write(out, item)
+        elif isinstance(value, Attack):
+            self.write_attack(out, value)
+        elif isinstance(value, Multiplier):
+            if not value.is_static():
+                raise TypeError(f'Multiplier {value} depends on a callable, so it can\'t be sent')
+            out.append(MULTIPLIER)
+            self.write(out, (value.numerator, value.denominator, value.type_mask,
+                             value.type_value if value.type_mask is not None else tuple(value.attack_types)))
+        elif isinstance(value, float):
+            out.append(FLOAT_VALUE)
+            out += FLOAT.pack(value)
+        else:
+            raise TypeError(f'{type(value).__name__} values can\'t be sent')
+
+    def write_attack(self, out: bytearray, attack: Attack):
+        index = self.attack_indexes.get(attack)
+        if index is not None:
+            out.append(ATTACK)
+            write_varint(out, index)
+            return
+        if type(attack) is not VanillaAttack:
+            raise TypeError(f'{type(attack).__name__} attacks can\'t be sent')
+        self.add_attack(attack)
+        out.append(NEW_ATTACK)
+        self.write(out, (attack.name, int(attack.attack_type), attack.target_range, attack.action_point_cost,
+                         attack.stamina_point_cost, attack.mana_point_cost, attack.damage))
+
+    def add_attack(self, attack: Attack):
+        self.attack_indexes[attack] = len(self.attacks)
+        self.attacks.append(attack)
+
+    def read(self, data: bytes, offset: int):
+        tag = data[offset]
+        offset += 1
+        if tag == NONE:
+            return None, offset
+        elif tag == TRUE:
+            return True, offset
+        elif tag == FALSE:
+            return False, offset
+        elif tag == INT:
+            value, offset = read_varint(data, offset)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+        elif tag == NEW_STRING:
+            length, offset = read_varint(data, offset)
+            if offset + length > len(data):
+                raise ValueError('Truncated string')
+            value = data[offset:offset + length].decode('utf-8')
+            self.received_strings.append(value)
+            return value, offset + length
+        elif tag == STRING:
+            index, offset = read_varint(data, offset)
+            return self.received_strings[index], offset
+        elif tag in (TUPLE, SET):
+            count, offset = read_varint(data, offset)
+            items = []
+            for _ in range(count):
+                item, offset = self.read(data, offset)
+                items.append(item)
+            return (tuple(items) if tag == TUPLE else frozenset(items)), offset
+        elif tag == DICT:
+            count, offset = read_varint(data, offset)
+            value = {}
+            for _ in range(count):
+                key, offset = self.read(data, offset)
+                value[key], offset = self.read(data, offset)
+            return value, offset
+        elif tag == NEW_ATTACK:
+            (name, attack_type, target_range, action_point_cost, stamina_point_cost, mana_point_cost,
+             damage), offset = self.read(data, offset)
+            attack = VanillaAttack(name, AttackType(attack_type), target_range, action_point_cost,
+                                   stamina_point_cost, mana_point_cost, damage)
+            self.add_attack(attack)
+            return attack, offset
+        elif tag == ATTACK:
+            index, offset = read_varint(data, offset)
+            return self.attacks[index], offset
+        elif tag == MULTIPLIER:
+            (numerator, denominator, type_mask, types), offset = self.read(data, offset)
+            if type_mask is not None:
+                return Multiplier(Fraction(numerator, denominator), type_mask=type_mask, type_value=types), offset
+            return Multiplier(Fraction(numerator, denominator), attack_types=types), offset
+        elif tag == FLOAT_VALUE:
+            return FLOAT.unpack_from(data, offset)[0], offset + FLOAT.size
+        raise ValueError(f'Unknown value tag {tag}')
+
+
+def receive_exactly(connection: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('The connection was closed')
+        data += chunk
+    return bytes(data)
+
+
+class MessageConnection:
+    """A socket carrying framed messages, along with the WireCodec of the connection."""
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.codec = WireCodec()
+
+    def send(self, message_type: int, value):
+        payload = self.codec.encode(value)
+        self.connection.sendall(HEADER.pack(len(payload), message_type) + payload)
+
+    def receive(self) -> Tuple[int, object]:
+        length, message_type = HEADER.unpack(receive_exactly(self.connection, HEADER.size))
+        return message_type, self.codec.decode(receive_exactly(self.connection, length))
+
+    def close(self):
+        self.connection.close()
+
+
+def create_socket(address: SocketAddress) -> socket.socket:
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # requests and responses are small and strictly alternate, so they shouldn't wait to be coalesced
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return connection
+
+
+def create_listener(address: SocketAddress, backlog: int = 1) -> socket.socket:
+    listener = socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(address)
+    listener.listen(backlog)
+    return listener
+
+
+class SocketPlayerServer(DeltaPlayerServer):
+    """
+    Stands in for a DeltaPlayerServer served by a SocketBattleClient at the address.
+    It connects on the first request and keeps the connection for every later turn and battle.
+    If the connection breaks, it's reopened on the next request, and the full state is sent again.
+    """
+    def __init__(self, address: SocketAddress):
+        self.address = address
+        self.connection: Optional[MessageConnection] = None
+        self.connection_count = 0
+        # with deadlines, each request is sent from its own thread, so requests must not share the connection
+        self.request_lock = Lock()
+
+    def connect(self, timeout: float = None):
+        if self.connection is None:
+            connection = create_socket(self.address)
+            connection.settimeout(timeout)
+            connection.connect(self.address)
+            self.connection = MessageConnection(connection)
+            self.connection_count += 1
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def process_delta_request(self,
+                              client: BattleClient,
+                              transaction_id: int,
+                              delta: ViewDelta,
+                              time_budget: float = None) -> int:
+        with self.request_lock:
+            return self.send_request(client, transaction_id, delta, time_budget)
+
+    def send_request(self,
+                     client: BattleClient,
+                     transaction_id: int,
+                     delta: ViewDelta,
+                     time_budget: float = None) -> int:
+        # a zero timeout would put the socket in non-blocking mode, so a spent budget times out without touching it
+        if time_budget is not None and time_budget <= 0:
+            return PlayerServer.ERROR
+        try:
+            reconnecting = self.connection is None and self.connection_count > 0
+            self.connect(time_budget)
+            self.connection.connection.settimeout(time_budget)
+            if reconnecting and delta.base is not None:
+                return DeltaPlayerServer.RESYNC
+            self.connection.send(DELTA_REQUEST, (transaction_id, time_budget, tuple(delta)))
+            while True:
+                message_type, value = self.connection.receive()
+                if message_type == REQUEST_RESULT:
+                    return value
+                if message_type != COMMAND_RESPONSE:
+                    raise ValueError(f'Unexpected message type {message_type}')
+                response_transaction, attacks, defenses = value
+                plans = [AttackPlan(CharacterIdentifier(user), attack,
+                                    {CharacterIdentifier(target) for target in targets})
+                         for user, attack, targets in attacks]
+                rval = client.process_command_response(plans,
+                                                       {CharacterIdentifier(defender): CharacterIdentifier(target)
+                                                        for defender, target in defenses},
+                                                       response_transaction)
+                self.connection.send(RESPONSE_RESULT, rval)
+        except (OSError, ValueError):  # including socket.timeout, once the time budget runs out
+            self.close()
+            return PlayerServer.ERROR
+
+
+class SocketBattleClient(BattleClient):
+    """
+    Serves a DeltaPlayerServer to a SocketPlayerServer in another process,
+    passing the server's command responses back to the battle.
+    """
+    def __init__(self, server: DeltaPlayerServer):
+        self.server = server
+        self.connection: Optional[MessageConnection] = None
+
+    def serve(self, listener: socket.socket, connection_limit: int = None):
+        """Serves the connections made to the listener one after another."""
+        served = 0
+        while connection_limit is None or served < connection_limit:
+            connection, _ = listener.accept()
+            self.serve_connection(connection)
+            served += 1
+
+    def serve_connection(self, connection: socket.socket):
+        """Answers requests until the SocketPlayerServer closes the connection."""
+        self.connection = MessageConnection(connection)
+        try:
+            while True:
+                message_type, value = self.connection.receive()
+                if message_type != DELTA_REQUEST:
+                    raise ValueError(f'Unexpected message type {message_type}')
+                transaction_id, time_budget, fields = value
+                rval = self.server.process_delta_request(self, transaction_id, ViewDelta(*fields), time_budget)
+                self.connection.send(REQUEST_RESULT, rval)
+        except (OSError, ValueError):
+            # the SocketPlayerServer closed the connection, or gave up on it after a late or malformed message
+            return
+        finally:
+            self.connection.close()
+            self.connection = None
+
+    def process_command_response(self,
+                                 attacks: List[AttackPlan],
+                                 defenses: Dict[CharacterIdentifier, CharacterIdentifier],
+                                 transaction_id: int) -> int:
+        self.connection.send(COMMAND_RESPONSE,
+                             (transaction_id,
+                              tuple((plan.user.identifier, plan.attack,
+                                     tuple(target.identifier for target in plan.targets)) for plan in attacks),
+                              tuple((defender.identifier, target.identifier) for defender, target in defenses.items())))
+        message_type, rval = self.connection.receive()
+        if message_type != RESPONSE_RESULT:
+            raise ValueError(f'Unexpected message type {message_type}')
+        return rval
@@ -1,22 +1,103 @@
 from __future__ import annotations
 
 from abc import abstractmethod, ABC
-from collections.abc import Set
-from copy import copy
-from typing import TypeVar, Generic, Iterator, Dict, MutableSet
+from threading import Lock
+from typing import TypeVar, Generic, Iterator, Dict, MutableSet, Iterable, Tuple, Optional, List
+
+
+class IdentifierRegistry:
+    """
+    Interns (domain, name) pairs as small integers.
+    The integers are dense within each domain, counting up from 0 in the order the names were first seen,
+    so they can be used to index array-backed tables as well as to key dicts and sets.
+    """
+    def __init__(self):
+        self.indices: Dict[object, Dict[str, int]] = {}
+        self.names: Dict[object, List[str]] = {}
+        self._lock = Lock()
+
+    def intern(self, domain: object, name: str) -> int:
+        index = self.indices.get(domain, {}).get(name)
+        if index is not None:
+            return index
+        with self._lock:
+            domain_indices = self.indices.setdefault(domain, {})
+            domain_names = self.names.setdefault(domain, [])
+            if name not in domain_indices:
+                domain_indices[name] = len(domain_names)
+                domain_names.append(name)
+            return domain_indices[name]
+
+    def intern_all(self, domain: object, names: Iterable[str]) -> List[int]:
+        """Interns a batch of names while holding the lock once, rather than once per new name."""
+        with self._lock:
+            domain_indices = self.indices.setdefault(domain, {})
+            domain_names = self.names.setdefault(domain, [])
+            indices = []
+            for name in names:
+                index = domain_indices.get(name)
+                if index is None:
+                    index = domain_indices[name] = len(domain_names)
+                    domain_names.append(name)
+                indices.append(index)
+            return indices
+
+    def get_index(self, domain: object, name: str) -> Optional[int]:
+        return self.indices.get(domain, {}).get(name)
+
+    def get_name(self, domain: object, index: int) -> str:
+        return self.names[domain][index]
+
+    def get_domain_size(self, domain: object) -> int:
+        return len(self.names.get(domain, ()))
+
+
+IDENTIFIER_REGISTRY = IdentifierRegistry()
+
+
+def intern_identifier(domain: object, name: str) -> int:
+    return IDENTIFIER_REGISTRY.intern(domain, name)
+
+
+def intern_identifiers(domain: object, names: Iterable[str]) -> List[int]:
+    return IDENTIFIER_REGISTRY.intern_all(domain, names)
 
 
 class Identifier(ABC):
+    __slots__ = ('identifier', 'interned_id', 'identifier_key')
+
     def __init__(self, identifier: str):
         self.identifier = identifier
+        self._intern()
+
+    def _intern(self):
+        # the domain is fixed per class, so the (domain, interned id) key can be built once up front
+        domain = self.get_domain()
+        self.interned_id: int = intern_identifier(domain, self.identifier)
+        self.identifier_key: Tuple[object, int] = (domain, self.interned_id)
+
+    def __setstate__(self, state):
+        # interned ids are only meaningful within a process, so they are reassigned when unpickled
+        if isinstance(state, tuple):
+            # slotted subclasses are pickled as a (__dict__, slots) pair
+            state, slots = state
+            for name, value in slots.items():
+                setattr(self, name, value)
+        if state:
+            self.__dict__.update(state)
+        self._intern()
 
     def __eq__(self, other):
-        return isinstance(other, Identifier) and \
-               self.get_domain() == other.get_domain() and \
-               self.identifier == other.identifier
+        return isinstance(other, Identifier) and self.identifier_key == other.identifier_key
 
     def __hash__(self):
-        return hash(self.identifier)
+        return self.interned_id
+
+    def get_key(self) -> Tuple[object, int]:
+        return self.identifier_key
+
+    def get_interned_id(self) -> int:
+        return self.interned_id
 
     @abstractmethod
     def get_domain(self) -> str:
@@ -30,31 +111,40 @@ E = TypeVar("E", bound=Identifier)
 
 
 class IdentifierSet(Generic[E], MutableSet):
-    # TODO: this is wrong, should probably just be Set[E]
-    def __init__(self, items: MutableSet[E]):
-        self.items: MutableSet[E] = copy(items)
+    """
+    A set of Identifiers which also supports looking up its members by any equal Identifier.
+    Members are indexed by their (domain, identifier) key, so lookups, membership tests
+    and the set operations inherited from MutableSet all run in constant time per element.
+    """
+    def __init__(self, items: Iterable[E] = ()):
+        self.items: Dict[Tuple[object, int], E] = {}
+        for item in items:
+            self.items.setdefault(item.get_key(), item)
+
+    def __setstate__(self, state: Dict):
+        # the members' interned ids change when unpickled, so the index has to be rebuilt
+        self.items = {item.get_key(): item for item in state['items'].values()}
 
     def __len__(self) -> int:
         return len(self.items)
 
     def __iter__(self) -> Iterator[E]:
-        # return iter(self.items)
-        # return self.items.__iter__()
-        for i in self.items:
-            yield i
+        return iter(self.items.values())
 
     def __contains__(self, x: object) -> bool:
-        return isinstance(x, Identifier) and x in self.items
+        return isinstance(x, Identifier) and x.identifier_key in self.items
 
     def add(self, value: E) -> None:
-        self.items.add(value)
+        self.items.setdefault(value.get_key(), value)
 
     def discard(self, value: E) -> None:
-        self.items.discard(value)
+        self.items.pop(value.get_key(), None)
 
-    # TODO OPT: find a way to do this via hash, rather than iteration
     def __getitem__(self, identifier: Identifier) -> E:
-        return next(item for item in self.items if item == identifier)
+        return self.items[identifier.get_key()]
+
+    def get(self, identifier: Identifier, default: E = None) -> Optional[E]:
+        return self.items.get(identifier.get_key(), default)
 
 
 class Asdf(Identifier):
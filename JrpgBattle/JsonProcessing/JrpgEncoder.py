@@ -3,6 +3,7 @@ import json
 from fractions import Fraction
 from JrpgBattle.Character import CharacterTemplate, Multiplier
 from JrpgBattle.Attack import Attack, VanillaAttack
+from JrpgBattle.Party import Party
 from typing import Dict, Callable
 
 
@@ -41,13 +42,40 @@ class JrpgDataManager:
                 assert character.template_name not in self.character_cache
                 self.character_cache[character.template_name] = character
                 return character
+            elif data['__class__'] == Multiplier.__name__:
+                return decode_multiplier(data)
         return decoder_func
 
+    def spawn_party(self, party_name: str, template_name: str, count: int, **spawn_options) -> Party:
+        """Builds a party of count characters from a cached template. The options are passed on to Party.spawn."""
+        party = Party(party_name)
+        party.spawn(self.character_cache[template_name], count, **spawn_options)
+        return party
+
+
+def decode_multiplier(data: Dict) -> Multiplier:
+    # type_value defaults to the mask, so {"type_mask": 4} matches every fire attack
+    return Multiplier(Fraction(data['multiplier']),
+                      attack_types=data.get('attack_types'),
+                      type_mask=data.get('type_mask'),
+                      type_value=data.get('type_value'))
+
 
 def encode_jrpg_data(obj):
     # print('in function')
     # print(obj)
-    if isinstance(obj, Fraction):
+    if isinstance(obj, Multiplier):
+        if not obj.is_static():
+            raise TypeError(repr(obj) + " has an is_relevant callable, so it is not JSON serializable")
+        if obj.type_mask is not None:
+            return {'__class__': Multiplier.__name__,
+                    'multiplier': str(Fraction(obj)),
+                    'type_mask': obj.type_mask,
+                    'type_value': obj.type_value}
+        return {'__class__': Multiplier.__name__,
+                'multiplier': str(Fraction(obj)),
+                'attack_types': sorted(obj.attack_types)}
+    elif isinstance(obj, Fraction):
         # print('got there')
         return obj.numerator, obj.denominator
     elif isinstance(obj, CharacterTemplate):
@@ -88,3 +116,5 @@ def decode_jrpg_data(dictionary: Dict):
                                  defensive_type_affinities=dictionary['defensive_type_affinities'],
                                  attack_list=dictionary['attack_list'],
                                  parry_effectiveness=dictionary['parry_effectiveness'])
+    elif dictionary['__class__'] == Multiplier.__name__:
+        return decode_multiplier(dictionary)
@@ -1,10 +1,15 @@
-from typing import Set, Dict, MutableSet
+from typing import Set, Dict, MutableSet, Tuple, List
 
 from JrpgBattle.Attack import AttackQueue
-from JrpgBattle.BattleEventHandling.EventManagement import EventSubject
+from JrpgBattle.BattleEventHandling.EventManagement import EventSubject, BattleEvent
 from JrpgBattle.BattleEventHandling.PartyEvent import PartyEventType, PartyEvent
-from JrpgBattle.Character import CharacterStatus
-from JrpgBattle.IdentifierSet import Identifier, IdentifierSet
+from JrpgBattle.Character import CharacterStatus, CharacterTemplate, CharacterIdentifier
+from JrpgBattle.IdentifierSet import Identifier, IdentifierSet, intern_identifiers
+
+
+# the tuple returned by Party.get_state:
+# the attack queue, the status of each plan in it, the party's mp and the number of members still alive
+PartyState = Tuple[AttackQueue, Tuple[int, ...], int, int]
 
 
 class PartyIdentifier(Identifier):
@@ -19,6 +24,12 @@ class PartyIdentifier(Identifier):
 
 
 class Party(PartyIdentifier, EventSubject[PartyEvent]):
+    """
+    Observers registered with a party receive the party's events as well as the events of all of its members.
+    The party counts its surviving members as they die, and announces when the last one does with a WIPED_OUT event.
+    membership_version is bumped whenever members are added, so views of the party know to rebuild their member views.
+    dirty_members lists the members with changed fields, until they're collected with collect_changes.
+    """
     def __init__(self,
                  name: str,
                  characters: MutableSet[CharacterStatus] = set(),  # the characters in the user_party
@@ -27,9 +38,64 @@ class Party(PartyIdentifier, EventSubject[PartyEvent]):
         PartyIdentifier.__init__(self, name)
         EventSubject.__init__(self)
         self.characters: IdentifierSet[CharacterStatus] = IdentifierSet(characters)
+        for member in self.characters:
+            member.party = self
+        self.dirty_members: List[CharacterStatus] = [member for member in self.characters if member.dirty]
+        self.alive_count = 0
+        self.count_alive()
+        self.membership_version = 0
         self.attack_queue = attack_queue
         self._current_mp = current_mp
 
+    def spawn(self,
+              template: CharacterTemplate,
+              count: int,
+              name_format: str = '{template} {number}',  # filled in with the template's name and a counter
+              first_number: int = 1) -> List[CharacterStatus]:
+        """
+        Adds count new members built from the template and returns them.
+        The names are interned as one batch, and the members are indexed and joined to the party as they are built.
+        Raises ValueError if the generated names aren't unique, or clash with a current member.
+        """
+        names = [name_format.format(template=template.get_template_name(), number=number)
+                 for number in range(first_number, first_number + count)]
+        if len(set(names)) != count:
+            raise ValueError(f'{name_format!r} doesn\'t generate {count} distinct names')
+        intern_identifiers(CharacterIdentifier.DOMAIN, names)
+        items = self.characters.items
+        members = []
+        for name in names:
+            member = CharacterStatus(template, name)
+            if member.identifier_key in items:
+                raise ValueError(f'{self.name} already has a member named {name}')
+            members.append(member)
+        for member in members:
+            member.party = self
+            items[member.identifier_key] = member
+            self.dirty_members.append(member)
+        self.alive_count += count
+        self.membership_version += 1
+        return members
+
+    def collect_changes(self) -> List[Tuple[CharacterStatus, int]]:
+        """Returns each changed member along with its dirty fields, and clears them."""
+        changes = [(member, member.dirty) for member in self.dirty_members]
+        for member in self.dirty_members:
+            member.dirty = 0
+        self.dirty_members = []
+        return changes
+
+    def count_alive(self) -> int:
+        """Recounts the surviving members, for when their states have been set directly rather than played out."""
+        self.alive_count = sum(not member.is_dead() for member in self.characters)
+        return self.alive_count
+
+    def member_died(self, cause: BattleEvent = None):
+        """Called by a member when it dies."""
+        self.alive_count -= 1
+        if self.alive_count == 0 and self.wants(PartyEvent, PartyEventType.WIPED_OUT):
+            self.notify_observers(PartyEvent(self, PartyEventType.WIPED_OUT, cause=cause))
+
     def get_name(self) -> str:
         return self.name
 
@@ -41,30 +107,44 @@ class Party(PartyIdentifier, EventSubject[PartyEvent]):
         return item in self.characters
 
     def is_wiped_out(self) -> bool:
-        for member in self.characters:
-            if not member.is_dead():
-                return False
-        return True
+        return self.alive_count == 0
+
+    def get_alive_count(self) -> int:
+        return self.alive_count
+
+    def notify_party_event(self, event_type: PartyEventType):
+        # the event is only built if somebody is listening for it
+        if self.wants(PartyEvent, event_type):
+            self.notify_observers(PartyEvent(self, event_type))
 
     def start_turn(self):
-        party_event = PartyEvent(self, PartyEventType.TURN_STARTED)
-        self.notify_observers(party_event)
+        self.notify_party_event(PartyEventType.TURN_STARTED)
         for member in self.characters:
             member.start_turn()
 
     def end_turn(self):
         for member in self.characters:
             member.end_turn()
-        party_event = PartyEvent(self, PartyEventType.TURN_FINISHED)
-        self.notify_observers(party_event)
+        self.notify_party_event(PartyEventType.TURN_FINISHED)
+
+    def turn_interval(self, release_defenses: bool = True):
+        self.notify_party_event(PartyEventType.START_INTERVAL)
+        for member in self.characters:
+            member.turn_interval(release_defenses)
+        self.notify_party_event(PartyEventType.FINISH_INTERVAL)
 
-    def turn_interval(self):
-        party_event = PartyEvent(self, PartyEventType.START_INTERVAL)
-        self.notify_observers(party_event)
+    def release_defenses(self):
         for member in self.characters:
-            member.turn_interval()
-        party_event = PartyEvent(self, PartyEventType.FINISH_INTERVAL)
-        self.notify_observers(party_event)
+            member.release_defense()
+
+    def get_state(self) -> PartyState:
+        # plans are never modified after being queued except for their status, so the queue itself can be shared
+        return self.attack_queue, tuple(plan.status for plan in self.attack_queue), self._current_mp, self.alive_count
+
+    def set_state(self, state: PartyState):
+        self.attack_queue, statuses, self._current_mp, self.alive_count = state
+        for plan, status in zip(self.attack_queue, statuses):
+            plan.status = status
 
     def get_mp(self) -> int:
         return self._current_mp
@@ -1,8 +1,9 @@
 from abc import ABC
-from typing import Iterator
+from typing import Iterator, Dict, List, Tuple, NamedTuple, Union
 
 from JrpgBattle.Party import Party, PartyIdentifier
-from JrpgBattle.CharacterViews import PublicCharacterView, PrivateCharacterView
+from JrpgBattle.CharacterViews import PublicCharacterView, PrivateCharacterView, CharacterSnapshot, \
+    PrivateCharacterSnapshot
 
 """
 These PartyView classes serve a very similar function to the CharacterView classes.
@@ -14,10 +15,39 @@ the Private view to extend the Public view. It's at least worth investigating
 """
 
 
+class PartySnapshot(NamedTuple):
+    """The state of a party and its members, frozen at the moment it was taken."""
+    name: str
+    mp: int
+    alive_count: int
+    members: Tuple[Union[CharacterSnapshot, PrivateCharacterSnapshot], ...]
+
+
 class PartyView(PartyIdentifier):
+    """
+    The views of the party's members are built on first use and kept for as long as the view is,
+    so they're only rebuilt if the party's membership changes.
+    """
+    CHARACTER_VIEW = PublicCharacterView
+
     def __init__(self, party: Party):
         PartyIdentifier.__init__(self, party.name)
         self._party = party
+        self._members: Tuple[PublicCharacterView, ...] = ()
+        self._membership_version = -1
+
+    def get_members(self) -> Tuple[PublicCharacterView, ...]:
+        if self._membership_version != self._party.membership_version:
+            self._members = tuple(self.CHARACTER_VIEW(character) for character in self._party)
+            self._membership_version = self._party.membership_version
+        return self._members
+
+    def __iter__(self) -> Iterator[PublicCharacterView]:
+        return iter(self.get_members())
+
+    def snapshot(self) -> PartySnapshot:
+        return PartySnapshot(self.name, self._party.get_mp(), self._party.get_alive_count(),
+                             tuple(member.snapshot() for member in self.get_members()))
 
     def is_wiped_out(self) -> bool:
         return self._party.is_wiped_out()
@@ -30,15 +60,52 @@ class PublicPartyView(PartyView):
     def __init__(self, party):
         super(PublicPartyView, self).__init__(party)
 
+
+class PublicPartyGroupView:
+    """
+    A view of several parties at once, such as every opponent of a player.
+    Iterating over it yields the members of each of its parties, so it can stand in for a single PublicPartyView.
+    The parties are added and dropped as the battle goes on, so the view never has to be rebuilt.
+    """
+    def __init__(self):
+        # keyed by party identifier, so parties and their views can both be used to look a party up
+        self.views: Dict[PartyIdentifier, PublicPartyView] = {}
+
+    def add(self, view: PublicPartyView):
+        self.views[view] = view
+
+    def discard(self, party: PartyIdentifier):
+        self.views.pop(party, None)
+
+    def clear(self):
+        self.views.clear()
+
+    def get_parties(self) -> List[PublicPartyView]:
+        return list(self.views.values())
+
+    def __contains__(self, party: PartyIdentifier) -> bool:
+        return party in self.views
+
+    def __len__(self) -> int:
+        return len(self.views)
+
     def __iter__(self) -> Iterator[PublicCharacterView]:
-        for character in self._party:
-            yield PublicCharacterView(character)
+        for view in self.views.values():
+            yield from view
+
+    def is_wiped_out(self) -> bool:
+        return all(view.is_wiped_out() for view in self.views.values())
+
+    def snapshot(self) -> Tuple[PartySnapshot, ...]:
+        return tuple(view.snapshot() for view in self.views.values())
 
 
 class PrivatePartyView(PartyView):
-    def __init__(self, party: Party):
+    CHARACTER_VIEW = PrivateCharacterView
+
+    def __init__(self, party: Party, allies: PublicPartyGroupView = None):  # the parties fighting alongside it
         super(PrivatePartyView, self).__init__(party)
+        self._allies = allies if allies is not None else PublicPartyGroupView()
 
-    def __iter__(self) -> Iterator[PrivateCharacterView]:
-        for character in self._party:
-            yield PrivateCharacterView(character)
+    def get_allies(self) -> PublicPartyGroupView:
+        return self._allies
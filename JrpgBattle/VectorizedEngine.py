@@ -0,0 +1,228 @@
+"""
+A struct-of-arrays battle engine for stepping thousands of independent battles in lockstep.
+The VectorizedBattleState stores the mutable CharacterStatus fields in NumPy arrays with one row per battle
+and one column per character. Every battle shares the same layout of characters, so column c holds the
+same character (by name and template) in every battle.
+The character upkeep and the attack math are implemented as batched array operations which mirror
+CharacterStatus.start_turn, CharacterStatus.turn_interval and DetailedAttackPlan.execute exactly.
+The static type affinities are looked up from per-character tables of each AffinityTable's products, indexed by
+attack type. Multipliers with is_relevant callables have to be evaluated per attack, so characters with such
+dynamic multipliers are rejected.
+NumPy is only required by this module.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence, Optional, Dict, Tuple
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError('JrpgBattle.VectorizedEngine requires NumPy, which is an optional dependency of JrpgBattle; '
+                      'install it with "pip install numpy" to use the vectorized engine') from error
+
+from JrpgBattle.Attack import DetailedAttackPlan
+from JrpgBattle.Character import CharacterStatus, AffinityTable, ATTACK_TYPE_COUNT
+
+NO_CHARACTER = -1  # the index stored in is_defending and defended_by when there is no such character
+
+
+class PlanBatch:
+    """
+    One DetailedAttackPlan from each battle, to be executed together.
+    Battles which have no plan at this point of their queue are marked inactive.
+    """
+    def __init__(self,
+                 active: np.ndarray,  # (battles,) bool
+                 user: np.ndarray,  # (battles,) column of the attacking character
+                 action_point_cost: np.ndarray,  # (battles,)
+                 stamina_point_cost: np.ndarray,  # (battles,)
+                 attack_type: np.ndarray,  # (battles,) the attack's AttackType
+                 targets: np.ndarray,  # (battles, characters) bool
+                 base_damage: np.ndarray):  # (battles, characters) the attack's base damage against each target
+        self.active = active
+        self.user = user
+        self.attack_type = attack_type
+        self.action_point_cost = action_point_cost
+        self.stamina_point_cost = stamina_point_cost
+        self.targets = targets
+        self.base_damage = base_damage
+
+
+class VectorizedBattleState:
+    FIELDS = ('hp', 'sp', 'sp_spent', 'ap', 'vulnerability', 'stagger', 'was_attacked',
+              'is_defending', 'defended_by', 'dead')
+
+    def __init__(self, layout: Sequence[CharacterStatus], battle_count: int):
+        for character in layout:
+            if character.offensive_table.dynamic or character.defensive_table.dynamic:
+                raise ValueError(f'{character.character_name} has dynamic type affinities, '
+                                 f'which the vectorized engine doesn\'t support')
+        self.battle_count = battle_count
+        self.character_count = len(layout)
+        self.columns: Dict[Tuple[object, int], int] = {character.get_key(): column
+                                                       for column, character in enumerate(layout)}
+        # Python evaluates Fraction ** float as float(Fraction) ** float, so floats reproduce the parry math exactly
+        self.parry_effectiveness = np.array([float(character.get_parry_effectiveness()) for character in layout])
+        # (characters, ATTACK_TYPE_COUNT) numerators and denominators of the static multiplier products
+        self.offense_numerator, self.offense_denominator = \
+            VectorizedBattleState.product_table([character.offensive_table for character in layout])
+        self.defense_numerator, self.defense_denominator = \
+            VectorizedBattleState.product_table([character.defensive_table for character in layout])
+        shape = (battle_count, self.character_count)
+        self.hp = np.zeros(shape, dtype=np.int64)
+        self.sp = np.zeros(shape, dtype=np.int64)
+        self.sp_spent = np.zeros(shape, dtype=np.int64)
+        self.ap = np.zeros(shape, dtype=np.int64)
+        self.vulnerability = np.zeros(shape, dtype=np.int64)
+        self.stagger = np.zeros(shape, dtype=bool)
+        self.was_attacked = np.zeros(shape, dtype=bool)
+        self.is_defending = np.full(shape, NO_CHARACTER, dtype=np.int64)
+        self.defended_by = np.full(shape, NO_CHARACTER, dtype=np.int64)
+        self.dead = np.zeros(shape, dtype=bool)
+        self.rows = np.arange(battle_count)
+        self.own_column = np.arange(self.character_count)
+        for battle in range(battle_count):
+            self.load_battle(battle, layout)
+
+    @staticmethod
+    def product_table(tables: Sequence[AffinityTable]) -> Tuple[np.ndarray, np.ndarray]:
+        numerator = np.array([[product.numerator for product in table.products] for table in tables],
+                             dtype=np.int64).reshape(len(tables), ATTACK_TYPE_COUNT)
+        denominator = np.array([[product.denominator for product in table.products] for table in tables],
+                               dtype=np.int64).reshape(len(tables), ATTACK_TYPE_COUNT)
+        return numerator, denominator
+
+    def get_column(self, character: CharacterStatus) -> int:
+        return self.columns[character.get_key()]
+
+    def get_columns(self, characters: Sequence[CharacterStatus]) -> np.ndarray:
+        """Returns a (characters,) bool mask selecting the characters, e.g. a party's members."""
+        mask = np.zeros(self.character_count, dtype=bool)
+        for character in characters:
+            mask[self.get_column(character)] = True
+        return mask
+
+    def load_battle(self, battle: int, characters: Sequence[CharacterStatus]):
+        """Copies the state of one battle's CharacterStatus objects into the battle's row."""
+        for character in characters:
+            column = self.get_column(character)
+            self.hp[battle, column] = character.current_hp
+            self.sp[battle, column] = character.current_sp
+            self.sp_spent[battle, column] = character.sp_spent
+            self.ap[battle, column] = character.current_ap
+            self.vulnerability[battle, column] = character.vulnerability
+            self.stagger[battle, column] = character.stagger
+            self.was_attacked[battle, column] = character.was_attacked
+            self.is_defending[battle, column] = NO_CHARACTER if character.is_defending is None \
+                else self.get_column(character.is_defending)
+            self.defended_by[battle, column] = NO_CHARACTER if character.defended_by is None \
+                else self.get_column(character.defended_by)
+            self.dead[battle, column] = character.dead
+
+    def get_state(self, battle: int, column: int) -> Tuple:
+        """Returns the character's fields in FIELDS order, as plain Python values."""
+        return tuple(getattr(self, field)[battle, column].item() for field in VectorizedBattleState.FIELDS)
+
+    def start_turn(self, members: np.ndarray):
+        """Runs CharacterStatus.start_turn for the members selected by the mask in every battle."""
+        defended = self.defended_by != NO_CHARACTER
+        raised = np.where(self.was_attacked, 0, self.vulnerability + 1)
+        kept = np.where(self.was_attacked, self.vulnerability, 0)
+        self.vulnerability = np.where(members, np.where(defended, raised, kept), self.vulnerability)
+        # a defense whiffs if the defended character wasn't attacked
+        defending = self.is_defending != NO_CHARACTER
+        partner_attacked = np.take_along_axis(self.was_attacked, np.maximum(self.is_defending, 0), axis=1)
+        self.stagger |= members & defending & ~partner_attacked
+        self.ap = np.where(members, 100, self.ap)
+        self.sp_spent = np.where(members, 0, self.sp_spent)
+
+    def turn_interval(self, members: np.ndarray, release_defense: bool = True):
+        regained = np.where(self.stagger, 0, self.ap)
+        self.sp = np.where(members, self.sp - self.sp_spent + regained, self.sp)
+        if release_defense:
+            self.release_defense(members)
+        self.stagger = np.where(members, False, self.stagger)
+
+    def release_defense(self, members: np.ndarray):
+        self.is_defending = np.where(members, NO_CHARACTER, self.is_defending)
+        self.defended_by = np.where(members, NO_CHARACTER, self.defended_by)
+
+    def end_turn(self, members: np.ndarray):
+        self.was_attacked = np.where(members, False, self.was_attacked)
+
+    def set_defense(self, active: np.ndarray, defender: np.ndarray, target: np.ndarray):
+        """Runs CharacterStatus.set_defense in every battle where active is set."""
+        rows = self.rows[active]
+        self.defended_by[rows, target[active]] = defender[active]
+        self.is_defending[rows, defender[active]] = target[active]
+
+    def execute(self, plans: PlanBatch) -> np.ndarray:
+        """
+        Runs DetailedAttackPlan.execute for one plan per battle and returns each plan's resulting status.
+        The targets of a plan don't affect each other, so they are all resolved at once.
+        """
+        rows = self.rows
+        user = plans.user
+        paid = plans.active & (self.ap[rows, user] >= plans.action_point_cost) & (self.sp[rows, user] > 0)
+        self.ap[rows, user] -= np.where(paid, plans.action_point_cost, 0)
+        self.sp_spent[rows, user] = np.where(paid,
+                                             np.maximum(self.sp_spent[rows, user], plans.stamina_point_cost),
+                                             self.sp_spent[rows, user])
+
+        swings = plans.targets & paid[:, None] & ~self.dead
+        self.was_attacked |= swings
+        landed = swings & ~self.stagger[rows, user][:, None]
+        defender = self.defended_by
+        defended = defender != NO_CHARACTER
+        hits = landed & ~defended
+
+        assist_penalty = np.where(defender == self.own_column, 0.0, 0.5)
+        parry_effectiveness = self.parry_effectiveness[np.maximum(defender, 0)]
+        parry_multiplier = np.where(defended, 1 - parry_effectiveness ** (assist_penalty + self.vulnerability), 1.0)
+        damaged = landed & (parry_multiplier > 0)
+        # the same integer math as the FixedPointDamageCalculator: an exact ceiling division for undefended targets,
+        # and a correctly rounded int / int before the parry for defended ones
+        attack_type = plans.attack_type[:, None]
+        numerator = plans.base_damage * self.offense_numerator[user, plans.attack_type][:, None] \
+            * self.defense_numerator[self.own_column, attack_type]
+        denominator = self.offense_denominator[user, plans.attack_type][:, None] \
+            * self.defense_denominator[self.own_column, attack_type]
+        damage = np.where(defended,
+                          np.ceil(numerator / denominator * parry_multiplier).astype(np.int64),
+                          -(-numerator // denominator))
+        self.hp -= np.where(damaged, damage, 0)
+        died = damaged & (self.hp <= 0)
+        self.hp[died] = 0
+        self.dead |= died
+
+        swing_count = swings.sum(axis=1)
+        hit_count = hits.sum(axis=1)
+        status = np.where(hit_count == swing_count, DetailedAttackPlan.HIT, DetailedAttackPlan.PARTIAL_HIT)
+        status = np.where(hit_count == 0, DetailedAttackPlan.MISS, status)
+        status = np.where(swing_count == 0, DetailedAttackPlan.NO_TARGET, status)
+        return np.where(paid, status, DetailedAttackPlan.SKIPPED)
+
+    def build_plan_batch(self, plans: Sequence[Optional[DetailedAttackPlan]]) -> PlanBatch:
+        """Packs one plan (or None) per battle into a PlanBatch."""
+        shape = (self.battle_count, self.character_count)
+        active = np.zeros(self.battle_count, dtype=bool)
+        user = np.zeros(self.battle_count, dtype=np.int64)
+        action_point_cost = np.zeros(self.battle_count, dtype=np.int64)
+        stamina_point_cost = np.zeros(self.battle_count, dtype=np.int64)
+        attack_type = np.zeros(self.battle_count, dtype=np.int64)
+        targets = np.zeros(shape, dtype=bool)
+        base_damage = np.zeros(shape, dtype=np.int64)
+        for battle, plan in enumerate(plans):
+            if plan is None or plan.status == DetailedAttackPlan.CANCELLED:
+                continue
+            active[battle] = True
+            user[battle] = self.get_column(plan.user)
+            action_point_cost[battle] = plan.attack.action_point_cost
+            stamina_point_cost[battle] = plan.attack.stamina_point_cost
+            attack_type[battle] = plan.attack.attack_type
+            for target in plan.targets:
+                column = self.get_column(target)
+                targets[battle, column] = True
+                base_damage[battle, column] = plan.attack.compute_base_damage(plan, target)
+        return PlanBatch(active, user, action_point_cost, stamina_point_cost, attack_type, targets, base_damage)
@@ -0,0 +1,184 @@
+"""
+ViewDeltas carry the changes to a player's views since the last transaction the player acknowledged,
+so a PlayerServer which keeps its own copy of the battle only has to be sent what changed.
+Changes are keyed by character name, and use the field names of the character snapshots,
+so a ViewMirror applies them with NamedTuple._replace.
+The changed fields are found through the dirty bits which CharacterStatus sets as its fields change.
+"""
+
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple, Iterable
+
+from JrpgBattle.Character import CharacterStatus, DIRTY_ALL, DIRTY_HP, DIRTY_SP, DIRTY_SP_SPENT, DIRTY_AP, \
+    DIRTY_VULNERABILITY, DIRTY_STAGGER, DIRTY_WAS_ATTACKED, DIRTY_DEAD, DIRTY_DEFENSE, DIRTY_PUBLIC_ATTACKS, \
+    DIRTY_PUBLIC_MULTIPLIERS
+from JrpgBattle.CharacterViews import CharacterSnapshot, PrivateCharacterSnapshot, public_snapshot, private_snapshot
+from JrpgBattle.Party import Party
+from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyGroupView
+
+# the snapshot fields which each dirty bit covers
+PUBLIC_FIELDS: Tuple[Tuple[int, str], ...] = (
+    (DIRTY_HP, 'damage'), (DIRTY_SP, 'sp'), (DIRTY_SP_SPENT, 'sp_spent'), (DIRTY_AP, 'ap'),
+    (DIRTY_VULNERABILITY, 'vulnerability'), (DIRTY_STAGGER, 'staggered'), (DIRTY_WAS_ATTACKED, 'was_attacked'),
+    (DIRTY_DEAD, 'dead'), (DIRTY_PUBLIC_ATTACKS, 'public_attacks'),
+    (DIRTY_PUBLIC_MULTIPLIERS, 'public_offensive_multipliers'),
+    (DIRTY_PUBLIC_MULTIPLIERS, 'public_defensive_multipliers'))
+PRIVATE_FIELDS: Tuple[Tuple[int, str], ...] = (
+    (DIRTY_HP, 'current_hp'), (DIRTY_SP, 'sp'), (DIRTY_SP_SPENT, 'sp_spent'), (DIRTY_AP, 'ap'),
+    (DIRTY_VULNERABILITY, 'vulnerability'), (DIRTY_STAGGER, 'staggered'), (DIRTY_WAS_ATTACKED, 'was_attacked'),
+    (DIRTY_DEAD, 'dead'), (DIRTY_DEFENSE, 'is_defending'), (DIRTY_DEFENSE, 'defended_by'),
+    (DIRTY_PUBLIC_ATTACKS, 'public_attacks'))
+
+# the changed fields of a character, by snapshot field name
+FieldChanges = Dict[str, object]
+
+
+@lru_cache(maxsize=None)
+def changed_fields(dirty: int, private: bool) -> Tuple[str, ...]:
+    """A character which is entirely dirty is sent in full, including the fields which never change."""
+    snapshot_class = PrivateCharacterSnapshot if private else CharacterSnapshot
+    if dirty == DIRTY_ALL:
+        return snapshot_class._fields[1:]
+    return tuple(field for bit, field in (PRIVATE_FIELDS if private else PUBLIC_FIELDS) if dirty & bit)
+
+
+def encode_changes(snapshot: NamedTuple, dirty: int, private: bool) -> FieldChanges:
+    return {field: getattr(snapshot, field) for field in changed_fields(dirty, private)}
+
+
+class ViewDelta(NamedTuple):
+    transaction_id: int
+    base: Optional[int]  # the acknowledged transaction the changes are relative to, or None for the full state
+    team: str
+    opponents: Tuple[str, ...]  # the names of the opposing parties still in the battle
+    allies: Tuple[str, ...]
+    team_changes: Dict[str, FieldChanges]  # the changes to the team's members, by name
+    party_changes: Dict[str, Dict[str, FieldChanges]]  # the public changes to every other party's members
+
+    def change_count(self) -> int:
+        """The number of fields the delta carries, which is what it costs to send."""
+        return sum(len(changes) for changes in self.team_changes.values()) + \
+            sum(len(changes) for members in self.party_changes.values() for changes in members.values())
+
+
+def full_view_delta(transaction_id: int, team: PrivatePartyView, enemy: PublicPartyGroupView) -> ViewDelta:
+    """Builds a delta of the views' full state, for servers which haven't acknowledged anything yet."""
+    party_changes = {}
+    for party in enemy.get_parties() + team.get_allies().get_parties():
+        party_changes[party.name] = {member.get_character_name(): encode_changes(member.snapshot(), DIRTY_ALL, False)
+                                     for member in party}
+    return ViewDelta(transaction_id, None, team.name,
+                     tuple(party.name for party in enemy.get_parties()),
+                     tuple(party.name for party in team.get_allies().get_parties()),
+                     {member.get_character_name(): encode_changes(member.snapshot(), DIRTY_ALL, True)
+                      for member in team},
+                     party_changes)
+
+
+class ChangeJournal:
+    """
+    Records the changes collected from the parties at each transaction, so the changes since any transaction
+    which hasn't been discarded yet can be merged without looking at the characters which didn't change.
+    At most history transactions are kept, however far behind the servers are:
+    a server whose last acknowledged transaction has been discarded has to be sent the full state instead.
+    """
+    HISTORY = 64
+
+    def __init__(self, history: int = HISTORY):
+        self.history = history
+        self.sequences: List[int] = []  # the transaction at which each change was collected, in increasing order
+        self.changes: List[Tuple[CharacterStatus, int]] = []
+        self.horizon: Optional[int] = None  # the last transaction whose changes were discarded
+
+    def record(self, transaction_id: int, parties: Iterable[Party]):
+        for party in parties:
+            for change in party.collect_changes():
+                self.sequences.append(transaction_id)
+                self.changes.append(change)
+
+    def changes_since(self, transaction_id: int) -> Dict[CharacterStatus, int]:
+        merged: Dict[CharacterStatus, int] = {}
+        for character, dirty in self.changes[bisect_right(self.sequences, transaction_id):]:
+            merged[character] = merged.get(character, 0) | dirty
+        return merged
+
+    def covers(self, base: int) -> bool:
+        """Returns whether the changes since the transaction are all still kept."""
+        return self.horizon is None or base >= self.horizon
+
+    def discard_until(self, transaction_id: int, latest: int):
+        """
+        Drops the changes collected at or before the transaction, once nobody needs them,
+        as well as any which are more than history transactions older than the latest one.
+        """
+        transaction_id = max(transaction_id, latest - self.history)
+        if self.horizon is not None and transaction_id <= self.horizon:
+            return
+        self.horizon = transaction_id
+        index = bisect_right(self.sequences, transaction_id)
+        del self.sequences[:index]
+        del self.changes[:index]
+
+    def build_delta(self,
+                    transaction_id: int,
+                    base: int,
+                    team: Party,
+                    opponents: PublicPartyGroupView,
+                    allies: PublicPartyGroupView) -> ViewDelta:
+        team_changes = {}
+        party_changes = {}
+        for character, dirty in self.changes_since(base).items():
+            party = character.party
+            if party is team:
+                team_changes[character.character_name] = encode_changes(private_snapshot(character), dirty, True)
+            elif party in opponents or party in allies:
+                changes = encode_changes(public_snapshot(character), dirty, False)
+                if changes:
+                    party_changes.setdefault(party.name, {})[character.character_name] = changes
+        return ViewDelta(transaction_id, base, team.name,
+                         tuple(party.name for party in opponents.get_parties()),
+                         tuple(party.name for party in allies.get_parties()),
+                         team_changes, party_changes)
+
+
+class ViewMirror:
+    """
+    A PlayerServer's own copy of its views, kept up to date by applying the ViewDeltas it's sent.
+    The changes hold the current values of the fields rather than differences,
+    so a delta relative to an older transaction than the last one applied can be applied as well.
+    Deltas of the full state are always applied, since transaction ids start over in every battle.
+    """
+    def __init__(self):
+        self.acknowledged: Optional[int] = None
+        self.team_name = ''
+        self.team: Dict[str, PrivateCharacterSnapshot] = {}
+        self.parties: Dict[str, Dict[str, CharacterSnapshot]] = {}
+        self.opponents: Tuple[str, ...] = ()
+        self.allies: Tuple[str, ...] = ()
+
+    def apply(self, delta: ViewDelta):
+        if delta.base is None:
+            self.team = {}
+            self.parties = {}
+        elif self.acknowledged is None or delta.base > self.acknowledged:
+            raise ValueError(f'the delta for transaction {delta.transaction_id} is relative to transaction '
+                             f'{delta.base}, which the mirror hasn\'t seen')
+        elif delta.transaction_id == self.acknowledged:
+            return
+        self.team_name = delta.team
+        self.opponents = delta.opponents
+        self.allies = delta.allies
+        for name, changes in delta.team_changes.items():
+            current = self.team.get(name)
+            self.team[name] = PrivateCharacterSnapshot(name, **changes) if current is None \
+                else current._replace(**changes)
+        for party_name, members in delta.party_changes.items():
+            party = self.parties.setdefault(party_name, {})
+            for name, changes in members.items():
+                current = party.get(name)
+                party[name] = CharacterSnapshot(name, **changes) if current is None else current._replace(**changes)
+        self.acknowledged = delta.transaction_id
+
+    def get_opponents(self) -> List[CharacterSnapshot]:
+        return [member for party in self.opponents for member in self.parties.get(party, {}).values()]
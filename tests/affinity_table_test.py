@@ -0,0 +1,79 @@
+import pickle
+from fractions import Fraction
+from math import ceil
+
+from JrpgBattle.Attack import VanillaAttack, AttackType, DetailedAttackPlan
+from JrpgBattle.Character import CharacterTemplate, CharacterStatus, Multiplier
+
+FIRE_TYPES = {attack_type for attack_type in AttackType if attack_type & 4}
+SLASH_TYPES = {attack_type for attack_type in AttackType if attack_type % 4 == 1}
+POISON_TYPES = {attack_type for attack_type in AttackType if attack_type & 8}
+
+PYROMANIAC = Multiplier(Fraction(3, 2), attack_types=FIRE_TYPES)
+DUELIST = Multiplier(Fraction(2), attack_types=SLASH_TYPES)
+# dynamic multipliers can look at more than the attack type
+HEAVY_HITTER = Multiplier(Fraction(5, 4), is_relevant=lambda plan: plan.attack.damage > 5)
+FIREPROOF = Multiplier(Fraction(1, 3), attack_types=FIRE_TYPES)
+VENOMOUS = Multiplier(Fraction(7, 5), attack_types=POISON_TYPES)
+
+
+def reference_damage(attack, user, target):
+    """The multiplier loop execute used before the tables were compiled."""
+    total_multiplier = Fraction(1, 1)
+    plan = DetailedAttackPlan(attack, user, {target})
+    for multiplier in user.get_offensive_type_affinities():
+        if multiplier.is_relevant(plan):
+            total_multiplier *= multiplier
+    for multiplier in target.get_defensive_type_affinities():
+        if multiplier.is_relevant(plan):
+            total_multiplier *= multiplier
+    return ceil(attack.damage * total_multiplier)
+
+
+def damage_dealt(attack, user_template, target_template):
+    user = CharacterStatus(user_template, 'attacker')
+    target = CharacterStatus(target_template, 'defender')
+    user.current_ap = 100
+    user.current_sp = 100
+    expected = reference_damage(attack, user, target)
+    DetailedAttackPlan(attack, user, {target}).execute()
+    return target.max_hp - target.current_hp, expected, user, target
+
+
+def main():
+    attacks = [VanillaAttack(f'{attack_type.name} {damage}', attack_type=attack_type, damage=damage)
+               for attack_type in AttackType for damage in (4, 9)]
+    attacker = CharacterTemplate('attacker', 1000, offensive_type_affinities={PYROMANIAC, DUELIST, HEAVY_HITTER},
+                                 attack_list=frozenset(attacks))
+    defender = CharacterTemplate('defender', 1000, defensive_type_affinities={FIREPROOF, VENOMOUS})
+    for attack in attacks:
+        dealt, expected, user, target = damage_dealt(attack, attacker, defender)
+        assert dealt == expected, (attack, dealt, expected)
+        assert (PYROMANIAC in user.public_offensive_multipliers) == (attack.attack_type in FIRE_TYPES)
+        assert (HEAVY_HITTER in user.public_offensive_multipliers) == (attack.damage > 5)
+
+    # the tables are rebuilt when a character's affinities change
+    character = CharacterStatus(attacker, 'shifting')
+    assert character.offensive_table.products[AttackType.FIRE_SLASH] == Fraction(3)
+    character.offensive_type_affinities = {DUELIST}
+    assert character.offensive_table.products[AttackType.FIRE_SLASH] == Fraction(2)
+    assert character.offensive_table.products[AttackType.FIRE] == Fraction(1)
+    assert character.offensive_table.dynamic == ()
+
+    # multipliers with the same value but different relevance are different affinities
+    assert len({Multiplier(Fraction(2), attack_types=FIRE_TYPES),
+                Multiplier(Fraction(2), attack_types=SLASH_TYPES)}) == 2
+    # a multiplier isn't equal to its bare value, which hashes differently
+    assert PYROMANIAC != Fraction(3, 2) and Fraction(3, 2) != PYROMANIAC
+    assert len({PYROMANIAC, Fraction(3, 2)}) == 2 and Fraction(3, 2) not in {PYROMANIAC}
+    assert PYROMANIAC * 1 == Fraction(3, 2)
+    assert pickle.loads(pickle.dumps(PYROMANIAC)).attack_types == PYROMANIAC.attack_types
+    try:
+        Multiplier(Fraction(2))
+        assert False, 'a multiplier without relevance should be rejected'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from threading import Event, Thread
+
+from JrpgBattle.Attack import AttackPlan
+from JrpgBattle.GameManagement.AsyncBattleClient import AsyncBattleClient, AsyncPlayerServer, run_battles, \
+    PlayerServerAdapter, ThreadedPlayerServerAdapter
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer, AggroFallbackPolicy
+from tests.battle_fixtures import build_client, DUEL
+
+
+class SlowRemotePlayerServer(AsyncPlayerServer):
+    """Acknowledges the request immediately and answers later, like a remote player would."""
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        asyncio.get_running_loop().create_task(self._respond(client, transaction_id, team, enemy))
+        return AsyncPlayerServer.SUCCESS
+
+    async def _respond(self, client, transaction_id, team, enemy):
+        await asyncio.sleep(self.delay)
+        target = next(iter(enemy))
+        attacks = [AttackPlan(member, next(iter(member.get_attack_list())), {target})
+                   for member in team if member.get_sp() > 0]
+        await client.process_command_response(attacks, {}, transaction_id)
+
+
+class FailingPlayerServer(AsyncPlayerServer):
+    """Fails every request, so the battle has to fall back on the deadline."""
+    def __init__(self):
+        self.requests = 0
+
+    async def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        self.requests += 1
+        return AsyncPlayerServer.ERROR
+
+
+class BlockedPlayerServer(PlayerServer):
+    """Blocks like a player who never answers input(), until it's released."""
+    def __init__(self):
+        self.released = Event()
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        self.released.wait()
+        return PlayerServer.ERROR
+
+
+class CountingAsyncBattleClient(AsyncBattleClient):
+    def __init__(self):
+        super().__init__()
+        self.attack_phases = 0
+
+    def run_attack_phase(self, player):
+        self.attack_phases += 1
+        super().run_attack_phase(player)
+
+
+def build_async_client(player_server, enemy_server, client_class=AsyncBattleClient, **client_options):
+    return build_client([player_server, enemy_server], party_names=DUEL, client_class=client_class, **client_options)
+
+
+def build_deadline_client(player_server, deadline: float) -> AsyncBattleClient:
+    return build_async_client(player_server, PlayerServerAdapter(AggroNonPlayerServer()),
+                              command_deadline=deadline, fallback_policy=AggroFallbackPolicy())
+
+
+def check_deadlines():
+    # a server which keeps failing is retried with a growing delay rather than as fast as the event loop spins
+    failing = FailingPlayerServer()
+    client = build_deadline_client(failing, 0.3)
+    asyncio.run(client.start_battle(max_turns=2))
+    assert client.get_turns_played() == 2
+    assert 0 < failing.requests < 10, failing.requests
+
+    # a threaded server still blocked after its deadline doesn't keep asyncio.run from returning
+    blocked = BlockedPlayerServer()
+    client = build_deadline_client(ThreadedPlayerServerAdapter(blocked), 0.1)
+    battle = Thread(target=asyncio.run, args=(client.start_battle(max_turns=4),), daemon=True)
+    battle.start()
+    battle.join(5)
+    assert not battle.is_alive() and client.get_turns_played() == 4
+    blocked.released.set()
+
+
+def main():
+    check_deadlines()
+
+    battle_count = 2000
+    delay = 0.01
+    clients = [build_async_client(SlowRemotePlayerServer(delay), PlayerServerAdapter(AggroNonPlayerServer()))
+               for _ in range(battle_count)]
+    start = time.perf_counter()
+    winners = asyncio.run(run_battles(*clients))
+    elapsed = time.perf_counter() - start
+    print(f'{battle_count} concurrent battles in {elapsed:.2f}s')
+    assert all(winner.party.name == 'PLAYER' for winner in winners)
+    # each battle waits on its slow player several times, so running them one at a time would take far longer
+    assert elapsed < battle_count * delay
+
+    threaded = build_async_client(ThreadedPlayerServerAdapter(AggroNonPlayerServer()),
+                                  PlayerServerAdapter(AggroNonPlayerServer()))
+    winner = asyncio.run(threaded.start_battle())
+    assert winner.party.name == 'PLAYER'
+
+    # a turn limit which falls partway through a round stops the battle before the next attack phase
+    for max_turns in (1, 2, 3):
+        capped = build_async_client(PlayerServerAdapter(AggroNonPlayerServer()),
+                                    PlayerServerAdapter(AggroNonPlayerServer()), CountingAsyncBattleClient)
+        assert asyncio.run(capped.start_battle(max_turns)) is None
+        assert capped.attack_phases == capped.get_turns_played() == max_turns
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+from JrpgBattle.Attack import AttackType
+
+
+def main():
+    assert len(AttackType) == 16
+    # the member names spell out each type's attributes, so they serve as an independent reference for the tables
+    for attack_type in AttackType:
+        words = attack_type.name.split('_')
+        physical = [word for word in words if word in ('SLASH', 'STAB', 'STRIKE')]
+        assert AttackType.is_utility(attack_type) == (words == ['UTILITY']), attack_type
+        assert AttackType.is_slash(attack_type) == (physical == ['SLASH']), attack_type
+        assert AttackType.is_stab(attack_type) == (physical == ['STAB']), attack_type
+        assert AttackType.is_strike(attack_type) == (physical == ['STRIKE']), attack_type
+        assert AttackType.is_physical(attack_type) == bool(physical), attack_type
+        assert AttackType.is_fire(attack_type) == ('FIRE' in words), attack_type
+        assert AttackType.is_poison(attack_type) == ('POISON' in words), attack_type
+        expected_kind = AttackType[physical[0]] if physical else AttackType.UTILITY
+        assert AttackType.get_physical_kind(attack_type) is expected_kind, attack_type
+        # plain ints index the tables just like the enum members do
+        assert AttackType.is_fire(int(attack_type)) == AttackType.is_fire(attack_type)
+    assert sum(AttackType.is_fire(attack_type) for attack_type in AttackType) == 8
+    assert sum(AttackType.is_poison(attack_type) for attack_type in AttackType) == 8
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+The character template and battle builders shared by the tests.
+Most tests fight with SOMEBODY, a plain template with a single attack.
+Tests which need sturdier characters, more attacks or type affinities build their own variant with build_somebody.
+"""
+
+from fractions import Fraction
+from typing import Iterable, Sequence
+
+from JrpgBattle.Attack import Attack, VanillaAttack
+from JrpgBattle.Character import CharacterTemplate, CharacterStatus
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import MainBattleClient
+from JrpgBattle.Party import Party
+
+DEFAULT_ATTACK = VanillaAttack('default', damage=4)
+
+DUEL = ('PLAYER', 'ENEMY')  # the party names of a battle between a player and a single enemy
+
+
+def build_somebody(max_hp: int = 10,
+                   attacks: Iterable[Attack] = (DEFAULT_ATTACK,),
+                   **template_options) -> CharacterTemplate:
+    return CharacterTemplate(name='somebody', max_hp=max_hp, attack_list=frozenset(attacks),
+                             parry_effectiveness=Fraction(3, 4), **template_options)
+
+
+SOMEBODY = build_somebody()
+
+
+def build_party(name: str,
+                size: int = 1,
+                template: CharacterTemplate = SOMEBODY,
+                member_name: str = '{party} {number}',  # filled in with the party's name and a counter from 0
+                **party_options) -> Party:
+    return Party(name, {CharacterStatus(template, member_name.format(party=name, number=number))
+                        for number in range(size)}, **party_options)
+
+
+def build_client(servers: Sequence[object],
+                 party_size: int = 1,
+                 template: CharacterTemplate = SOMEBODY,
+                 party_names: Sequence[str] = None,  # PARTY 0, PARTY 1... by default
+                 client_class: type = HeadlessBattleClient,
+                 **client_options) -> MainBattleClient:
+    """Builds a client with a party of party_size members for each of the servers, in order."""
+    client = client_class(**client_options)
+    if party_names is None:
+        party_names = [f'PARTY {index}' for index in range(len(servers))]
+    for name, server in zip(party_names, servers):
+        client.register_party(build_party(name, party_size, template), server)
+    return client
@@ -0,0 +1,175 @@
+import io
+import random
+from fractions import Fraction
+
+from JrpgBattle.Attack import VanillaAttack, AttackPlan, AttackType
+from JrpgBattle.Character import Multiplier, DIRTY_ALL
+from JrpgBattle.GameManagement.BattleReplay import CommandLog, ReplayBattleClient
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient
+from tests.battle_fixtures import build_somebody, build_party, DUEL
+
+SOMEBODY = build_somebody(max_hp=60,
+                          attacks=(VanillaAttack('jab', damage=3),
+                                   VanillaAttack('haymaker', attack_type=AttackType.STRIKE, damage=9,
+                                                 stamina_point_cost=300),
+                                   VanillaAttack('sweep', damage=2, target_range=(1, 3))),
+                          offensive_type_affinities={Multiplier(Fraction(5, 4), attack_types={AttackType.STRIKE})},
+                          defensive_type_affinities={Multiplier(Fraction(3, 4), attack_types={AttackType.STRIKE})})
+
+
+class RandomPlayerServer(PlayerServer):
+    """Plays randomly, so a battle can only be reproduced from its command log."""
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        members = sorted(team, key=lambda member: member.get_character_name())
+        targets = sorted(enemy, key=lambda target: target.get_character_name())
+        attacks = []
+        defenses = {}
+        for member in members:
+            if member.get_current_hp() <= 0:
+                continue
+            if self.random.random() < 0.3:
+                defenses[member] = self.random.choice(members)
+            elif member.get_sp() > 0:
+                attack = self.random.choice(sorted(member.get_attack_list(), key=lambda a: a.name))
+                attacks.append(AttackPlan(member, attack, {self.random.choice(targets)}))
+        assert client.process_command_response(attacks, defenses, transaction_id) == BattleClient.SUCCESS
+        return PlayerServer.SUCCESS
+
+
+class TracingBattleClient(HeadlessBattleClient):
+    """Remembers everyone's hp at the start of each turn, and the whole state whenever a keyframe may be captured."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.trace = {}
+        self.states = {}
+
+    def record_keyframe(self, next_player: int):
+        self.trace[self.turn] = hp_of(self)
+        self.states.setdefault(self.turn, state_of(self))
+        super().record_keyframe(next_player)
+
+
+class CountingReplayBattleClient(ReplayBattleClient):
+    def __init__(self, command_log: CommandLog):
+        super().__init__(command_log)
+        self.turns_played = 0
+
+    def play_turn(self):
+        self.turns_played += 1
+        super().play_turn()
+
+
+def hp_of(client):
+    return {character.character_name: character.current_hp for character in client.characters_ids.values()}
+
+
+def state_of(client):
+    """Everything a keyframe restores, except for the defenses, which refer to the client's own characters."""
+    characters = {character.character_name: character.get_state()[:8] + character.get_state()[10:]
+                  for character in client.characters_ids.values()}
+    return characters, {player.party.name: player.party.get_mp() for player in client.roster}
+
+
+def build_parties():
+    return [build_party(name, 3, SOMEBODY, current_mp=40) for name in DUEL]
+
+
+def check_replay(simultaneous_planning: bool):
+    keyframe_interval = 5
+    command_log = CommandLog(keyframe_interval)
+    client = TracingBattleClient(simultaneous_planning=simultaneous_planning, command_log=command_log)
+    for index, party in enumerate(build_parties()):
+        client.register_party(party, RandomPlayerServer(index))
+    winner = client.start_battle()
+    assert winner is not None and client.turn > 4 * keyframe_interval
+
+    # the log survives being saved, and replays against fresh copies of the parties
+    stream = io.BytesIO()
+    command_log.dump(stream)
+    stream.seek(0)
+    replay = CountingReplayBattleClient(CommandLog.load(stream))
+    for party in build_parties():
+        replay.register_party(party)
+    assert replay.start_battle().party.name == winner.party.name
+    assert hp_of(replay) == hp_of(client)
+    assert (replay.turn, replay.battle_round) == (client.turn, client.battle_round)
+
+    # seeking costs one keyframe restore plus less than a keyframe interval of turns
+    for turn in sorted(client.trace, reverse=True):
+        replay.turns_played = 0
+        replay.seek(turn)
+        assert replay.turns_played < keyframe_interval
+        assert replay.turn == turn
+        assert hp_of(replay) == client.trace[turn]
+    replay.seek(7)
+    assert replay.resume().party.name == winner.party.name
+    assert hp_of(replay) == hp_of(client)
+
+
+def check_multi_party_replay(seed: int) -> bool:
+    """
+    Replays a battle between four parties. Parties which are wiped out partway through a round are dropped
+    from the roster, which the replay has to follow to give the right player each turn.
+    Returns whether a party was wiped out while it wasn't the last in the roster, which shifts the others.
+    """
+    command_log = CommandLog(5)
+    client = TracingBattleClient(command_log=command_log)
+    names = [f'P{index}' for index in range(4)]
+    for index, name in enumerate(names):
+        client.register_party(build_party(name, 2, SOMEBODY), RandomPlayerServer(seed * len(names) + index))
+    winner = client.start_battle(max_turns=1000)
+    assert winner is not None
+    replay = ReplayBattleClient(command_log)
+    for name in names:
+        replay.register_party(build_party(name, 2, SOMEBODY))
+    assert replay.start_battle(max_turns=1000).party.name == winner.party.name
+    assert hp_of(replay) == hp_of(client)
+    assert (replay.turn, replay.battle_round) == (client.turn, client.battle_round)
+    for turn in sorted(client.trace, reverse=True)[::7]:
+        replay.seek(turn)
+        assert hp_of(replay) == client.trace[turn], (seed, turn)
+    return any(keyframe.roster != names[:len(keyframe.roster)] for keyframe in command_log.keyframes)
+
+
+def check_keyframe_state():
+    """A restored keyframe brings back everything it captured, and every character is sent in full afterwards."""
+    command_log = CommandLog(5)
+    client = TracingBattleClient(command_log=command_log)
+    for index, party in enumerate(build_parties()):
+        party.spend_mp(15)
+        client.register_party(party, RandomPlayerServer(index))
+    client.start_battle(max_turns=12)
+    assert command_log.get_keyframe(1).party_mp == {'PLAYER': 25, 'ENEMY': 25}
+    # by the second keyframe, some of the multipliers have been made public
+    characters, _ = client.states[6]
+    assert any(multipliers for character in characters.values() for multipliers in character[-2:])
+
+    # the keyframe survives being saved, even though the multipliers it refers to aren't saved along with it
+    stream = io.BytesIO()
+    command_log.dump(stream)
+    stream.seek(0)
+    replay = ReplayBattleClient(CommandLog.load(stream))
+    for party in build_parties():
+        replay.register_party(party)
+    replay.start_battle(max_turns=12)
+    for turn in (1, 6):
+        for player in replay.roster:
+            player.party.collect_changes()
+        replay.replay_log.get_keyframe(turn).restore(replay)
+        assert state_of(replay) == client.states[turn]
+        assert all(character.dirty == DIRTY_ALL for character in replay.characters.values())
+
+
+def main():
+    check_keyframe_state()
+    assert any([check_multi_party_replay(seed) for seed in range(20)])
+    check_replay(simultaneous_planning=False)
+    check_replay(simultaneous_planning=True)
+
+
+if __name__ == '__main__':
+    main()
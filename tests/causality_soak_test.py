@@ -0,0 +1,94 @@
+import tracemalloc
+
+from JrpgBattle.Attack import DetailedAttackPlan
+from JrpgBattle.BattleEventHandling.AttackEvent import AttackStartedEvent
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import CharacterUpdateEvent, UpdateType
+from JrpgBattle.BattleEventHandling.EventManagement import BattleEvent, EventObserver, CausalityMode, \
+    configure_causality, CAUSALITY_TRACKER
+from JrpgBattle.Character import CharacterStatus
+from JrpgBattle.Party import Party
+from tests.battle_fixtures import SOMEBODY
+
+
+class EventRecorder(EventObserver):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def handle_event(self, event) -> bool:
+        self.events.append(event)
+        return False
+
+
+def soak(event_count: int) -> int:
+    """Builds a causal chain of event_count events while only holding on to the latest one."""
+    latest = BattleEvent()
+    tracemalloc.start()
+    baseline = None
+    for i in range(event_count):
+        latest = BattleEvent(cause=latest)
+        if i == event_count // 10:
+            baseline = tracemalloc.get_traced_memory()[0]
+    growth = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return growth
+
+
+def main():
+    capacity = 64
+    event_count = 1000000
+
+    configure_causality(CausalityMode.BOUNDED, capacity)
+    growth = soak(event_count)
+    print(f'bounded: {growth / 1024:.1f} KiB growth over {event_count} events')
+    assert growth < 64 * 1024
+    latest = CAUSALITY_TRACKER.retained[-1]
+    assert len(latest.get_causal_chain()) == capacity
+
+    configure_causality(CausalityMode.WEAK)
+    growth = soak(event_count)
+    print(f'weak: {growth / 1024:.1f} KiB growth over {event_count} events')
+    assert growth < 64 * 1024
+
+    configure_causality(CausalityMode.OFF)
+    growth = soak(event_count)
+    print(f'off: {growth / 1024:.1f} KiB growth over {event_count} events')
+    assert growth < 64 * 1024
+
+    # the original behaviour keeps every event alive, so it only gets a short soak
+    configure_causality(CausalityMode.FULL)
+    growth = soak(event_count // 10)
+    print(f'full: {growth / 1024:.1f} KiB growth over {event_count // 10} events')
+    assert growth > event_count // 10 * 100
+
+    # chains built by a battle stay queryable for as long as their events are retained
+    for mode in (CausalityMode.FULL, CausalityMode.WEAK, CausalityMode.BOUNDED):
+        configure_causality(mode, capacity)
+        recorder = EventRecorder()
+        terra = CharacterStatus(SOMEBODY, 'Terra')
+        mad_dog = CharacterStatus(SOMEBODY, 'Mad Dog')
+        Party('PLAYER', {terra})
+        Party('ENEMY', {mad_dog})
+        terra.register_observer(recorder)
+        mad_dog.register_observer(recorder)
+        attack = next(iter(terra.get_attack_list()))
+        for _ in range(3):
+            terra.start_turn()
+            terra.turn_interval()
+            mad_dog.start_turn()
+            DetailedAttackPlan(attack, terra, {mad_dog}).execute()
+        death = next(event for event in recorder.events
+                     if isinstance(event, CharacterUpdateEvent) and event.event_type == UpdateType.CHARACTER_DIED)
+        chain = death.get_causal_chain()
+        assert [type(event) for event in chain] == [CharacterUpdateEvent, CharacterUpdateEvent, AttackStartedEvent]
+        assert chain[1].event_type == UpdateType.DAMAGE_INCURRED
+        assert death in chain[1].get_effects()
+
+    configure_causality(CausalityMode.OFF)
+    death_cause = CharacterUpdateEvent(terra, UpdateType.DAMAGE_INCURRED, hp_change=4)
+    assert CharacterUpdateEvent(terra, UpdateType.CHARACTER_DIED, cause=death_cause).get_cause() is None
+    configure_causality(CausalityMode.FULL)
+
+
+if __name__ == '__main__':
+    main()
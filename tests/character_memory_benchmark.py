@@ -0,0 +1,43 @@
+import time
+import tracemalloc
+from fractions import Fraction
+
+from JrpgBattle.Attack import VanillaAttack, AttackType
+from JrpgBattle.Character import CharacterStatus, Multiplier
+from tests.battle_fixtures import DEFAULT_ATTACK, build_somebody
+
+SOMEBODY = build_somebody(max_hp=40,
+                          attacks=(DEFAULT_ATTACK,
+                                   VanillaAttack('fireball', attack_type=AttackType.FIRE, damage=6),
+                                   VanillaAttack('stab', attack_type=AttackType.STAB, damage=5)),
+                          offensive_type_affinities={Multiplier(Fraction(3, 2), type_mask=4)},
+                          defensive_type_affinities={Multiplier(Fraction(1, 2), type_mask=8),
+                                                     Multiplier(Fraction(5, 4), type_mask=3, type_value=1)})
+
+
+def spawn(names):
+    return [CharacterStatus(SOMEBODY, name) for name in names]
+
+
+def main():
+    count = 10000
+    # the names are built and interned up front, so only the characters themselves are measured
+    names = [f'Mad Dog {i}' for i in range(count)]
+    spawn(names)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    characters = spawn(names)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    start = time.perf_counter()
+    for _ in range(5):
+        spawn(names)
+    elapsed = (time.perf_counter() - start) / (5 * count)
+    print(f'{count} characters: {allocated / count:.0f} bytes per character, {elapsed * 1e6:.2f} us per character')
+    assert len(characters) == count
+
+
+if __name__ == '__main__':
+    main()
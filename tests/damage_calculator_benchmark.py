@@ -0,0 +1,125 @@
+import random
+import time
+from fractions import Fraction
+from math import ceil
+
+from JrpgBattle.Attack import VanillaAttack, AttackPlan, AttackType
+from JrpgBattle.Character import CharacterTemplate, CharacterStatus, Multiplier
+from JrpgBattle.DamageCalculator import FractionDamageCalculator, FixedPointDamageCalculator
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient
+from tests.battle_fixtures import build_client, DUEL
+
+MULTIPLIERS = [Fraction(1, 2), Fraction(3, 2), Fraction(2), Fraction(3, 4), Fraction(5, 4), Fraction(1, 3),
+               Fraction(7, 3), Fraction(9, 10), Fraction(11, 7)]
+PARRY_EFFECTIVENESS = [Fraction(0), Fraction(1, 4), Fraction(1, 3), Fraction(1, 2), Fraction(2, 3), Fraction(3, 4),
+                       Fraction(9, 10), Fraction(99, 100), Fraction(1)]
+
+
+def reference_damage(base_damage, multipliers, defender, target):
+    """The damage math exactly as DetailedAttackPlan.execute did it with Fractions."""
+    parry_multiplier = Fraction(1, 1)
+    if defender is not None:
+        parry_effectiveness = defender.get_parry_effectiveness()
+        assist_penalty = Fraction(0) if defender is target else Fraction(1, 2)
+        parry_multiplier = 1 - (parry_effectiveness ** float(assist_penalty + target.get_vulnerability()))
+    if parry_multiplier <= 0:
+        return None
+    total_multiplier = Fraction(1, 1)
+    for multiplier in multipliers:
+        total_multiplier *= multiplier
+    return ceil(base_damage*total_multiplier*parry_multiplier)
+
+
+def build_corpus(size: int):
+    rng = random.Random(0)
+    defenders = [CharacterStatus(CharacterTemplate(f'parry {p}', 10, parry_effectiveness=p), f'defender {p}')
+                 for p in PARRY_EFFECTIVENESS]
+    targets = []
+    for vulnerability in range(8):
+        target = CharacterStatus(CharacterTemplate('target', 10, parry_effectiveness=Fraction(1, 2)),
+                                 f'target {vulnerability}')
+        target.vulnerability = vulnerability
+        targets.append(target)
+    corpus = []
+    for _ in range(size):
+        target = rng.choice(targets)
+        roll = rng.random()
+        defender = None if roll < 0.3 else target if roll < 0.5 else rng.choice(defenders)
+        multipliers = [rng.choice(MULTIPLIERS) for _ in range(rng.randint(0, 3))]
+        base_damage = rng.choice([0, 1, 2, 3, 7, 10, 13, 64, 99, 100, 255, 1000, rng.randint(0, 10 ** 6)])
+        corpus.append((base_damage, multipliers, defender, target))
+    return corpus
+
+
+def resolve(calculator, base_damage, multipliers, defender, target):
+    parry_multiplier = None if defender is None else calculator.compute_parry_multiplier(defender, target)
+    if parry_multiplier is not None and parry_multiplier <= 0:
+        return None
+    return calculator.compute_damage(base_damage, multipliers, parry_multiplier)
+
+
+BRAWLER = CharacterTemplate(name='brawler', max_hp=45,
+                            attack_list=frozenset({VanillaAttack('jab', damage=3),
+                                                   VanillaAttack('haymaker', attack_type=AttackType.STRIKE, damage=7,
+                                                                 stamina_point_cost=300)}),
+                            parry_effectiveness=Fraction(2, 3),
+                            offensive_type_affinities={Multiplier(Fraction(5, 4), attack_types={AttackType.STRIKE})},
+                            defensive_type_affinities={Multiplier(Fraction(2, 3), type_mask=3, type_value=3)})
+
+
+class BrawlingServer(PlayerServer):
+    """Attacks and defends at random, so parries and type multipliers both come up."""
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        members = sorted(team, key=lambda member: member.get_character_name())
+        targets = sorted(enemy, key=lambda target: target.get_character_name())
+        attacks = []
+        defenses = {}
+        for member in members:
+            if self.random.random() < 0.4:
+                defenses[member] = self.random.choice(members)
+            else:
+                attack = self.random.choice(sorted(member.get_attack_list(), key=lambda a: a.name))
+                attacks.append(AttackPlan(member, attack, {self.random.choice(targets)}))
+        assert client.process_command_response(attacks, defenses, transaction_id) == BattleClient.SUCCESS
+        return PlayerServer.SUCCESS
+
+
+def play_battle(seed: int, damage_calculator=None):
+    client = build_client([BrawlingServer(seed * 2), BrawlingServer(seed * 2 + 1)], 3, BRAWLER, DUEL,
+                          damage_calculator=damage_calculator)
+    client.start_battle(max_turns=60)
+    return client.build_result()
+
+
+def check_client_configuration():
+    """The Fraction math stays the default, and a client configured with another calculator plays the same battles."""
+    assert isinstance(HeadlessBattleClient().damage_calculator, FractionDamageCalculator)
+    for seed in range(10):
+        reference = play_battle(seed)
+        fixed_point = play_battle(seed, FixedPointDamageCalculator())
+        assert repr(reference) == repr(fixed_point), (reference, fixed_point)
+
+
+def main():
+    check_client_configuration()
+
+    corpus = build_corpus(200000)
+    golden = [reference_damage(*case) for case in corpus]
+    assert sum(damage is None for damage in golden) > 0
+    print(f'{"calculator":>12} {"resolutions/s":>15}')
+    for calculator in (FractionDamageCalculator(), FixedPointDamageCalculator()):
+        start = time.perf_counter()
+        results = [resolve(calculator, *case) for case in corpus]
+        elapsed = time.perf_counter() - start
+        print(f'{type(calculator).__name__[:-16]:>12} {len(corpus) / elapsed:>15.0f}')
+        mismatches = [(case, expected, actual) for case, expected, actual in zip(corpus, golden, results)
+                      if expected != actual]
+        assert not mismatches, mismatches[:5]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+from JrpgBattle.GameManagement.AsyncBattleClient import AsyncBattleClient, AsyncPlayerServer, PlayerServerAdapter
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer, AggroFallbackPolicy
+from tests.battle_fixtures import build_client, DUEL
+
+
+class StalledPlayerServer(PlayerServer):
+    """Blocks like an unanswered input() prompt, then tries to answer after the deadline."""
+    def __init__(self, stall: float):
+        self.stall = stall
+        self.time_budgets = []
+        self.late_responses = []
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        self.time_budgets.append(time_budget)
+        time.sleep(self.stall)
+        self.late_responses.append(client.process_command_response([], {}, transaction_id))
+        return PlayerServer.SUCCESS
+
+
+class SilentPlayerServer(AsyncPlayerServer):
+    """Accepts every request and never answers."""
+    async def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        return AsyncPlayerServer.SUCCESS
+
+
+def main():
+    deadline = 0.02
+    stalled = StalledPlayerServer(stall=deadline * 3)
+    client = build_client([stalled, AggroNonPlayerServer()], party_names=DUEL,
+                          command_deadline=deadline, fallback_policy=AggroFallbackPolicy())
+    start = time.perf_counter()
+    winner = client.start_battle()
+    elapsed = time.perf_counter() - start
+    # the fallback policy played the stalled player's turns, and moves first, so it wins
+    assert winner.party.name == 'PLAYER'
+    assert all(0 < budget <= deadline for budget in stalled.time_budgets)
+    # each turn waits at most one deadline for the stalled player
+    assert elapsed < len(stalled.time_budgets) * deadline * 2
+
+    time.sleep(stalled.stall)
+    assert stalled.late_responses and all(rval == BattleClient.EXPIRED for rval in stalled.late_responses)
+    assert threading.active_count() < 5
+
+    async_client = build_client([SilentPlayerServer(), PlayerServerAdapter(AggroNonPlayerServer())], party_names=DUEL,
+                                client_class=AsyncBattleClient, command_deadline=deadline,
+                                fallback_policy=AggroFallbackPolicy())
+    winner = asyncio.run(async_client.start_battle())
+    assert winner.party.name == 'PLAYER'
+
+
+if __name__ == '__main__':
+    main()
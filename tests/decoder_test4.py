@@ -0,0 +1,76 @@
+import json
+import os
+from fractions import Fraction
+
+from JrpgBattle.Attack import AttackType
+from JrpgBattle.Character import Multiplier
+from JrpgBattle.JsonProcessing.JrpgEncoder import JrpgDataManager, decode_jrpg_data, encode_jrpg_data
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+FIREPROOF_TEMPLATE = '''
+{
+  "__class__": "CharacterTemplate",
+  "template_name": "fireproof",
+  "max_hp": 10,
+  "offensive_type_affinities": [],
+  "defensive_type_affinities": [
+    {
+      "__class__": "Multiplier",
+      "multiplier": "1/2",
+      "type_mask": 4,
+      "type_value": 4
+    }
+  ],
+  "attack_list": [
+    "default"
+  ],
+  "parry_effectiveness": "3/4"
+}
+'''
+
+
+def main():
+    # the bitmask predicate matches the same types as listing them out
+    for type_mask in range(16):
+        for type_value in range(16):
+            if type_value & ~type_mask:
+                continue
+            declared = Multiplier(Fraction(2), type_mask=type_mask, type_value=type_value)
+            listed = Multiplier(Fraction(2), attack_types={t for t in AttackType if t & type_mask == type_value})
+            assert declared == listed and hash(declared) == hash(listed)
+            for attack_type in AttackType:
+                assert declared.applies_to(attack_type) == listed.applies_to(attack_type)
+    fire = Multiplier(Fraction(1, 2), type_mask=4)
+    assert fire.type_value == 4 and fire.attack_types == {t for t in AttackType if t & 4}
+    for bad_arguments in ({'type_mask': 4, 'type_value': 8}, {'type_value': 4},
+                          {'type_mask': 4, 'attack_types': {4}}):
+        try:
+            Multiplier(Fraction(2), **bad_arguments)
+            assert False, bad_arguments
+        except ValueError:
+            pass
+
+    # declared multipliers survive a round trip through JSON, while callables can't be written at all
+    for multiplier in (fire, Multiplier(Fraction(3), type_mask=3, type_value=1),
+                       Multiplier(Fraction(5, 4), attack_types={AttackType.STAB, AttackType.POISON})):
+        decoded = json.loads(json.dumps(multiplier, default=encode_jrpg_data), object_hook=decode_jrpg_data)
+        assert decoded == multiplier and decoded.type_mask == multiplier.type_mask
+    try:
+        json.dumps(Multiplier(Fraction(2), is_relevant=lambda plan: True), default=encode_jrpg_data)
+        assert False
+    except TypeError:
+        pass
+
+    # templates declare their multipliers in the data files, like this fire resistance
+    manager = JrpgDataManager()
+    with open(os.path.join(DATA_DIRECTORY, 'VanillaAttacks.json'), 'r') as f:
+        json.load(f, object_hook=manager.get_jrpg_decoder_func())
+    json.loads(FIREPROOF_TEMPLATE, object_hook=manager.get_jrpg_decoder_func())
+    fireproof = manager.character_cache['fireproof']
+    assert set(fireproof.get_defensive_type_affinities()) == {fire}
+    (loaded,) = fireproof.get_defensive_type_affinities()
+    assert loaded.is_static() and loaded.applies_to(AttackType.FIRE_STAB) and not loaded.applies_to(AttackType.STAB)
+
+
+if __name__ == '__main__':
+    main()
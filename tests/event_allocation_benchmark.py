@@ -0,0 +1,60 @@
+import time
+
+from JrpgBattle.BattleEventHandling.EventManagement import BattleEvent
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import MainBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from JrpgBattle.Party import Party
+from tests.battle_fixtures import build_somebody, build_client, DUEL
+
+SOMEBODY = build_somebody(max_hp=10000)
+
+
+class ObservingHeadlessBattleClient(HeadlessBattleClient):
+    """Listens to every event like the headless client used to, which forces every event to be built."""
+    def observe_party(self, party: Party):
+        MainBattleClient.observe_party(self, party)
+
+
+class EventCounter:
+    """Counts BattleEvent constructions by wrapping BattleEvent.__init__."""
+    def __init__(self):
+        self.count = 0
+        self.original_init = BattleEvent.__init__
+
+    def __enter__(self):
+        counter = self
+
+        def counting_init(event, cause=None):
+            counter.count += 1
+            counter.original_init(event, cause)
+        BattleEvent.__init__ = counting_init
+        return self
+
+    def __exit__(self, *args):
+        BattleEvent.__init__ = self.original_init
+
+
+def run(client_class, party_size: int, turns: int):
+    client = build_client([AggroNonPlayerServer(), AggroNonPlayerServer()], party_size, SOMEBODY, DUEL, client_class)
+    with EventCounter() as counter:
+        start = time.perf_counter()
+        client.start_battle(max_turns=turns)
+        elapsed = time.perf_counter() - start
+    return counter.count / turns, elapsed / turns * 1e6
+
+
+def main():
+    turns = 2000
+    print(f'{"party size":>10} {"events/turn before":>20} {"events/turn after":>20} '
+          f'{"us/turn before":>16} {"us/turn after":>16}')
+    for party_size in (1, 10, 100):
+        before_events, before_time = run(ObservingHeadlessBattleClient, party_size, turns)
+        after_events, after_time = run(HeadlessBattleClient, party_size, turns)
+        print(f'{party_size:>10} {before_events:>20.1f} {after_events:>20.1f} '
+              f'{before_time:>16.1f} {after_time:>16.1f}')
+        assert after_events == 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+from JrpgBattle.Attack import VanillaAttack
+from JrpgBattle.BattleEventHandling.AttackEvent import AttackEvent, ParryEvent, AttackEventType
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import UpdateType, CharacterUpdateEvent
+from JrpgBattle.BattleEventHandling.EventManagement import EventObserver, BattleEvent, notify_shared_observers
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent, PartyEventType
+from JrpgBattle.Character import CharacterStatus
+from JrpgBattle.Party import Party
+from tests.battle_fixtures import SOMEBODY
+
+
+class RecordingObserver(EventObserver[BattleEvent]):
+    def __init__(self, deregister_after: int = None):
+        super().__init__()
+        self.events = []
+        self.deregister_after = deregister_after
+
+    def handle_event(self, event: BattleEvent) -> bool:
+        self.events.append(event)
+        return self.deregister_after is not None and len(self.events) >= self.deregister_after
+
+
+def main():
+    terra = CharacterStatus(SOMEBODY, 'Terra')
+    cloud = CharacterStatus(SOMEBODY, 'Cloud')
+    everything = RecordingObserver()
+    deaths = RecordingObserver()
+    attacks = RecordingObserver()
+    terra.register_observer(everything)
+    terra.register_observer(deaths, UpdateType.CHARACTER_DIED)
+    terra.register_observer(attacks, AttackEvent)
+
+    assert terra.wants(AttackEvent)
+    assert terra.get_handlers(CharacterUpdateEvent, UpdateType.SP_GAINED) == (everything,)
+    assert set(terra.get_handlers(CharacterUpdateEvent, UpdateType.CHARACTER_DIED)) == {everything, deaths}
+    # subscribing to a class also subscribes to its subclasses
+    assert set(terra.get_handlers(ParryEvent, AttackEventType.ATTACK_PARRIED)) == {everything, attacks}
+
+    terra.receive_enemy_damage(4)
+    terra.receive_enemy_damage(6)
+    assert [event.event_type for event in everything.events] == \
+           [UpdateType.DAMAGE_INCURRED, UpdateType.DAMAGE_INCURRED, UpdateType.CHARACTER_DIED]
+    assert [event.event_type for event in deaths.events] == [UpdateType.CHARACTER_DIED]
+    assert attacks.events == []
+
+    # shared observers are only notified once, and deregistered from every subject
+    once = RecordingObserver(deregister_after=1)
+    terra.register_observer(once)
+    cloud.register_observer(once)
+    parry = ParryEvent(cloud, VanillaAttack('default'), terra, terra)
+    notify_shared_observers(parry, cloud, terra, terra)
+    assert once.events == [parry]
+    assert once not in terra.observers and once not in cloud.observers and once.subject_count == 0
+
+    terra.deregister_observer(everything)
+    assert terra.get_handlers(CharacterUpdateEvent, UpdateType.SP_GAINED) == ()
+    assert not terra.wants(CharacterUpdateEvent, UpdateType.SP_GAINED)
+
+    # a party's observers receive its members' events, but only once if they also observe the member
+    party = Party('PLAYER', {cloud})
+    watcher = RecordingObserver()
+    party.register_observer(watcher)
+    cloud.register_observer(watcher)
+    spawned = party.spawn(SOMEBODY, 3)
+    assert [member.character_name for member in spawned] == ['somebody 1', 'somebody 2', 'somebody 3']
+    assert all(member in party and member.get_party() is party for member in spawned)
+    assert cloud.get_handlers(CharacterUpdateEvent, UpdateType.DAMAGE_INCURRED) == (watcher,)
+    cloud.receive_enemy_damage(1)
+    spawned[0].receive_enemy_damage(1)
+    party.notify_party_event(PartyEventType.TURN_STARTED)
+    assert [event.event_type for event in watcher.events] == \
+           [UpdateType.DAMAGE_INCURRED, UpdateType.DAMAGE_INCURRED, PartyEventType.TURN_STARTED]
+    # party observers which ask to be deregistered are removed from the party
+    leaving = RecordingObserver(deregister_after=1)
+    party.register_observer(leaving, CharacterUpdateEvent)
+    spawned[1].receive_enemy_damage(1)
+    assert len(leaving.events) == 1 and leaving not in party.observers
+    try:
+        party.spawn(SOMEBODY, 2, first_number=3)
+        assert False
+    except ValueError:
+        pass
+    assert len(party.characters) == 4
+
+
+if __name__ == '__main__':
+    main()
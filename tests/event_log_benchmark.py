@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import tempfile
+import time
+
+from JrpgBattle.BattleEventHandling.AttackEvent import AttackEvent
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import CharacterUpdateEvent
+from JrpgBattle.BattleEventHandling.EventLog import EventLogWriter, EventLogReader
+from JrpgBattle.BattleEventHandling.EventManagement import EventObserver
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from tests.battle_fixtures import build_somebody, build_party, DUEL
+
+SOMEBODY = build_somebody(max_hp=200)
+
+
+class TextLogWriter(EventObserver):
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def observe_party(self, party):
+        party.register_observer(self, PartyEvent)
+        for member in party:
+            member.register_observer(self, CharacterUpdateEvent, AttackEvent)
+
+    def handle_event(self, event) -> bool:
+        self.stream.write(str(event) + '\n')
+        return False
+
+
+class JsonLogWriter(TextLogWriter):
+    def handle_event(self, event) -> bool:
+        record = {'event': type(event).__name__, 'type': event.event_type.name}
+        for key, value in vars(event).items():
+            if isinstance(value, (int, bool)):
+                record[key] = value
+            elif hasattr(value, 'identifier'):
+                record[key] = value.identifier
+            elif hasattr(value, 'name') and isinstance(value.name, str):
+                record[key] = value.name
+        self.stream.write(json.dumps(record) + '\n')
+        return False
+
+
+class EventRecorder(TextLogWriter):
+    def __init__(self):
+        super().__init__(None)
+        self.events = []
+
+    def handle_event(self, event) -> bool:
+        self.events.append(event)
+        return False
+
+
+def run(writer, party_size: int, recorder: EventRecorder = None) -> float:
+    client = HeadlessBattleClient()
+    parties = [build_party(name, party_size, SOMEBODY) for name in DUEL]
+    for party in parties:
+        client.register_party(party, AggroNonPlayerServer())
+        writer.observe_party(party)
+        if recorder is not None:
+            recorder.observe_party(party)
+    start = time.perf_counter()
+    client.start_battle(max_turns=200)
+    return time.perf_counter() - start
+
+
+def check_append():
+    """Two battles appended to the same file read back as one log."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'battles.log')
+        recorder = EventRecorder()
+        record_counts = []
+        for _ in range(2):
+            with open(path, 'ab') as stream, EventLogWriter(stream) as writer:
+                run(writer, 3, recorder)
+            record_counts.append(writer.record_count)
+        with open(path, 'rb') as stream:
+            logged_events = list(EventLogReader(stream))
+    assert len(logged_events) == sum(record_counts) == len(recorder.events)
+    assert [logged.event_type for logged in logged_events] == [event.event_type for event in recorder.events]
+
+
+def main():
+    check_append()
+    party_size = 20
+    binary_stream = io.BytesIO()
+    recorder = EventRecorder()
+    with EventLogWriter(binary_stream) as binary_writer:
+        run(binary_writer, party_size, recorder)
+    binary_time = run(EventLogWriter(io.BytesIO()), party_size)
+    text_stream = io.StringIO()
+    text_time = run(TextLogWriter(text_stream), party_size)
+    json_stream = io.StringIO()
+    json_time = run(JsonLogWriter(json_stream), party_size)
+
+    binary_size = len(binary_stream.getvalue())
+    text_size = len(text_stream.getvalue().encode('utf-8'))
+    json_size = len(json_stream.getvalue().encode('utf-8'))
+    print(f'{binary_writer.record_count} events')
+    print(f'binary: {binary_size:>10} bytes {binary_time:.3f}s')
+    print(f'text:   {text_size:>10} bytes {text_time:.3f}s')
+    print(f'json:   {json_size:>10} bytes {json_time:.3f}s')
+    assert binary_size < text_size / 2 and binary_size < json_size / 4
+
+    # the log reads back lazily, in the order the events were published
+    binary_stream.seek(0)
+    logged_events = iter(EventLogReader(binary_stream, chunk_size=1000))
+    count = 0
+    for original, logged in zip(recorder.events, logged_events):
+        assert logged.event_type is original.event_type
+        if isinstance(original, CharacterUpdateEvent):
+            assert logged.subject == original.character.character_name
+            assert logged.hp_change == original.hp_change
+            assert logged.sp_change == original.sp_change
+            assert logged.character_died == original.character_died
+        elif isinstance(original, AttackEvent):
+            assert logged.subject == original.attacker.character_name
+            assert logged.attack == original.attack.name
+            if hasattr(original, 'defender'):
+                assert logged.defender == original.defender.character_name
+        else:
+            assert logged.subject == original.party.name
+        count += 1
+    assert count == len(recorder.events) == binary_writer.record_count
+    assert next(logged_events, None) is None
+
+
+if __name__ == '__main__':
+    main()
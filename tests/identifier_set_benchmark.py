@@ -0,0 +1,68 @@
+import random
+import timeit
+
+from JrpgBattle.Character import CharacterIdentifier
+from JrpgBattle.IdentifierSet import IdentifierSet, Identifier
+
+
+class LegacyIdentifier:
+    """
+    Stands in for an Identifier with the equality from before interning, which hashed the name
+    and compared the names and the domains, looked up through get_domain, of the two identifiers.
+    """
+    __slots__ = ('identifier',)
+
+    def __init__(self, identifier: Identifier):
+        self.identifier = identifier
+
+    def __eq__(self, other):
+        return isinstance(other, LegacyIdentifier) and \
+               self.identifier.get_domain() == other.identifier.get_domain() and \
+               self.identifier.identifier == other.identifier.identifier
+
+    def __hash__(self):
+        return hash(self.identifier.identifier)
+
+
+class LinearIdentifierSet:
+    """The set-backed IdentifierSet from before the hash index, kept here for comparison."""
+    def __init__(self, items):
+        self.items = set(items)
+
+    def __contains__(self, x):
+        return x in self.items
+
+    def __getitem__(self, identifier):
+        return next(item for item in self.items if item == identifier)
+
+
+def bench(statement, number: int) -> float:
+    return timeit.timeit(statement, number=number) / number * 1e6
+
+
+def main():
+    random.seed(0)
+    print(f'{"members":>8} {"old lookup":>12} {"new lookup":>12} {"old in":>10} {"new in":>10} {"new &":>10}  (us/op)')
+    for size in (10, 1000, 100000):
+        members = [CharacterIdentifier(f'character {i}') for i in range(size)]
+        probes = [CharacterIdentifier(f'character {random.randrange(size)}') for _ in range(100)]
+        old = LinearIdentifierSet(LegacyIdentifier(member) for member in members)
+        old_probes = [LegacyIdentifier(probe) for probe in probes]
+        new = IdentifierSet(members)
+        other = IdentifierSet(members[::2])
+        # the linear scan gets slow quickly, so it only gets a handful of lookups at the larger sizes
+        old_number = max(1, 100000 // size)
+        old_lookup = bench(lambda: [old[probe] for probe in old_probes], old_number) / len(probes)
+        new_lookup = bench(lambda: [new[probe] for probe in probes], 1000) / len(probes)
+        old_contains = bench(lambda: [probe in old for probe in old_probes], 1000) / len(probes)
+        new_contains = bench(lambda: [probe in new for probe in probes], 1000) / len(probes)
+        intersection = bench(lambda: new & other, max(1, 10000 // size)) / size
+        for old_probe, probe in zip(old_probes, probes):
+            assert old[old_probe].identifier is new[probe] and old_probe in old
+        print(f'{size:>8} {old_lookup:>12.3f} {new_lookup:>12.3f} '
+              f'{old_contains:>10.3f} {new_contains:>10.3f} {intersection:>10.3f}')
+        assert len(new & other) == len(other)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import time
+
+from JrpgBattle.Attack import AttackPlan
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer, BattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from tests.battle_fixtures import SOMEBODY, build_party
+
+
+class ViewCheckingServer(AggroNonPlayerServer):
+    """Checks the views it's given against the battle's alliances before attacking like an AggroNonPlayerServer."""
+    def __init__(self, alliances):
+        super().__init__()
+        self.alliances = alliances  # maps each party name to its alliance
+        self.requests = 0
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        self.requests += 1
+        remaining = {player.party.name for player in client.roster}
+        alliance = self.alliances[team.name]
+        assert {view.name for view in enemy.get_parties()} == \
+               {name for name in remaining if self.alliances[name] != alliance}
+        assert {view.name for view in team.get_allies().get_parties()} == \
+               {name for name in remaining if self.alliances[name] == alliance and name != team.name}
+        # allies can't be attacked
+        for ally in team.get_allies():
+            plan = AttackPlan(next(iter(team)), next(iter(SOMEBODY.get_attack_list())), {ally})
+            assert not client.validate_attack_plan(plan, client.party_ids[team])
+        return super().process_command_request(client, transaction_id, team, enemy, time_budget)
+
+
+def build_battle(party_count: int, alliances=None):
+    client = HeadlessBattleClient()
+    alliances = alliances if alliances is not None else {f'PARTY {i}': f'PARTY {i}' for i in range(party_count)}
+    servers = []
+    for index in range(party_count):
+        name = f'PARTY {index}'
+        server = ViewCheckingServer(alliances)
+        party = build_party(name, member_name='{party} fighter')
+        assert client.register_party(party, server, alliances[name]) == BattleClient.SUCCESS
+        servers.append(server)
+    return client, servers
+
+
+def check_alliances():
+    alliances = {f'PARTY {i}': 'RED' if i % 2 else 'BLUE' for i in range(6)}
+    client, servers = build_battle(6, alliances)
+    winner = client.start_battle(max_turns=200)
+    assert winner is not None
+    assert {alliances[player.party.name] for player in client.roster} == {alliances[winner.party.name]}
+    assert all(server.requests > 0 for server in servers)
+
+    # restoring a snapshot relinks the views of players who had been eliminated
+    client, _ = build_battle(4)
+    snapshot = client.snapshot()
+    client.start_battle(max_turns=200)
+    assert len(client.roster) == 1
+    client.restore(snapshot)
+    assert len(client.roster) == 4 and all(len(player.opponents) == 3 for player in client.roster)
+    assert client.start_battle(max_turns=200) is not None
+
+def main():
+    check_alliances()
+    # every party is in its own alliance, so the battle is a free-for-all
+    print(f'{"parties":>8} {"turns":>6} {"us/turn":>10}')
+    for party_count in (2, 4, 8, 16):
+        client, _ = build_battle(party_count)
+        start = time.perf_counter()
+        winner = client.start_battle(max_turns=1000)
+        elapsed = time.perf_counter() - start
+        assert winner is not None and client.roster == [winner]
+        print(f'{party_count:>8} {client.turn:>6} {elapsed / client.turn * 1e6:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
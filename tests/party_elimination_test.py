@@ -0,0 +1,86 @@
+from JrpgBattle.BattleEventHandling.EventManagement import EventObserver
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import CharacterUpdateEvent, UpdateType
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent, PartyEventType
+from JrpgBattle.Character import CharacterStatus
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from JrpgBattle.Party import Party
+from tests.battle_fixtures import SOMEBODY, build_party
+
+
+class WipeRecorder(EventObserver[PartyEvent]):
+    def __init__(self):
+        super().__init__()
+        self.wiped = []
+
+    def handle_event(self, event: PartyEvent) -> bool:
+        self.wiped.append(event.party.name)
+        return False
+
+
+def check_counter():
+    party = Party('HORDE', {CharacterStatus(SOMEBODY, 'leader')})
+    party.spawn(SOMEBODY, 3)
+    recorder = WipeRecorder()
+    party.register_observer(recorder, PartyEventType.WIPED_OUT)
+    assert party.get_alive_count() == 4 and not party.is_wiped_out()
+    members = list(party)
+    for index, member in enumerate(members):
+        state = party.get_state()
+        member.receive_enemy_damage(5)
+        assert party.get_alive_count() == 4 - index
+        member.receive_enemy_damage(5)
+        assert party.get_alive_count() == 3 - index
+        # hitting a member which is already dead doesn't count its death again
+        member.receive_enemy_damage(5)
+        assert party.get_alive_count() == 3 - index
+        assert party.get_alive_count() == sum(not m.is_dead() for m in members)
+    assert party.is_wiped_out() and recorder.wiped == ['HORDE']
+    party.set_state(state)
+    assert party.get_alive_count() == 1
+    for member in members:
+        member.set_state(CharacterStatus(SOMEBODY, 'fresh').get_state())
+    assert party.count_alive() == 4
+
+
+class DeathRecorder(EventObserver[CharacterUpdateEvent]):
+    def __init__(self):
+        super().__init__()
+        self.deaths = []
+
+    def handle_event(self, event: CharacterUpdateEvent) -> bool:
+        self.deaths.append(event.character.character_name)
+        return False
+
+
+def check_single_death():
+    party = Party('PLAYER', {CharacterStatus(SOMEBODY, 'Terra'), CharacterStatus(SOMEBODY, 'Locke')})
+    terra = party.characters.get(CharacterStatus(SOMEBODY, 'Terra'))
+    recorder = DeathRecorder()
+    terra.register_observer(recorder, UpdateType.CHARACTER_DIED)
+    for _ in range(3):
+        terra.receive_enemy_damage(10)
+    assert recorder.deaths == ['Terra'] and terra.current_hp == 0
+    assert party.get_alive_count() == 1 and not party.is_wiped_out()
+
+
+def check_elimination_order():
+    # the first party is attacked by both of the others, so it drops out and the remaining two fight it out
+    client = HeadlessBattleClient()
+    parties = [build_party(name, member_name='{party} fighter') for name in ('FIRST', 'SECOND', 'THIRD')]
+    for party in parties:
+        client.register_party(party, AggroNonPlayerServer())
+    winner = client.start_battle(max_turns=50)
+    assert winner is not None and client.roster == [winner]
+    assert parties[0].is_wiped_out() and not winner.party.is_wiped_out()
+    assert client.eliminations.eliminated == []
+
+
+def main():
+    check_counter()
+    check_single_death()
+    check_elimination_order()
+
+
+if __name__ == '__main__':
+    main()
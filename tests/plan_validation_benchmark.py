@@ -0,0 +1,102 @@
+import random
+import time
+from fractions import Fraction
+
+from JrpgBattle.Attack import VanillaAttack, AttackPlan
+from JrpgBattle.Character import CharacterTemplate
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import BattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from JrpgBattle.Party import Party
+
+JAB = VanillaAttack('jab', damage=3)
+SWEEP = VanillaAttack('sweep', damage=2, target_range=(2, 4))
+UNKNOWN = VanillaAttack('unknown', damage=9)
+FIGHTER = CharacterTemplate(name='fighter', max_hp=40, attack_list=frozenset({JAB, SWEEP}),
+                            parry_effectiveness=Fraction(3, 4))
+
+
+def roster_validation(client, plan, user_party) -> bool:
+    """The validation MainBattleClient did before it was indexed: copy the attack list, then search the roster."""
+    if plan.user not in user_party:
+        return False
+    user_status = client.characters_ids[plan.user]
+    if plan.attack not in set(user_status.get_attack_list()):
+        return False
+    for target in plan.targets:
+        for player in client.roster:
+            if user_party is not player.party and target in player.party:
+                return True
+    return False
+
+
+def build_plans(rng, parties, party):
+    """One plan per member of the party, a few of which are invalid."""
+    members = list(party)
+    others = [member for other in parties if other is not party for member in other]
+    plans = []
+    for member in members:
+        roll = rng.random()
+        if roll < 0.05:
+            plans.append(AttackPlan(member, UNKNOWN, {rng.choice(others)}))
+        elif roll < 0.1:
+            plans.append(AttackPlan(member, JAB, {rng.choice(members)}))
+        elif roll < 0.3:
+            plans.append(AttackPlan(member, SWEEP, set(rng.sample(others, rng.randint(2, 4)))))
+        else:
+            plans.append(AttackPlan(member, JAB, {rng.choice(others)}))
+    return plans
+
+
+def main():
+    party_count = 8
+    party_size = 200
+    client = HeadlessBattleClient()
+    parties = []
+    for index in range(party_count):
+        party = Party(f'PARTY {index}')
+        party.spawn(FIGHTER, party_size, name_format=f'party {index} {{template}} {{number}}')
+        client.register_party(party, AggroNonPlayerServer())
+        parties.append(party)
+    rng = random.Random(0)
+    turns = [(party, build_plans(rng, parties, party)) for party in parties for _ in range(5)]
+    plan_count = sum(len(plans) for _, plans in turns)
+
+    timings = []
+    results = []
+    for validate in (lambda plan, party: roster_validation(client, plan, party), client.validate_attack_plan):
+        start = time.perf_counter()
+        results.append([[validate(plan, party) for plan in plans] for party, plans in turns])
+        timings.append(time.perf_counter() - start)
+    reference, indexed = results
+    assert indexed == reference
+    assert 0 < sum(map(sum, indexed)) < plan_count
+
+    # target ranges are enforced as well, and wiped out parties can't be targeted any more
+    user, ally = list(parties[0])[:2]
+    target, other_target = list(parties[1])[:2]
+    assert not client.validate_attack_plan(AttackPlan(user, SWEEP, {target}), parties[0])
+    assert not client.validate_attack_plan(AttackPlan(user, JAB, {target, other_target}), parties[0])
+    assert not client.validate_attack_plan(AttackPlan(user, SWEEP, {target, ally}), parties[0])
+    assert client.validate_attack_plan(AttackPlan(user, SWEEP, {target, other_target}), parties[0])
+    for member in parties[1]:
+        member.receive_enemy_damage(member.get_current_hp())
+    assert not client.validate_attack_plan(AttackPlan(user, JAB, {target}), parties[0])
+
+    # members spawned after their party was registered are indexed before the next response is validated
+    reinforcement, = parties[2].spawn(FIGHTER, 1, name_format='reinforcement {number}')
+    recruit, = parties[3].spawn(FIGHTER, 1, name_format='recruit {number}')
+    transaction_id = client.open_transaction(client.profiles[parties[2]])
+    assert client.process_command_response([AttackPlan(reinforcement, JAB, {recruit})], {recruit: reinforcement},
+                                           transaction_id) == BattleClient.ERROR
+    assert client.process_command_response([AttackPlan(reinforcement, JAB, {recruit})], {reinforcement: reinforcement},
+                                           transaction_id) == BattleClient.SUCCESS
+    assert parties[2].attack_queue.entries[0].targets == {recruit} and reinforcement.is_defending is reinforcement
+    assert client.validate_attack_plan(AttackPlan(user, JAB, {recruit}), parties[0])
+
+    print(f'{party_count} parties x {party_size} characters, {plan_count} plans')
+    print(f'roster search: {timings[0] / plan_count * 1e6:.2f} us/plan, indexed: {timings[1] / plan_count * 1e6:.2f} us/plan')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+from JrpgBattle.GameManagement.BattleSimulation import simulate_battle, BatchBattleRunner, HeadlessBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from tests.battle_fixtures import build_client, build_party, DUEL
+
+
+def build_battle(index: int):
+    return [(build_party(name), AggroNonPlayerServer()) for name in DUEL]
+
+
+class CountingBattleClient(HeadlessBattleClient):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.attack_phases = 0
+
+    def run_attack_phase(self, player):
+        self.attack_phases += 1
+        super().run_attack_phase(player)
+
+    def run_simultaneous_attack_phase(self):
+        self.attack_phases += 1
+        return super().run_simultaneous_attack_phase()
+
+
+def check_turn_limit(party_count: int, max_turns: int, simultaneous_planning: bool = False):
+    """The battle stops before the first turn past the limit, even when the limit falls partway through a round."""
+    client = build_client([AggroNonPlayerServer() for _ in range(party_count)], client_class=CountingBattleClient,
+                          simultaneous_planning=simultaneous_planning)
+    assert client.start_battle(max_turns=max_turns) is None
+    result = client.build_result()
+    assert client.attack_phases == max_turns and result.turns == max_turns, (client.attack_phases, result)
+    rounds = max_turns if simultaneous_planning else -(-max_turns // party_count)
+    assert result.rounds == rounds, result
+
+
+def main():
+    for party_count, max_turns in ((2, 1), (2, 2), (2, 3), (3, 2), (3, 4)):
+        check_turn_limit(party_count, max_turns)
+    check_turn_limit(3, 2, simultaneous_planning=True)
+
+    result = simulate_battle(build_battle(0))
+    print(result)
+    assert result.winner == 'PLAYER'
+    assert result.hp['ENEMY 0'] == 0
+    assert result.turns > 1 and result.rounds > 1
+
+    capped = simulate_battle(build_battle(0), max_turns=2)
+    assert capped.is_draw() and capped.turns == 2
+
+    report = BatchBattleRunner(build_battle, max_workers=2, chunk_size=50).run(500)
+    print(report)
+    assert len(report.results) == 500
+    assert report.get_win_counts() == {'PLAYER': 500}
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import time
+
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from tests.battle_fixtures import build_client, DUEL
+
+
+class SlowAggroPlayerServer(AggroNonPlayerServer):
+    def __init__(self, think_time: float):
+        super().__init__()
+        self.think_time = think_time
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        time.sleep(self.think_time)
+        return super().process_command_request(client, transaction_id, team, enemy, time_budget)
+
+
+class TurtlePlayerServer(PlayerServer):
+    """Never attacks; every character defends themselves every turn."""
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        client.process_command_response([], {member: member for member in team}, transaction_id)
+        return PlayerServer.SUCCESS
+
+
+def timed_battle(simultaneous_planning: bool, think_time: float) -> float:
+    client = build_client([SlowAggroPlayerServer(think_time), SlowAggroPlayerServer(think_time)], party_names=DUEL,
+                          simultaneous_planning=simultaneous_planning)
+    start = time.perf_counter()
+    winner = client.start_battle()
+    elapsed = time.perf_counter() - start
+    assert winner is not None
+    return elapsed / client.battle_round
+
+
+def main():
+    think_time = 0.05
+    sequential = timed_battle(False, think_time)
+    simultaneous = timed_battle(True, think_time)
+    print(f'seconds per round: sequential {sequential:.3f}, simultaneous {simultaneous:.3f}')
+    # sequential rounds wait on both players in turn, simultaneous rounds only on the slowest one
+    assert simultaneous < 0.75 * sequential
+
+    # defenses set while planning must still cover the attacks in the next round;
+    # without them, the player would be dead long before the turn limit
+    client = build_client([TurtlePlayerServer(), AggroNonPlayerServer()], party_names=DUEL, simultaneous_planning=True)
+    assert client.start_battle(max_turns=10) is None
+    assert client.build_result().hp['PLAYER 0'] > 5
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import copy
+import timeit
+
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from tests.battle_fixtures import build_somebody, build_client, DUEL
+
+SOMEBODY = build_somebody(max_hp=40)
+
+
+class SnapshottingServer(AggroNonPlayerServer):
+    """Snapshots the battle while planning the given turn, then plays like an AggroNonPlayerServer."""
+    def __init__(self, turn: int):
+        super().__init__()
+        self.turn = turn
+        self.snapshot = None
+        self.states = None
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        if client.turn == self.turn and self.snapshot is None:
+            self.snapshot = client.snapshot()
+            self.states = states_of(client)
+        return super().process_command_request(client, transaction_id, team, enemy, time_budget)
+
+
+def build_duel(party_size: int, enemy_server=None) -> HeadlessBattleClient:
+    return build_client([AggroNonPlayerServer(), enemy_server if enemy_server is not None else AggroNonPlayerServer()],
+                        party_size, SOMEBODY, DUEL)
+
+
+def states_of(client: HeadlessBattleClient):
+    return [character.get_state() for character in client.characters_ids.values()], \
+           [party.get_state()[1:] for party in client.party_ids.values()]
+
+
+def outcome_of(client: HeadlessBattleClient):
+    return states_of(client), client.winner, client.turn, client.battle_round
+
+
+def check_restore():
+    # the battle played through without interruption, which a resumed battle has to end up the same way as
+    expected = build_duel(3)
+    expected.start_battle(max_turns=30)
+    finished = outcome_of(expected)
+
+    client = build_duel(3)
+    client.start_battle(max_turns=5)
+    # the sixth turn is the second player's, so the battle can't be picked up again from the first player
+    snapshot = client.snapshot()
+    assert snapshot.turn_order[0] is client.roster[1] and snapshot.phase == HeadlessBattleClient.ATTACK_PHASE
+    before = states_of(client)
+    client.resume(max_turns=30)
+    assert outcome_of(client) == finished
+    client.restore(snapshot)
+    assert states_of(client) == before
+    assert client.turn == 6 and client.winner is None and len(client.roster) == 2
+    client.resume(max_turns=30)
+    assert outcome_of(client) == finished
+
+    # a snapshot taken while the second player plans picks up with its planning phase, without redoing the upkeep
+    server = SnapshottingServer(turn=6)
+    client = build_duel(3, server)
+    client.start_battle(max_turns=30)
+    assert outcome_of(client) == finished
+    snapshot = server.snapshot
+    assert snapshot.turn_order[0] is client.roster[1] and snapshot.phase == HeadlessBattleClient.PLANNING_PHASE
+    client.restore(snapshot)
+    assert states_of(client) == server.states
+    client.resume(max_turns=30)
+    assert outcome_of(client) == finished
+
+    # the defenses are restored along with everything else
+    members = list(client.roster[0].party)
+    members[0].set_defense(members[1])
+    snapshot = client.snapshot()
+    members[0].release_defense()
+    client.restore(snapshot)
+    assert members[1].get_defender() is members[0]
+
+
+def bench(statement, number: int) -> float:
+    return timeit.timeit(statement, number=number) / number * 1e6
+
+
+def main():
+    check_restore()
+    print(f'{"party size":>10} {"snapshot":>12} {"restore":>12} {"deepcopy":>12}  (us/op)')
+    for party_size in (1, 10, 1000):
+        client = build_duel(party_size)
+        client.start_battle(max_turns=3)
+        number = max(10, 10000 // party_size)
+        snapshot = client.snapshot()
+        snapshot_time = bench(client.snapshot, number)
+        restore_time = bench(lambda: client.restore(snapshot), number)
+        # the client itself holds a lock and can't be deep copied, so only its parties are
+        parties = list(client.party_ids.values())
+        deepcopy_time = bench(lambda: copy.deepcopy(parties), max(1, number // 100))
+        print(f'{party_size:>10} {snapshot_time:>12.1f} {restore_time:>12.1f} {deepcopy_time:>12.1f}')
+        assert snapshot_time * 10 < deepcopy_time
+
+
+if __name__ == '__main__':
+    main()
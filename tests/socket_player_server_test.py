@@ -0,0 +1,213 @@
+import os
+import socket
+import tempfile
+import time
+from fractions import Fraction
+from threading import Thread
+
+from JrpgBattle.Attack import VanillaAttack, AttackType
+from JrpgBattle.Character import Multiplier
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer, AggroDeltaNonPlayerServer, \
+    AggroFallbackPolicy
+from JrpgBattle.GameManagement.SocketPlayerServer import SocketPlayerServer, SocketBattleClient, WireCodec, \
+    create_listener, HEADER
+from JrpgBattle.ViewDeltas import ViewMirror
+from tests.battle_fixtures import DEFAULT_ATTACK, build_somebody, build_client
+
+SOMEBODY = build_somebody(max_hp=40, attacks=(DEFAULT_ATTACK, VanillaAttack('fireball', attack_type=AttackType.FIRE,
+                                                                            damage=6, target_range=(1, 2))))
+
+
+def states_of(client):
+    return [character.get_state()[:8] for character in client.characters_ids.values()]
+
+
+def play(servers, party_size: int, restore_with=None):
+    """Plays part of a battle, rolls it back to the snapshot taken partway through, and plays it out."""
+    client = build_client(servers, party_size, SOMEBODY)
+    client.start_battle(max_turns=5)
+    snapshot = client.snapshot()
+    client.resume(max_turns=30)
+    client.restore(snapshot)
+    if restore_with is not None:
+        restore_with()
+    client.resume(max_turns=30)
+    return states_of(client)
+
+
+def check_codec():
+    sender = WireCodec()
+    receiver = WireCodec()
+    value = {'name': 'Terra', 'hp': -12345678901, 'fraction': 0.25, 'flags': (True, False, None),
+             'attacks': frozenset(SOMEBODY.get_attack_list()),
+             'multipliers': frozenset({Multiplier(Fraction(1, 2), type_mask=4),
+                                       Multiplier(Fraction(3, 2), attack_types={1, 2})})}
+    first = sender.encode(value)
+    assert receiver.decode(first) == value
+    # strings and attacks are only sent in full once per connection
+    second = sender.encode(value)
+    assert receiver.decode(second) == value
+    assert len(second) < len(first) // 2
+    try:
+        sender.encode(Multiplier(Fraction(1, 2), is_relevant=lambda plan: True))
+        assert False
+    except TypeError:
+        pass
+    # malformed payloads are rejected with ValueError, however they're cut short or mangled
+    payload = WireCodec().encode(value)
+    for malformed in [payload[:length] for length in range(len(payload))] + [payload + b'\x00', b'\xff', b'\x07\x02\x03']:
+        try:
+            WireCodec().decode(malformed)
+            assert False, malformed
+        except ValueError:
+            pass
+
+
+def serve(listener, remote_server, connection_limit: int):
+    remote = SocketBattleClient(remote_server)
+    thread = Thread(target=remote.serve, args=(listener, connection_limit), daemon=True)
+    thread.start()
+    return thread
+
+
+def check_transport(address):
+    expected = play([AggroNonPlayerServer(), AggroNonPlayerServer()], 3)
+    listener = create_listener(address)
+    if not isinstance(address, str):
+        address = listener.getsockname()
+    remote_server = AggroDeltaNonPlayerServer()
+    thread = serve(listener, remote_server, 2)
+    server = SocketPlayerServer(address)
+
+    def forget_mirror():
+        # the remote server loses its copy of the battle, so it has to be sent the full state again
+        remote_server.mirror = ViewMirror()
+
+    # the same connection is used for every turn of both battles
+    assert play([server, AggroNonPlayerServer()], 3) == expected
+    assert play([server, AggroNonPlayerServer()], 3, forget_mirror) == expected
+    assert server.connection_count == 1
+
+    # a broken connection is reopened, after which the full state is sent
+    assert play([server, AggroNonPlayerServer()], 3, server.close) == expected
+    assert server.connection_count == 2
+    server.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    listener.close()
+
+
+class StallingServer(AggroDeltaNonPlayerServer):
+    """Misses the deadline of its first request, then plays like an AggroDeltaNonPlayerServer."""
+    def __init__(self, stall: float):
+        super().__init__()
+        self.stall = stall
+        self.requests = 0
+
+    def process_delta_request(self, client, transaction_id, delta, time_budget=None):
+        self.requests += 1
+        if self.requests == 1:
+            time.sleep(self.stall)
+        return super().process_delta_request(client, transaction_id, delta, time_budget)
+
+
+def check_deadlines(address):
+    """A request which outlives its deadline gives up the connection, so the next request isn't confused by it."""
+    listener = create_listener(address)
+    if not isinstance(address, str):
+        address = listener.getsockname()
+    remote_server = StallingServer(0.3)
+    thread = serve(listener, remote_server, 2)
+    server = SocketPlayerServer(address)
+    client = build_client([server, AggroNonPlayerServer()], 3, SOMEBODY,
+                          command_deadline=0.2, fallback_policy=AggroFallbackPolicy())
+    client.start_battle(max_turns=12)
+    assert server.connection_count == 2
+    # the requests after the stalled one were answered by the remote server
+    assert remote_server.requests > 2 and client.profiles[client.roster[0].party].acknowledged is not None
+    server.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    listener.close()
+
+
+def check_exhausted_budget(address):
+    """A request with no time left fails right away, and leaves the connection open and blocking."""
+    listener = create_listener(address)
+    if not isinstance(address, str):
+        address = listener.getsockname()
+    thread = serve(listener, AggroDeltaNonPlayerServer(), 1)
+    server = SocketPlayerServer(address)
+    client = build_client([server, AggroNonPlayerServer()], 3, SOMEBODY)
+    assert server.process_delta_request(client, 0, None, 0.0) == PlayerServer.ERROR
+    assert server.connection is None
+    client.start_battle(max_turns=4)
+    for time_budget in (0.0, -1.0):
+        assert server.process_delta_request(client, client.transaction_count, None, time_budget) == PlayerServer.ERROR
+        assert server.connection is not None and server.connection.connection.gettimeout() != 0.0
+    client.resume(max_turns=8)
+    assert server.connection_count == 1 and client.get_turns_played() == 8
+    server.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    listener.close()
+
+
+def bench_requests(address, party_size: int, turns: int):
+    listener = create_listener(address)
+    if not isinstance(address, str):
+        address = listener.getsockname()
+    thread = serve(listener, AggroDeltaNonPlayerServer(), 1)
+    server = SocketPlayerServer(address)
+    server.connect()
+    sent = []
+    server.connection.connection = RecordingSocket(server.connection.connection, sent)
+    client = build_client([server, AggroNonPlayerServer()], party_size, SOMEBODY)
+    start = time.perf_counter()
+    client.start_battle(max_turns=turns)
+    elapsed = time.perf_counter() - start
+    server.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    listener.close()
+    return elapsed / (turns // 2) * 1e6, sent
+
+
+class RecordingSocket:
+    """Passes everything through to the socket, recording the size of each message sent."""
+    def __init__(self, connection, sent):
+        self.connection = connection
+        self.sent = sent
+
+    def sendall(self, data):
+        self.sent.append(len(data) - HEADER.size)
+        return self.connection.sendall(data)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+def main():
+    check_codec()
+    with tempfile.TemporaryDirectory() as directory:
+        addresses = [('127.0.0.1', 0)]
+        if hasattr(socket, 'AF_UNIX'):
+            addresses.insert(0, os.path.join(directory, 'player.sock'))
+        for address in addresses:
+            check_transport(address)
+        check_deadlines(addresses[-1])
+        check_exhausted_budget(addresses[-1])
+        print(f'{"party size":>10} {"first request":>14} {"later requests":>15} {"us/request":>11}  (payload bytes)')
+        for party_size in (1, 10, 100):
+            address = addresses[0] if not isinstance(addresses[0], str) \
+                else os.path.join(directory, f'bench {party_size}.sock')
+            elapsed, sent = bench_requests(address, party_size, 20)
+            # the first message is the full state; the rest alternate between deltas and command responses
+            later = sum(sent[2::2]) / len(sent[2::2])
+            print(f'{party_size:>10} {sent[0]:>14} {later:>15.0f} {elapsed:>11.0f}')
+            assert later < sent[0]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import time
+
+from JrpgBattle.BattleEventHandling.CharacterUpdateEvent import UpdateType
+from JrpgBattle.BattleEventHandling.PartyEvent import PartyEvent
+from JrpgBattle.Character import CharacterStatus
+from JrpgBattle.GameManagement.BattleSimulation import HeadlessBattleClient
+from JrpgBattle.GameManagement.MainBattleClient import MainBattleClient
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from JrpgBattle.JsonProcessing.JrpgEncoder import JrpgDataManager
+from JrpgBattle.Party import Party
+from tests.battle_fixtures import build_somebody
+
+SOMEBODY = build_somebody(max_hp=40)
+
+
+class ObservingClient(HeadlessBattleClient):
+    """A headless client which still observes its parties, like the interactive MainBattleClient does."""
+    def __init__(self):
+        super().__init__()
+        self.deaths = 0
+
+    def observe_party(self, party: Party):
+        MainBattleClient.observe_party(self, party)
+
+    def handle_event(self, event) -> bool:
+        if event.event_type == UpdateType.CHARACTER_DIED:
+            self.deaths += 1
+        return False
+
+
+class OneByOneClient(ObservingClient):
+    def observe_party(self, party: Party):
+        # registers with every member, the way observe_party did before parties passed on their members' events
+        party.register_observer(self, PartyEvent)
+        for character in party.characters:
+            character.register_observer(self)
+
+
+def spawn_one_by_one(count: int, round_number: int) -> ObservingClient:
+    """Builds the horde character by character, the way it was built before Party.spawn."""
+    client = OneByOneClient()
+    horde = {CharacterStatus(SOMEBODY, f'one by one {round_number} {number}') for number in range(count)}
+    client.register_party(Party('HORDE', horde), AggroNonPlayerServer())
+    return client
+
+
+def spawn_in_bulk(count: int, round_number: int) -> ObservingClient:
+    client = ObservingClient()
+    manager = JrpgDataManager()
+    manager.character_cache[SOMEBODY.get_template_name()] = SOMEBODY
+    party = manager.spawn_party('HORDE', 'somebody', count, name_format=f'bulk {round_number} {{number}}')
+    client.register_party(party, AggroNonPlayerServer())
+    return client
+
+
+def main():
+    print(f'{"horde size":>10} {"one by one":>14} {"bulk":>14}  (characters/s)')
+    for count in (100, 1000, 10000, 50000):
+        rates = []
+        for spawn in (spawn_one_by_one, spawn_in_bulk):
+            rounds = max(1, 50000 // count)
+            start = time.perf_counter()
+            for round_number in range(rounds):
+                client = spawn(count, round_number)
+            rates.append(rounds * count / (time.perf_counter() - start))
+            # every member's events reach the client through its single registration
+            members = list(client.roster[0].party)
+            assert len(members) == len(client.characters_ids) == count
+            members[-1].receive_enemy_damage(1000)
+            assert client.deaths == 1
+        print(f'{count:>10} {rates[0]:>14.0f} {rates[1]:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
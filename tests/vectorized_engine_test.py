@@ -0,0 +1,222 @@
+import random
+import time
+from fractions import Fraction
+
+import numpy as np
+
+from JrpgBattle.Attack import VanillaAttack, DetailedAttackPlan, AttackQueue, AttackType
+from JrpgBattle.Character import CharacterTemplate, CharacterStatus, Multiplier
+from JrpgBattle.Party import Party
+from JrpgBattle.VectorizedEngine import VectorizedBattleState, NO_CHARACTER
+
+ATTACKS = [VanillaAttack('jab', damage=3, action_point_cost=50),
+           VanillaAttack('haymaker', damage=11, stamina_point_cost=300),
+           VanillaAttack('sweep', damage=5, target_range=(1, 3), stamina_point_cost=200),
+           VanillaAttack('feint', damage=0, action_point_cost=40, stamina_point_cost=0)]
+
+TEMPLATES = [CharacterTemplate(name='knight', max_hp=40, attack_list=frozenset(ATTACKS[:2]),
+                               parry_effectiveness=Fraction(3, 4)),
+             CharacterTemplate(name='rogue', max_hp=25, attack_list=frozenset(ATTACKS[1:]),
+                               parry_effectiveness=Fraction(1, 3)),
+             CharacterTemplate(name='wall', max_hp=60, attack_list=frozenset(ATTACKS[::3]),
+                               parry_effectiveness=Fraction(1)),
+             CharacterTemplate(name='glass', max_hp=12, attack_list=frozenset(ATTACKS),
+                               parry_effectiveness=Fraction(0))]
+
+TYPED_ATTACKS = [VanillaAttack('slash', AttackType.SLASH, damage=7, stamina_point_cost=150),
+                 VanillaAttack('firebrand', AttackType.FIRE_SLASH, damage=5, target_range=(1, 2)),
+                 VanillaAttack('venom', AttackType.POISON_STAB, damage=4, action_point_cost=60),
+                 VanillaAttack('ember', AttackType.FIRE, damage=3, action_point_cost=50)]
+
+# static affinities in every form: listed attack types, type masks, and several multipliers stacking on one type
+AFFINITY_TEMPLATES = [CharacterTemplate(name='pyro', max_hp=30, attack_list=frozenset(TYPED_ATTACKS[1::2]),
+                                        parry_effectiveness=Fraction(2, 3),
+                                        offensive_type_affinities={Multiplier(Fraction(3, 2), type_mask=4)},
+                                        defensive_type_affinities={Multiplier(Fraction(1, 2), type_mask=4),
+                                                                   Multiplier(Fraction(5, 3), type_mask=8)}),
+                      CharacterTemplate(name='duelist', max_hp=35, attack_list=frozenset(TYPED_ATTACKS[:3]),
+                                        parry_effectiveness=Fraction(3, 4),
+                                        offensive_type_affinities={Multiplier(Fraction(4, 3), type_mask=3,
+                                                                              type_value=1),
+                                                                   Multiplier(Fraction(5, 7), attack_types={5})},
+                                        defensive_type_affinities={Multiplier(Fraction(2, 3), type_mask=3,
+                                                                              type_value=2)}),
+                      CharacterTemplate(name='mossback', max_hp=50, attack_list=frozenset(TYPED_ATTACKS[2:]),
+                                        parry_effectiveness=Fraction(1, 2),
+                                        defensive_type_affinities={Multiplier(Fraction(7, 4), type_mask=4),
+                                                                   Multiplier(Fraction(1, 3), type_mask=8),
+                                                                   Multiplier(Fraction(3, 5),
+                                                                              attack_types={1, 2, 3})}),
+                      CharacterTemplate(name='plain', max_hp=20, attack_list=frozenset(TYPED_ATTACKS),
+                                        parry_effectiveness=Fraction(1, 3))]
+
+
+def build_battle(templates=TEMPLATES):
+    return [Party(name, {CharacterStatus(template, f'{name} {template.get_template_name()}')
+                         for template in templates})
+            for name in ('PLAYER', 'ENEMY')]
+
+
+def plan_turn(rng: random.Random, team: Party, enemy: Party):
+    """Sets random defenses and returns a random attack queue, the way a PlayerServer's commit would."""
+    members = sorted(team, key=lambda member: member.character_name)
+    targets = sorted(enemy, key=lambda target: target.character_name)
+    queue = AttackQueue()
+    defenses = []
+    for member in members:
+        roll = rng.random()
+        if roll < 0.25:
+            defenses.append((member, rng.choice(members)))
+        elif roll < 0.9:
+            attack = rng.choice(sorted(member.get_attack_list(), key=lambda a: a.name))
+            low, high = attack.get_target_range()
+            chosen = rng.sample(targets, rng.randint(low, min(high, len(targets))))
+            queue.enqueue(DetailedAttackPlan(attack, member, set(chosen)))
+    for defender, target in defenses:
+        defender.set_defense(target)
+    return queue, defenses
+
+
+def object_state(state: VectorizedBattleState, character: CharacterStatus):
+    return (character.current_hp, character.current_sp, character.sp_spent, character.current_ap,
+            character.vulnerability, character.stagger, character.was_attacked,
+            NO_CHARACTER if character.is_defending is None else state.get_column(character.is_defending),
+            NO_CHARACTER if character.defended_by is None else state.get_column(character.defended_by),
+            character.dead)
+
+
+class DifferentialHarness:
+    """Steps the same battles with the object engine and the vectorized engine and compares them after every phase."""
+    def __init__(self, battle_count: int, seed: int, templates=TEMPLATES):
+        self.battles = [build_battle(templates) for _ in range(battle_count)]
+        self.rngs = [random.Random(seed * 100000 + battle) for battle in range(battle_count)]
+        layout = [character for party in self.battles[0] for character in party]
+        self.state = VectorizedBattleState(layout, battle_count)
+        self.masks = [self.state.get_columns(list(party)) for party in self.battles[0]]
+        self.object_time = 0.0
+        self.vector_time = 0.0
+
+    def check(self):
+        for battle, parties in enumerate(self.battles):
+            for party in parties:
+                for character in party:
+                    expected = object_state(self.state, character)
+                    actual = self.state.get_state(battle, self.state.get_column(character))
+                    assert expected == actual, f'battle {battle}, {character.character_name}: {expected} != {actual}'
+
+    def execute_queues(self, side: int):
+        start = time.perf_counter()
+        queues = [list(parties[side].attack_queue) for parties in self.battles]
+        for plans in queues:
+            for plan in plans:
+                plan.execute()
+        self.object_time += time.perf_counter() - start
+        start = time.perf_counter()
+        for index in range(max(len(plans) for plans in queues)):
+            batch = self.state.build_plan_batch([plans[index] if index < len(plans) else None for plans in queues])
+            statuses = self.state.execute(batch)
+            for battle, plans in enumerate(queues):
+                if index < len(plans):
+                    assert plans[index].status == statuses[battle]
+        self.vector_time += time.perf_counter() - start
+
+    def run_objects(self, side: int, method: str, *args):
+        start = time.perf_counter()
+        for parties in self.battles:
+            getattr(parties[side], method)(*args)
+        self.object_time += time.perf_counter() - start
+
+    def run_vectors(self, side: int, method: str, *args):
+        start = time.perf_counter()
+        getattr(self.state, method)(self.masks[side], *args)
+        self.vector_time += time.perf_counter() - start
+
+    def plan(self, side: int):
+        defenses = []
+        for battle, parties in enumerate(self.battles):
+            parties[side].attack_queue, battle_defenses = plan_turn(self.rngs[battle], parties[side],
+                                                                    parties[1 - side])
+            defenses.append(battle_defenses)
+        for index in range(max(len(battle_defenses) for battle_defenses in defenses)):
+            active = np.array([index < len(battle_defenses) for battle_defenses in defenses])
+            pairs = [battle_defenses[index] if index < len(battle_defenses) else (None, None)
+                     for battle_defenses in defenses]
+            defender = np.array([0 if d is None else self.state.get_column(d) for d, _ in pairs])
+            target = np.array([0 if t is None else self.state.get_column(t) for _, t in pairs])
+            self.state.set_defense(active, defender, target)
+
+    def sequential_turn(self, side: int):
+        """Mirrors a turn of MainBattleClient.play_turn."""
+        self.run_objects(side, 'start_turn')
+        self.run_vectors(side, 'start_turn')
+        self.check()
+        self.execute_queues(side)
+        self.check()
+        self.run_objects(side, 'turn_interval')
+        self.run_vectors(side, 'turn_interval')
+        self.plan(side)
+        self.check()
+        self.run_objects(side, 'end_turn')
+        self.run_vectors(side, 'end_turn')
+        self.check()
+
+    def simultaneous_round(self):
+        """Mirrors MainBattleClient.run_simultaneous_attack_phase and run_simultaneous_planning_phase."""
+        for side in (0, 1):
+            self.execute_queues(side)
+        self.check()
+        for side in (0, 1):
+            self.run_objects(side, 'turn_interval', False)
+            self.run_vectors(side, 'turn_interval', False)
+        for side in (0, 1):
+            self.run_objects(side, 'start_turn')
+            self.run_vectors(side, 'start_turn')
+            self.run_objects(side, 'release_defenses')
+            self.run_vectors(side, 'release_defense')
+            self.run_objects(side, 'end_turn')
+            self.run_vectors(side, 'end_turn')
+        self.check()
+        for side in (0, 1):
+            self.plan(side)
+        self.check()
+
+
+def main():
+    battle_count = 300
+    turns = 40
+    harness = DifferentialHarness(battle_count, seed=1)
+    for turn in range(turns):
+        harness.sequential_turn(turn % 2)
+    dead = harness.state.dead.sum()
+    assert 0 < dead < harness.state.dead.size
+    print(f'sequential: object engine {harness.object_time:.2f}s, vectorized engine {harness.vector_time:.2f}s '
+          f'for {battle_count} battles x {turns} turns ({dead} deaths)')
+
+    harness = DifferentialHarness(battle_count, seed=2)
+    for side in (0, 1):
+        harness.run_objects(side, 'start_turn')
+        harness.run_vectors(side, 'start_turn')
+    for _ in range(turns // 2):
+        harness.simultaneous_round()
+    print(f'simultaneous: object engine {harness.object_time:.2f}s, vectorized engine {harness.vector_time:.2f}s')
+
+    harness = DifferentialHarness(battle_count, seed=3, templates=AFFINITY_TEMPLATES)
+    for turn in range(turns):
+        harness.sequential_turn(turn % 2)
+    dead = harness.state.dead.sum()
+    assert 0 < dead < harness.state.dead.size
+    print(f'affinities: object engine {harness.object_time:.2f}s, vectorized engine {harness.vector_time:.2f}s '
+          f'({dead} deaths)')
+
+    # multipliers with is_relevant callables can't be looked up per attack type, so they're still rejected
+    hexed = CharacterTemplate(name='hexed', max_hp=10, attack_list=frozenset(TYPED_ATTACKS),
+                              defensive_type_affinities={Multiplier(Fraction(2), is_relevant=lambda plan: True)})
+    try:
+        VectorizedBattleState([CharacterStatus(hexed, 'hexed')], 1)
+        assert False, 'a dynamic multiplier was accepted'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import timeit
+
+from JrpgBattle.Character import CharacterStatus
+from JrpgBattle.CharacterViews import PrivateCharacterView, PublicCharacterView
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer
+from JrpgBattle.Party import Party, PartyIdentifier
+from JrpgBattle.PartyViews import PrivatePartyView, PublicPartyView
+from tests.battle_fixtures import build_somebody, build_client, DUEL
+
+SOMEBODY = build_somebody(max_hp=40)
+
+
+class RecordingServer(AggroNonPlayerServer):
+    """Records the views and turn snapshots it's given before attacking like an AggroNonPlayerServer."""
+    def __init__(self):
+        super().__init__()
+        self.views = []
+        self.snapshots = []
+
+    def process_command_request(self, client, transaction_id, team, enemy, time_budget=None):
+        self.views.append((team, enemy, list(team), list(enemy)))
+        snapshot = client.get_turn_snapshot()
+        assert snapshot.turn == client.turn
+        assert [party.name for party in snapshot.parties] == [player.party.name for player in client.roster]
+        # the snapshot holds the same values as the views
+        for party in snapshot.parties:
+            view = client.public_views[PartyIdentifier(party.name)]
+            assert party.mp == view.get_mp()
+            for member, character in zip(party.members, view):
+                assert member.name == character.get_character_name()
+                assert member.damage == character.get_damage() and member.sp == character.get_sp()
+                assert member.dead == character.is_dead()
+        self.snapshots.append(snapshot)
+        return super().process_command_request(client, transaction_id, team, enemy, time_budget)
+
+
+def build_recorded_client(party_size: int, simultaneous_planning: bool = False):
+    servers = [RecordingServer(), RecordingServer()]
+    return build_client(servers, party_size, SOMEBODY, DUEL, simultaneous_planning=simultaneous_planning), servers
+
+
+def check_cached_views():
+    client, servers = build_recorded_client(3)
+    client.start_battle(max_turns=6)
+    for server in servers:
+        assert len(server.views) == 3
+        team, enemy, members, enemies = server.views[0]
+        for other_team, other_enemy, other_members, other_enemies in server.views[1:]:
+            assert other_team is team and other_enemy is enemy
+            assert all(a is b for a, b in zip(members, other_members))
+            assert all(a is b for a, b in zip(enemies, other_enemies))
+        assert all(type(member) is PrivateCharacterView for member in members)
+        assert all(type(member) is PublicCharacterView for member in enemies)
+    # each planning phase gets its own snapshot
+    snapshots = servers[0].snapshots + servers[1].snapshots
+    assert len({id(snapshot) for snapshot in snapshots}) == len(snapshots)
+
+    # in simultaneous mode, every player planning the same turn shares its snapshot
+    client, servers = build_recorded_client(3, simultaneous_planning=True)
+    client.start_battle(max_turns=4)
+    for first, second in zip(*(server.snapshots for server in servers)):
+        assert first is second
+
+
+def check_membership_changes():
+    party = Party('PLAYER', {CharacterStatus(SOMEBODY, 'Terra')})
+    view = PrivatePartyView(party)
+    members = view.get_members()
+    assert view.get_members() is members and len(members) == 1
+    party.spawn(SOMEBODY, 2)
+    assert len(view.get_members()) == 3
+    assert members[0] in view.get_members()
+
+
+def check_snapshots():
+    party = Party('PLAYER', {CharacterStatus(SOMEBODY, 'Terra'), CharacterStatus(SOMEBODY, 'Locke')})
+    terra = party.characters.get(CharacterStatus(SOMEBODY, 'Terra'))
+    locke = party.characters.get(CharacterStatus(SOMEBODY, 'Locke'))
+    locke.set_defense(terra)
+    terra.current_hp -= 7
+    snapshot = PrivatePartyView(party).snapshot()
+    members = {member.name: member for member in snapshot.members}
+    assert members['Terra'].current_hp == 33 and members['Terra'].defended_by == 'Locke'
+    assert members['Locke'].is_defending == 'Terra' and members['Locke'].attacks == SOMEBODY.get_attack_list()
+    public = {member.name: member for member in PublicPartyView(party).snapshot().members}
+    assert public['Terra'].damage == 7 and not hasattr(public['Terra'], 'current_hp')
+    # snapshots are frozen, even if the characters change later
+    terra.current_hp -= 3
+    assert members['Terra'].current_hp == 33
+    try:
+        members['Terra'].current_hp = 0
+        assert False
+    except AttributeError:
+        pass
+
+
+def bench(statement, number: int) -> float:
+    return timeit.timeit(statement, number=number) / number * 1e6
+
+
+def main():
+    check_cached_views()
+    check_membership_changes()
+    check_snapshots()
+    print(f'{"party size":>10} {"fresh views":>12} {"cached":>12} {"snapshot":>12}  (us/request)')
+    for party_size in (1, 10, 100, 1000):
+        party = Party('PLAYER', {CharacterStatus(SOMEBODY, f'Terra {i}') for i in range(party_size)})
+        cached = PrivatePartyView(party)
+
+        # what a server iterating its team three times per request paid for its views before they were cached
+        def fresh_request():
+            for _ in range(3):
+                for member in (PrivateCharacterView(character) for character in party):
+                    member.get_sp()
+
+        def cached_request():
+            for _ in range(3):
+                for member in cached:
+                    member.get_sp()
+
+        def snapshot_request():
+            members = cached.snapshot().members
+            for _ in range(3):
+                for member in members:
+                    member.sp
+
+        number = max(10, 10000 // party_size)
+        fresh_time = bench(fresh_request, number)
+        cached_time = bench(cached_request, number)
+        snapshot_time = bench(snapshot_request, number)
+        print(f'{party_size:>10} {fresh_time:>12.1f} {cached_time:>12.1f} {snapshot_time:>12.1f}')
+        assert cached_time < fresh_time
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+from JrpgBattle.CharacterViews import public_snapshot, private_snapshot
+from JrpgBattle.GameManagement.MainBattleClient import PlayerServer
+from JrpgBattle.GameManagement.NonPlayerServers import AggroNonPlayerServer, AggroDeltaNonPlayerServer
+from JrpgBattle.Party import PartyIdentifier
+from JrpgBattle.ViewDeltas import ChangeJournal
+from tests.battle_fixtures import build_somebody, build_client
+
+SOMEBODY = build_somebody(max_hp=40)
+
+
+class CheckingDeltaServer(AggroDeltaNonPlayerServer):
+    """Checks its mirror against the real characters after every delta, and counts the fields it's sent."""
+    def __init__(self):
+        super().__init__()
+        self.deltas = []
+
+    def process_delta_request(self, client, transaction_id, delta, time_budget=None):
+        self.deltas.append(delta)
+        self.mirror.apply(delta)
+        team = client.party_ids[PartyIdentifier(delta.team)]
+        assert self.mirror.team == {member.character_name: private_snapshot(member) for member in team}
+        for player in client.roster:
+            if player.party is not team:
+                assert self.mirror.parties[player.party.name] == {member.character_name: public_snapshot(member)
+                                                                  for member in player.party}
+        assert set(self.mirror.opponents) == {player.party.name for player in client.roster if player.party is not team}
+        return super().process_delta_request(client, transaction_id, delta, time_budget)
+
+
+def states_of(client):
+    return [character.get_state()[:8] for character in client.characters_ids.values()]
+
+
+def check_battle(party_size: int, simultaneous_planning: bool):
+    """A battle between AggroDeltaNonPlayerServers plays out exactly like one between AggroNonPlayerServers."""
+    expected = build_client([AggroNonPlayerServer() for _ in range(3)], party_size, SOMEBODY,
+                            simultaneous_planning=simultaneous_planning)
+    expected.start_battle(max_turns=40)
+    servers = [CheckingDeltaServer() for _ in range(3)]
+    client = build_client(servers, party_size, SOMEBODY, simultaneous_planning=simultaneous_planning)
+    client.start_battle(max_turns=40)
+    assert states_of(client) == states_of(expected)
+    for server in servers:
+        assert server.deltas[0].base is None
+        assert all(delta.base is not None for delta in server.deltas[1:])
+    return servers
+
+
+def check_restore():
+    servers = [CheckingDeltaServer() for _ in range(2)]
+    client = build_client(servers, 3, SOMEBODY)
+    client.start_battle(max_turns=5)
+    snapshot = client.snapshot()
+    client.resume(max_turns=30)
+    client.restore(snapshot)
+    # the restored characters are sent in full, which the servers check against the restored battle
+    client.resume(max_turns=30)
+    assert all(delta.base is not None for server in servers for delta in server.deltas[1:])
+
+
+class SilentDeltaServer(CheckingDeltaServer):
+    """Plays every turn, but never acknowledges a delta after its first one."""
+    def process_delta_request(self, client, transaction_id, delta, time_budget=None):
+        rval = super().process_delta_request(client, transaction_id, delta, time_budget)
+        return rval if len(self.deltas) == 1 else PlayerServer.ERROR
+
+
+def check_silent_server():
+    """A server which stops acknowledging doesn't keep the journal growing: it's sent the full state instead."""
+    silent = SilentDeltaServer()
+    listening = CheckingDeltaServer()
+    client = build_client([silent, listening], 3, SOMEBODY)
+    turns = 6 * ChangeJournal.HISTORY
+    client.start_battle(max_turns=turns)
+    assert client.get_turns_played() == turns
+    journal = client.change_journal
+    assert len(set(journal.sequences)) <= journal.history + 1
+    assert len(journal.changes) <= (journal.history + 1) * len(client.characters_ids)
+    assert client.roster[0].acknowledged == silent.deltas[0].transaction_id
+    # deltas while the first acknowledgement was still in the journal, and the full state after that
+    assert silent.deltas[1].base == silent.deltas[0].transaction_id
+    assert silent.deltas[-1].base is None
+    assert all(delta.base is not None for delta in listening.deltas[1:])
+
+
+def main():
+    check_restore()
+    check_silent_server()
+    print(f'{"party size":>10} {"full fields":>12} {"delta fields":>12}  (per request)')
+    for party_size in (1, 10, 100):
+        for simultaneous_planning in (False, True):
+            servers = check_battle(party_size, simultaneous_planning)
+        deltas = [delta for server in servers for delta in server.deltas[1:]]
+        full = servers[0].deltas[0].change_count()
+        sent = sum(delta.change_count() for delta in deltas) / len(deltas)
+        print(f'{party_size:>10} {full:>12} {sent:>12.1f}')
+        assert sent < full
+
+
+if __name__ == '__main__':
+    main()